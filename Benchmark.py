@@ -0,0 +1,348 @@
+"""
+Benchmarks the decomposition engines on polygon files in the text format of the testsuite.
+
+Every engine is timed a number of times per file, followed by one untimed run in which the objects that the engine
+allocates are counted (see AllocationCounter). The timings are written to the output file with one row per run, the
+allocation counts per inserted edge to <output>_allocations.csv next to it. The allocation and memory columns of the
+engines that build in worker processes (UNTRACED_ENGINES) are left empty.
+
+With --memory every timed run is followed by a memory run in a fresh process (see memoryRun), which records the peak
+memory traced by tracemalloc, the RSS high-water mark and the number of allocated trapezoids, DAG nodes and edges.
+These rows are written to <output>_memory.csv. The memory runs are not timed, tracing slows the engines down.
+
+With --classify M every repeat classifies M sample points (see TrapezoidMap.sample_points) as inside, outside or on
+the boundary, by the trapezoidal map of the randomized incremental algorithm and by ray casting. Ray casting takes
+O(n) per point, it classifies a prefix of the points. The rows with the timings and the number of points on which both
+methods disagree are written to <output>_classify.csv.
+
+Usage: python Benchmark.py [files ...] [--engine ps ri] [--repeats R] [--seed S] [--max-n N] [--memory]
+                           [--classify M] [--output results.csv]
+Without files, the polygons in the testsuite directory are used.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import re
+import resource
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import DataStructures
+import IncrementalDataStructure as ids
+import PlaneSweep as ps
+import RandomizedIncremental as ri
+import TrapezoidMap as tm
+
+ENGINES = {
+    "ps": ("Plane Sweep", ps.decompose),
+    "ri": ("Randomized Incremental", ri.decompose_basic),
+    "ri-brio": ("Randomized Incremental (BRIO)", partial(ri.decompose_basic, order="brio")),
+    # One speculative build per CPU, the first one that finishes is kept.
+    "ri-spec": ("Randomized Incremental (speculative)", partial(ri.decompose_basic, builds=None)),
+}
+
+# The engines that build in worker processes. Their allocations and memory are not seen by this process, the columns
+# are left empty (not applicable).
+UNTRACED_ENGINES = ("ri-spec",)
+
+# The classes of which the instances are counted, subclasses are counted through the __init__ of their base class.
+COUNTED_CLASSES = (DataStructures.Vertex, DataStructures.Edge, DataStructures.SweepKey, DataStructures.SweepPosition,
+                   ps.Event, ids.Trapezoid, ids.Node, ids.TrapezoidSearchStructure, ids.NeighborList,
+                   ids.TrapezoidSplit)
+
+# The groups in which the counts are reported, the other classes are reported as 'other'.
+ALLOCATION_GROUPS = {
+    "trapezoids": ("Trapezoid", "BoundingBox"),
+    "dag_nodes": ("TrapezoidSearchStructure", "XNode", "YNode", "TrapezoidLeaf"),
+    "edges": ("Edge",),
+    "vertices": ("Vertex", "WallVertex"),
+}
+
+
+class AllocationCounter:
+    """
+    Counts the instances of the provided classes (and their subclasses) that are created while the counter is active.
+    It is used as context manager, the __init__ of the classes is wrapped in the meantime. The counts are kept per
+    class name in counts.
+    """
+    def __init__(self, classes=COUNTED_CLASSES):
+        self.classes = classes
+        self.counts = Counter()
+        self._inits = []
+
+    def __enter__(self):
+        self._inits = [(cls, cls.__dict__["__init__"]) for cls in self.classes]
+
+        for cls, init in self._inits:
+            cls.__init__ = self._counting(init)
+
+        return self
+
+    def __exit__(self, *exc):
+        for cls, init in self._inits:
+            cls.__init__ = init
+
+        self._inits = []
+        return False
+
+    def _counting(self, init):
+        counts = self.counts
+
+        def counted(obj, *args, **kwargs):
+            counts[type(obj).__name__] += 1
+            init(obj, *args, **kwargs)
+
+        return counted
+
+    def grouped(self):
+        """Returns the counts per group of ALLOCATION_GROUPS, together with 'other' and 'total'."""
+        groups = {group: sum(self.counts[name] for name in names) for group, names in ALLOCATION_GROUPS.items()}
+        groups["other"] = sum(self.counts.values()) - sum(groups.values())
+        groups["total"] = sum(self.counts.values())
+
+        return groups
+
+
+def polygonEdges(points):
+    """
+    Returns the edges of the polygon with the provided vertices (pairs (x, y)). The inside lies on the right of the
+    edges if the vertices are in clockwise order like in the testsuite, on the left otherwise.
+    """
+    points = [DataStructures.Vertex(x, y) for x, y in points]
+    n = len(points)
+    area = sum(points[i].x * points[(i + 1) % n].y - points[(i + 1) % n].x * points[i].y for i in range(n))
+    inside = DataStructures.Direction.Left if area > 0 else DataStructures.Direction.Right
+
+    return [DataStructures.Edge(points[i], points[(i + 1) % n], inside) for i in range(n)]
+
+
+def readEdges(filename):
+    """Returns the edges of the polygon in the provided file, see polygonEdges."""
+    with open(filename, 'r') as f:
+        n = int(f.readline())
+        return polygonEdges([(int(x), int(y)) for x, y in (f.readline().split() for _ in range(n))])
+
+
+def testsuiteFiles(directory="testsuite", maxN=None):
+    """
+    Returns the polygon files in the provided directory ordered by their number of vertices. The files are named
+    testSuite<n>_<i>.txt, in any case. A ValueError is raised if the directory contains other .txt files, so no
+    polygon is skipped silently.
+    """
+    files = []
+    listed = [name for name in os.listdir(directory) if name.lower().endswith(".txt")]
+
+    for name in listed:
+        match = re.match(r"testSuite(\d+)_(\d+)\.txt$", name, re.IGNORECASE)
+
+        if match is not None:
+            files.append((int(match.group(1)), int(match.group(2)), os.path.join(directory, name)))
+
+    if len(files) != len(listed):
+        unmatched = sorted(set(listed) - set(os.path.basename(filename) for _, _, filename in files))
+        raise ValueError("The files {} in {} are not named like testsuite files.".format(", ".join(unmatched),
+                                                                                          directory))
+
+    return [filename for n, _, filename in sorted(files) if maxN is None or n <= maxN]
+
+
+def timeRun(engine, edges, seed):
+    """Returns the wall time in milliseconds of one run of the engine, the seed is used by the randomized engine."""
+    random.seed(seed)
+
+    start = time.perf_counter()
+    ENGINES[engine][1](edges)
+    stop = time.perf_counter()
+
+    return (stop - start) * 1000.0
+
+
+def countAllocations(engine, edges, seed):
+    """Returns the AllocationCounter of one run of the engine."""
+    random.seed(seed)
+
+    with AllocationCounter() as counter:
+        ENGINES[engine][1](edges)
+
+    return counter
+
+
+def maxRss():
+    """Returns the RSS high-water mark of this process in kB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _memoryRun(engine, filename, seed):
+    edges = readEdges(filename)
+    rssBefore = maxRss()
+
+    random.seed(seed)
+    tracemalloc.start()
+
+    try:
+        with AllocationCounter() as counter:
+            result = ENGINES[engine][1](edges)
+
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    groups = counter.grouped()
+
+    return {"peak_traced_bytes": peak, "retained_bytes": retained, "rss_before_kb": rssBefore, "rss_peak_kb": maxRss(),
+            "trapezoids": groups["trapezoids"], "dag_nodes": groups["dag_nodes"], "edges": groups["edges"]}
+
+
+def memoryRun(engine, filename, seed):
+    """
+    Runs the engine once on the file in a fresh (spawned) process, so the RSS high-water mark belongs to this run.
+    Returns a dictionary with the peak memory traced by tracemalloc during the run, the traced memory that is retained
+    by the result, the RSS high-water mark before and after the run and the number of allocated trapezoids, DAG nodes
+    and edges (see ALLOCATION_GROUPS).
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_memoryRun, engine, filename, seed).result()
+
+
+def run(files, engines=("ps", "ri"), repeats=3, seed=0, memory=False):
+    """
+    Benchmarks the engines on the files, with memory runs if memory is true.
+    Returns the tuple (timings, allocations, memory) of lists of rows, see TIMING_FIELDS, ALLOCATION_FIELDS and
+    MEMORY_FIELDS.
+    """
+    timings = []
+    allocations = []
+    memoryRows = []
+
+    for filename in files:
+        edges = readEdges(filename)
+        n = len(edges)
+
+        for engine in engines:
+            for repeat in range(repeats):
+                ms = timeRun(engine, edges, seed + repeat)
+                timings.append({"engine": engine, "file": filename, "n": n, "run": repeat, "time_ms": ms})
+
+                if memory:
+                    row = {"engine": engine, "file": filename, "n": n, "run": repeat}
+                    if engine not in UNTRACED_ENGINES:
+                        row.update(memoryRun(engine, filename, seed + repeat))
+                    memoryRows.append(row)
+
+            row = {"engine": engine, "file": filename, "n": n}
+            allocations.append(row)
+
+            if engine in UNTRACED_ENGINES:
+                print("{:>3} {:<40} n={:<7} {:10.1f} ms  allocations not applicable (worker processes)".format(
+                    engine, filename, n, min(t["time_ms"] for t in timings[-repeats:])))
+                continue
+
+            groups = countAllocations(engine, edges, seed).grouped()
+            row.update({group: count / n for group, count in groups.items()})
+
+            print("{:>3} {:<40} n={:<7} {:10.1f} ms  {:8.1f} allocations per edge ({:.1f} trapezoids, "
+                  "{:.1f} DAG nodes)".format(engine, filename, n, min(t["time_ms"] for t in timings[-repeats:]),
+                                             row["total"], row["trapezoids"], row["dag_nodes"]))
+
+            if memory:
+                print("{:>3} {:<40} peak traced {:.1f} MB, peak RSS {:.1f} MB".format(
+                    engine, filename, max(m["peak_traced_bytes"] for m in memoryRows[-repeats:]) / 2 ** 20,
+                    max(m["rss_peak_kb"] for m in memoryRows[-repeats:]) / 2 ** 10))
+
+    return timings, allocations, memoryRows
+
+
+def classificationRuns(files, count, repeats=3, seed=0):
+    """
+    Times the classification of count sample points by TrapezoidMap.classify_points and by TrapezoidMap.ray_casting
+    on every file. Run r uses the sample points of seed + r, the map is built once per file with the seed.
+    Returns the list of rows, see CLASSIFY_FIELDS.
+    """
+    rows = []
+
+    for filename in files:
+        edges = readEdges(filename)
+        n = len(edges)
+        trapezoidMap = tm.TrapezoidMap.from_edges(edges, seed=seed)
+        # Ray casting takes O(n) per point, about 10^6 edge tests per run.
+        sample = min(count, max(1000, 10 ** 6 // n))
+
+        for repeat in range(repeats):
+            xs, ys = tm.sample_points(edges, count, seed + repeat)
+
+            start = time.perf_counter()
+            classes = trapezoidMap.classify_points(xs, ys)
+            mapMs = (time.perf_counter() - start) * 1000.0
+
+            start = time.perf_counter()
+            expected = tm.ray_casting(edges, xs[:sample], ys[:sample])
+            raysMs = (time.perf_counter() - start) * 1000.0
+
+            differences = int((classes[:sample] != expected).sum())
+
+            for method, points, ms in (("map", count, mapMs), ("rays", sample, raysMs)):
+                rows.append({"method": method, "file": filename, "n": n, "run": repeat, "points": points,
+                             "time_ms": ms, "differences": differences})
+
+        print("classify {:<35} n={:<7} map {:10.0f} points/s, rays {:10.0f} points/s, {} difference(s)".format(
+            filename, n, max(r["points"] / r["time_ms"] for r in rows[-2 * repeats::2]) * 1000.0,
+            max(r["points"] / r["time_ms"] for r in rows[-2 * repeats + 1::2]) * 1000.0,
+            sum(r["differences"] for r in rows[-2 * repeats::2])))
+
+    return rows
+
+
+TIMING_FIELDS = ["engine", "file", "n", "run", "time_ms"]
+
+ALLOCATION_FIELDS = ["engine", "file", "n"] + list(ALLOCATION_GROUPS) + ["other", "total"]
+
+MEMORY_FIELDS = ["engine", "file", "n", "run", "peak_traced_bytes", "retained_bytes", "rss_before_kb", "rss_peak_kb",
+                 "trapezoids", "dag_nodes", "edges"]
+
+CLASSIFY_FIELDS = ["method", "file", "n", "run", "points", "time_ms", "differences"]
+
+
+def writeRows(filename, fields, rows):
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def siblingFile(filename, suffix):
+    """Returns the name of the file next to filename with the provided suffix, e.g. bench.csv -> bench_suffix.csv."""
+    base, ext = os.path.splitext(filename)
+
+    return "{}_{}{}".format(base, suffix, ext or ".csv")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the decomposition engines.")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--engine", choices=sorted(ENGINES), nargs="+", default=["ps", "ri"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-n", type=int, default=None)
+    parser.add_argument("--memory", action="store_true")
+    parser.add_argument("--classify", type=int, default=0)
+    parser.add_argument("--output", default="bench.csv")
+    args = parser.parse_args()
+
+    files = args.files if len(args.files) > 0 else testsuiteFiles(maxN=args.max_n)
+    timings, allocations, memory = run(files, args.engine, args.repeats, args.seed, args.memory)
+
+    writeRows(args.output, TIMING_FIELDS, timings)
+    writeRows(siblingFile(args.output, "allocations"), ALLOCATION_FIELDS, allocations)
+
+    if args.memory:
+        writeRows(siblingFile(args.output, "memory"), MEMORY_FIELDS, memory)
+
+    if args.classify > 0:
+        writeRows(siblingFile(args.output, "classify"), CLASSIFY_FIELDS,
+                  classificationRuns(files, args.classify, args.repeats, args.seed))
@@ -0,0 +1,238 @@
+"""
+Builds and verifies a reproducible benchmark corpus on top of the generators in PolygonCreator.
+
+Every generated file is recorded in the manifest (manifest.json in the corpus directory) with its generator, the
+generator parameters, the seed, the number of vertices and the SHA-256 checksum of the file. The seeds are derived
+from one base seed, the size and the repetition, so the same command produces the same corpus on every machine.
+
+Usage:
+    python CorpusBuilder.py build <directory> [--generator rectangloid|sharkteeth] [--sizes N ...]
+                                  [--ladder START STOP STEPS] [--repeats R] [--seed S] [--format txt|npy]
+                                  [--workers W]
+    python CorpusBuilder.py verify <directory> [--regenerate] [--workers W]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import PolygonCreator as poly
+
+MANIFEST = "manifest.json"
+
+MANIFEST_VERSION = 1
+
+GENERATORS = ("rectangloid", "sharkteeth")
+
+
+def generatorParams(generator, n):
+    """Returns the parameters of the generator for a polygon with n vertices."""
+    if generator == "rectangloid":
+        # 2x + 2y - 4 = n vertices on an (almost) square grid, with the cell size used for the testsuite.
+        if n % 2 != 0 or n < 4:
+            raise ValueError("A rectangloid has an even number of at least 4 vertices, got {}.".format(n))
+
+        x = n // 4 + 1
+        return {"x": x, "y": n // 2 + 2 - x, "size": int(n * 1.25), "general": True}
+    elif generator == "sharkteeth":
+        # 4k + 4 + red = n vertices, the radii are large enough to keep the teeth apart after rounding. The seed
+        # jitters the length of the teeth, so the repetitions differ.
+        if n < 8:
+            raise ValueError("A shark teeth polygon has at least 8 vertices, got {}.".format(n))
+
+        k = (n - 4) // 4
+        outrad = max(10 ** 6, 400 * k)
+        return {"n": k, "inrad": outrad // 2, "outrad": outrad, "pierce": 0, "red": (n - 4) % 4, "jitter": 0.1}
+    else:
+        raise ValueError("The unknown generator {} was provided.".format(generator))
+
+
+def generate(generator, params, seed):
+    """Returns the (n, 2) point array of the provided generator, parameters and seed."""
+    if generator == "rectangloid":
+        return poly.rectangloidArray(seed=seed, **params)
+    elif generator == "sharkteeth":
+        return poly.sharkTeethArray(seed=seed, **params)
+    else:
+        raise ValueError("The unknown generator {} was provided.".format(generator))
+
+
+def deriveSeed(baseSeed, generator, n, repeat):
+    """
+    Returns the seed of repetition repeat of size n of the generator, independent of the order in which files are
+    built. The generator is part of the key (by the CRC-32 of its name), so the generators draw independent streams.
+    """
+    key = (zlib.crc32(generator.encode("utf-8")), n, repeat)
+
+    return int(np.random.SeedSequence(baseSeed, spawn_key=key).generate_state(1, np.uint64)[0])
+
+
+def checksum(filename):
+    """Returns the SHA-256 checksum of the file, read in blocks."""
+    digest = hashlib.sha256()
+
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def readManifest(directory):
+    path = os.path.join(directory, MANIFEST)
+
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "entries": []}
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def writeManifest(directory, manifest):
+    manifest["entries"].sort(key=lambda e: (e["generator"], e["n"], e["repeat"]))
+
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+def _buildEntry(directory, entry):
+    """Generates the file of a manifest entry and returns the entry with its checksum."""
+    base = os.path.join(directory, os.path.splitext(entry["file"])[0])
+    points = generate(entry["generator"], entry["params"], entry["seed"])
+
+    if len(points) != entry["n"]:
+        raise ValueError("Generator {} made {} instead of {} vertices.".format(entry["generator"], len(points),
+                                                                              entry["n"]))
+
+    poly.writePointsArray(points, base, binary=entry["file"].endswith(".npy"))
+
+    return dict(entry, sha256=checksum(os.path.join(directory, entry["file"])))
+
+
+def build(directory, generator, sizes, repeats=3, seed=0, format="txt", workers=None):
+    """
+    Generates the corpus files for the provided sizes in parallel and records them in the manifest.
+    Files that already exist with the checksum of the manifest are not generated again.
+    Returns the list of entries that were (re)generated.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = readManifest(directory)
+    known = {e["file"]: e for e in manifest["entries"]}
+
+    todo = []
+
+    for n in sizes:
+        for repeat in range(repeats):
+            entry = {
+                "file": "{}_{}_{}.{}".format(generator, n, repeat, format),
+                "generator": generator,
+                "params": generatorParams(generator, n),
+                "seed": deriveSeed(seed, generator, n, repeat),
+                "n": n,
+                "repeat": repeat,
+            }
+
+            old = known.get(entry["file"])
+            path = os.path.join(directory, entry["file"])
+
+            if old is not None and all(old[k] == entry[k] for k in entry) and os.path.exists(path) and \
+                    checksum(path) == old["sha256"]:
+                continue
+
+            todo.append(entry)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        built = list(pool.map(_buildEntry, [directory] * len(todo), todo))
+
+    for entry in built:
+        known[entry["file"]] = entry
+
+    manifest["entries"] = list(known.values())
+    writeManifest(directory, manifest)
+
+    return built
+
+
+def _verifyEntry(directory, entry, regenerate):
+    """Returns a list of problems with the file of a manifest entry, empty if it is fine."""
+    path = os.path.join(directory, entry["file"])
+    problems = []
+
+    if not os.path.exists(path):
+        return ["{}: missing".format(entry["file"])]
+
+    if checksum(path) != entry["sha256"]:
+        problems.append("{}: checksum differs from the manifest".format(entry["file"]))
+
+    if regenerate:
+        points = generate(entry["generator"], entry["params"], entry["seed"])
+        stored = np.load(path) if path.endswith(".npy") else \
+            np.loadtxt(path, dtype=np.int64, skiprows=1, ndmin=2)
+
+        if not np.array_equal(points, stored):
+            problems.append("{}: regenerating from the seed gives different points".format(entry["file"]))
+
+    return problems
+
+
+def verify(directory, regenerate=False, workers=None):
+    """
+    Verifies the files in the corpus against the manifest. With regenerate, every file is also generated again from
+    its seed and compared, which checks that the generators are still reproducible. Returns the list of problems.
+    """
+    entries = readManifest(directory)["entries"]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_verifyEntry, [directory] * len(entries), entries, [regenerate] * len(entries))
+
+    return [problem for problems in results for problem in problems]
+
+
+def ladder(start, stop, steps):
+    """Returns (at most) steps geometrically spaced sizes from start to stop, rounded to multiples of four."""
+    sizes = np.geomspace(start, stop, steps)
+
+    return sorted(set(int(round(s / 4.0)) * 4 for s in sizes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds and verifies a reproducible benchmark corpus.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    buildParser = commands.add_parser("build")
+    buildParser.add_argument("directory")
+    buildParser.add_argument("--generator", choices=GENERATORS, default="rectangloid")
+    buildParser.add_argument("--sizes", type=int, nargs="+", default=None)
+    buildParser.add_argument("--ladder", type=int, nargs=3, metavar=("START", "STOP", "STEPS"),
+                             default=(700, 10 ** 6, 12))
+    buildParser.add_argument("--repeats", type=int, default=3)
+    buildParser.add_argument("--seed", type=int, default=0)
+    buildParser.add_argument("--format", choices=("txt", "npy"), default="txt")
+    buildParser.add_argument("--workers", type=int, default=None)
+
+    verifyParser = commands.add_parser("verify")
+    verifyParser.add_argument("directory")
+    verifyParser.add_argument("--regenerate", action="store_true")
+    verifyParser.add_argument("--workers", type=int, default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        sizes = args.sizes if args.sizes is not None else ladder(*args.ladder)
+        built = build(args.directory, args.generator, sizes, args.repeats, args.seed, args.format, args.workers)
+
+        print("Built {} files in {}".format(len(built), args.directory))
+    else:
+        problems = verify(args.directory, args.regenerate, args.workers)
+
+        for problem in problems:
+            print(problem)
+
+        print("{} problems found".format(len(problems)))
+        sys.exit(1 if len(problems) > 0 else 0)
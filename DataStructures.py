@@ -2,6 +2,8 @@ from enum import Enum
 import math as math
 import sys
 
+import numpy as np
+
 class Vector:
     """Represents a 2D vector."""
     def __init__(self, x, y):
@@ -51,19 +53,22 @@ class Edge:
         return not self == other
 
     def startYOfEdge(self):
-        return self.p1.y if self.p1.x < self.p2.x else self.p2.y
+        return self.getStartVertex().y
 
     def statusKeyForEdge(self):
-        dx = abs(self.p1.x - self.p2.x)
+        dx = self.getEndVertex().x - self.getStartVertex().x
         dy = self.getEndVertex().y - self.getStartVertex().y
 
-        return StatusKey(self.getStartVertex().y, dy / dx)
+        # After the symbolic shear a vertical edge is steeper than any other edge.
+        return StatusKey(self.getStartVertex().y, dy / dx if dx != 0 else math.inf)
+
+    # The start and end vertex are the first and last vertex in lexicographic (x, y) order, see Vertex.__lt__.
 
     def getStartVertex(self):
-        return self.p1 if self.p1.x < self.p2.x else self.p2
+        return self.p1 if self.p1 < self.p2 else self.p2
 
     def getEndVertex(self):
-        return self.p2 if self.p1.x < self.p2.x else self.p1
+        return self.p2 if self.p1 < self.p2 else self.p1
 
     def pointAtEdge(self, targetX):
         return Vertex(targetX, self.getStartVertex().y + (targetX - self.getStartVertex().x) * \
@@ -74,7 +79,7 @@ class Edge:
         return not self.isRightToLeft()
 
     def isRightToLeft(self):
-        return self.p1.x > self.p2.x
+        return self.p2 < self.p1
     
     def asVector(self):
         """Returns a vector representation of this edge."""
@@ -137,6 +142,29 @@ class Edge:
         """Returns true if this edge is vertical. Otherwise false is returned."""
         return self.p1.x == self.p2.x
 
+    def yAtSweep(self, vertex):
+        """
+        Returns the y-value at which the sweep line through the provided vertex crosses this edge.
+        The sweep line is sheared symbolically, so it crosses a vertical edge at the y-value of the vertex (clamped to
+        the edge). See Vertex.sweepOrder for the position of the sweep line.
+        """
+        x, y = vertex.sweepOrder()
+        start = self.getStartVertex()
+        end = self.getEndVertex()
+
+        if start.x == end.x:
+            return min(max(y, start.y), end.y)
+        if x == start.x:
+            return start.y
+        if x == end.x:
+            return end.y
+
+        return start.y + (x - start.x) * ((end.y - start.y) / (end.x - start.x))
+
+    def pointAtSweep(self, vertex):
+        """Returns the point at which the sweep line through the provided vertex crosses this edge."""
+        return Vertex(vertex.x, self.yAtSweep(vertex))
+
     def getCorrespondingYValue(self, x):
         """
         Returns the y-value of the corresponding x-value on this edge.
@@ -167,6 +195,29 @@ class Edge:
         return self.p1 == edge.p1 or self.p1 == edge.p2 or \
                self.p2 == edge.p1 or self.p2 == edge.p2
 
+def sweepY(edges, points):
+    """
+    Returns the y-values at which the sweep lines through the points cross the edges, like Edge.yAtSweep for arrays:
+    edges is a (n, 4) array of rows (x1, y1, x2, y2) and points a (n, 2) array.
+    """
+    x, y = points[:, 0], points[:, 1]
+
+    # Order the endpoints lexicographically, like Edge.getStartVertex and Edge.getEndVertex.
+    swap = (edges[:, 2] < edges[:, 0]) | ((edges[:, 2] == edges[:, 0]) & (edges[:, 3] < edges[:, 1]))
+    startX = np.where(swap, edges[:, 2], edges[:, 0])
+    startY = np.where(swap, edges[:, 3], edges[:, 1])
+    endX = np.where(swap, edges[:, 0], edges[:, 2])
+    endY = np.where(swap, edges[:, 1], edges[:, 3])
+
+    vertical = startX == endX
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = startY + (x - startX) * ((endY - startY) / (endX - startX))
+
+    result = np.where(x == startX, startY, np.where(x == endX, endY, result))
+
+    return np.where(vertical, np.minimum(np.maximum(y, startY), endY), result)
+
 class Vertex:
     def __init__(self, x, y):
         self.x = x
@@ -184,6 +235,30 @@ class Vertex:
     def __ne__(self, other):
         return not self == other
 
+    # Vertices are ordered lexicographically on (x, y). This is the x-order after the symbolic shear
+    # (x, y) -> (x + e * y, y) for an infinitesimal e > 0, which makes all x-coordinates distinct and no edge vertical.
+
+    def sweepOrder(self):
+        """Returns the tuple on which the vertex is ordered, see WallVertex for why this is not always (x, y)."""
+        return self.x, self.y
+
+    def __lt__(self, other):
+        return self.sweepOrder() < other.sweepOrder()
+
+    def __le__(self, other):
+        return self.sweepOrder() <= other.sweepOrder()
+
+    def __gt__(self, other):
+        return self.sweepOrder() > other.sweepOrder()
+
+    def __ge__(self, other):
+        return self.sweepOrder() >= other.sweepOrder()
+
+    @property
+    def origin(self):
+        """Returns the vertex that defines the vertical wall through this point, see WallVertex."""
+        return self
+
     def liesAbove(self, edge):
         """Returns true if this vertex lies above the provided edge."""
         v_e = edge.asVector()
@@ -220,6 +295,23 @@ class Vertex:
         """Returns true if this vertex is one of the edge its endpoints."""
         return edge.p1 == self or edge.p2 == self
 
+class WallVertex(Vertex):
+    """
+    A point on a vertical wall through a vertex of the polygon, e.g. the corner of a trapezoid on its top edge.
+    It is ordered as the vertex that defines the wall, as after the symbolic shear the wall is the (sheared) sweep line
+    through that vertex.
+    """
+    def __init__(self, x, y, origin):
+        super().__init__(x, y)
+        self._origin = origin.origin
+
+    @property
+    def origin(self):
+        return self._origin
+
+    def sweepOrder(self):
+        return self._origin.x, self._origin.y
+
 # Used for the sweep line
 class StatusKey:
     def __init__(self, startAtY, dxdy):
@@ -249,3 +341,187 @@ class StatusKey:
 
     def __repr__(self):
         return "(start: {}, dxdy: {})".format(self.startAtY, self.dxdy)
+
+class SweepPosition:
+    """
+    The current event point of a sweep and whether the status is evaluated just before (-1) or after (1) it.
+    With side 0 the status is evaluated at the point itself, so edges through the point compare as equal.
+    """
+    def __init__(self, point=None, side=1):
+        self.point = point
+        self.side = side
+
+class SweepKey:
+    """
+    Status key of an edge that compares on the y-value at the current sweep position, see SweepPosition.
+
+    The sweep line is sheared symbolically, see Vertex.__lt__. A vertical edge therefore crosses the sweep line at the
+    y-value of the event point and ties at the same y-value are broken on the slopes, where the side of the sweep
+    position decides the direction. The keys are compared on the floating point y-values first, which are cached per
+    sweep position. Ties and near-ties are decided exactly when the coordinates are integers.
+    A key without edge (see forPoint) represents the event point itself and can be used to find the edges directly
+    above and below it.
+    """
+    # The relative difference of the floating point y-values below which the keys are compared exactly.
+    TOLERANCE = 1e-9
+
+    def __init__(self, edge, sweep):
+        self.edge = edge
+        self.sweep = sweep
+        # The sweep point of the cached floating point y-value and the tolerance of that value, see _yFloat.
+        self._point = None
+        self._y = None
+        self._tolerance = 0.0
+
+        if edge is not None:
+            left = edge.getStartVertex()
+            right = edge.getEndVertex()
+
+            self.x = left.x
+            self.y = left.y
+            self.dx = right.x - left.x
+            self.dy = right.y - left.y
+            self.ylow = min(left.y, right.y)
+            self.yhigh = max(left.y, right.y)
+            self.order = (left.x, left.y, right.x, right.y)
+            self._tolerance = self.TOLERANCE * (max(abs(left.y), abs(right.y)) + 1)
+
+    @staticmethod
+    def forPoint(sweep):
+        return SweepKey(None, sweep)
+
+    def _yFloat(self):
+        """Returns the y-value at the sweep point as a float, like Edge.yAtSweep."""
+        point = self.sweep.point
+
+        if point is not self._point:
+            self._point = point
+
+            if self.edge is None:
+                self._y = point.y
+                self._tolerance = self.TOLERANCE * (abs(point.y) + 1)
+            elif self.dx == 0:
+                self._y = min(max(point.y, self.ylow), self.yhigh)
+            else:
+                self._y = self.y + (point.x - self.x) * (self.dy / self.dx)
+
+        return self._y
+
+    def _yAt(self):
+        """Returns the y-value at the sweep position as a fraction (numerator, positive denominator)."""
+        px, py = self.sweep.point.x, self.sweep.point.y
+
+        if self.edge is None:
+            return py, 1
+        if self.dx == 0:
+            return min(max(py, self.ylow), self.yhigh), 1
+
+        return self.y * self.dx + (px - self.x) * self.dy, self.dx
+
+    def _compare(self, other):
+        point = self.sweep.point
+        y = (self._y if self._point is point else self._yFloat()) - \
+            (other._y if other._point is point else other._yFloat())
+
+        if y > self._tolerance + other._tolerance:
+            return 1
+        if y < -self._tolerance - other._tolerance:
+            return -1
+
+        return self._compareExact(other)
+
+    def _compareExact(self, other):
+        if self.edge is None and other.edge is None:
+            return 0
+        if self.edge is not None and self.edge is other.edge:
+            return 0
+
+        (n1, d1), (n2, d2) = self._yAt(), other._yAt()
+        c = n1 * d2 - n2 * d1
+
+        if c != 0:
+            return -1 if c < 0 else 1
+
+        if self.edge is None or other.edge is None:
+            # An edge through the event point, the point lies below it.
+            return -1 if self.edge is None else 1
+
+        # Both edges cross the sweep line at the same y, compare the slopes (vertical edges are the steepest).
+        s = _compareSlopes(self, other)
+
+        yn = n1 - self.sweep.point.y * d1
+
+        if yn == 0 and self.sweep.side == 0:
+            return 0
+
+        if yn != 0:
+            # The crossing lies above or below the event point, the shear moves the edges with the larger slope
+            # further to the point (y - py has the sign of yn).
+            s = -s if yn > 0 else s
+        else:
+            s = s * self.sweep.side
+
+        if s != 0:
+            return s
+
+        # Collinear edges, the order does not matter as long as it is consistent.
+        return (self.order > other.order) - (self.order < other.order)
+
+    # The status tree compares with <, > and ==, these test the floating point y-values without calling _compare.
+
+    def __lt__(self, other):
+        point = self.sweep.point
+        y = (self._y if self._point is point else self._yFloat()) - \
+            (other._y if other._point is point else other._yFloat())
+        tolerance = self._tolerance + other._tolerance
+
+        if y > tolerance or y < -tolerance:
+            return y < 0
+
+        return self._compareExact(other) < 0
+
+    def __gt__(self, other):
+        point = self.sweep.point
+        y = (self._y if self._point is point else self._yFloat()) - \
+            (other._y if other._point is point else other._yFloat())
+        tolerance = self._tolerance + other._tolerance
+
+        if y > tolerance or y < -tolerance:
+            return y > 0
+
+        return self._compareExact(other) > 0
+
+    def __le__(self, other):
+        return self._compare(other) <= 0
+
+    def __ge__(self, other):
+        return self._compare(other) >= 0
+
+    def __eq__(self, other):
+        point = self.sweep.point
+        y = (self._y if self._point is point else self._yFloat()) - \
+            (other._y if other._point is point else other._yFloat())
+        tolerance = self._tolerance + other._tolerance
+
+        if y > tolerance or y < -tolerance:
+            return False
+
+        return self._compareExact(other) == 0
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.edge)
+
+    def __repr__(self):
+        return "SweepKey({})".format(self.edge)
+
+def _compareSlopes(a, b):
+    """Returns -1, 0 or 1 as the slope of a is smaller than, equal to or larger than the slope of b."""
+    if a.dx == 0 or b.dx == 0:
+        return (a.dx == 0) - (b.dx == 0)
+
+    c = a.dy * b.dx - b.dy * a.dx
+
+    return (c > 0) - (c < 0)
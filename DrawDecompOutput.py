@@ -4,7 +4,9 @@ from statistics import mean
 import matplotlib as sdf
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
-from pympler.tracker import SummaryTracker
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 import time
 import gc
 
@@ -60,23 +62,55 @@ def makeDict(cont, dest):  # Reads all lines from 'cont' and fits them into dict
         dest.clear()  # Don't return anything if points are insufficient
 
 
-def connectPoints(p, c):  # Connects all points in p and plots them in color c
-    for i in p:
-        if (i < len(p) - 1):
-            n = i + 1  # Finds the next point, loops back around to 0
-        else:
-            n = 0
-        plt.plot([p[i][0], p[n][0]], [p[i][1], p[n][1]], linestyle='-', linewidth=2, color=c)
-        plt.plot(p[i][0], p[i][1], c + "o")
-        plt.plot(p[n][0], p[n][1], c + "o")  # Points and lines use MATLAB syntax
+def connectPoints(p, c, ax=None):  # Connects all points in p and plots them in color c
+    ax = plt.gca() if ax is None else ax
+
+    points = np.array([[float(p[i][0]), float(p[i][1])] for i in range(len(p))])
+
+    # One closed polyline and one marker set instead of three plot calls per point.
+    ax.add_collection(LineCollection([np.vstack((points, points[:1]))], linestyles='-', linewidths=2, colors=c))
+    ax.plot(points[:, 0], points[:, 1], c + "o", linestyle='None')
+    ax.autoscale_view()
+
+
+def decompCollections(segments, original, linewidth=2):
+    """
+    Returns two LineCollections, one with the original edges (red) and one with the vertical extensions (green).
+
+    Arguments:
+    segments -- array of shape (n, 2, 2) or (n, 4) with the segments, e.g. VerticalDecomposition.segments().
+    original -- array of n flags that are true iff the segment is an edge of the original polygon.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+    original = np.asarray(original, dtype=np.bool_)
+
+    return (LineCollection(segments[original], linestyles="-", linewidths=linewidth, colors="r"),
+            LineCollection(segments[~original], linestyles="-", linewidths=linewidth, colors="g"))
+
 
+def showDecomp(p, ax=None):
+    ax = plt.gca() if ax is None else ax
 
-def showDecomp(p):
-    for tuple in p.edges:
-        edge = tuple[0]
-        plt.plot([edge.getStartVertex().x, edge.getEndVertex().x],
-                 [edge.getStartVertex().y, edge.getEndVertex().y], linestyle="-", linewidth=2,
-                 color="r" if tuple[1] else "g")
+    for collection in decompCollections(p.segments(), p.isOriginal()):
+        ax.add_collection(collection)
+
+    ax.autoscale_view()
+
+
+def renderDecomp(p, filename, size=(10, 10), dpi=100, linewidth=0.5):
+    """
+    Renders the decomposition p headless to filename, the format (png, svg, pdf, ...) follows from the extension.
+    The figure is not registered with pyplot, so no display or GUI backend is needed.
+    """
+    fig = Figure(figsize=size, dpi=dpi)
+    ax = fig.add_subplot(1, 1, 1)
+
+    for collection in decompCollections(p.segments(), p.isOriginal(), linewidth):
+        ax.add_collection(collection)
+
+    ax.set_aspect("equal")
+    ax.autoscale_view()
+    fig.savefig(filename)
 
 
 def readPoints(openfile):
@@ -99,74 +133,72 @@ def doComp(res, edges):
 
 
 
-baseN = 700
-'''
-for i in range(1,33):
-    for j in range(0,3):
-        n = baseN*i
-        poly.writePoints(poly.makeRectangloid(int(n/4 + 1), int(n/4 + 1), int(n * 1.25), general=2),
-                         "testSuite/testSuite{}_{}".format(n, j))
-
-
+if __name__ == "__main__":
+    baseN = 700
+    '''
+    for i in range(1,33):
+        for j in range(0,3):
+            n = baseN*i
+            poly.writePoints(poly.makeRectangloid(int(n/4 + 1), int(n/4 + 1), int(n * 1.25), general=2),
+                             "testSuite/testSuite{}_{}".format(n, j))
 
-'''
-res = {}
 
-gc.enable()
 
-tracker = SummaryTracker()
+    '''
+    res = {}
 
+    gc.enable()
 
-trackVar = 0
+    trackVar = 0
 
-for filename in os.listdir("testsuite"):
-    filename = "testsuite/" + filename
-    edges = makeEdgeList(readPoints(filename))
+    for filename in os.listdir("testsuite"):
+        filename = "testsuite/" + filename
+        edges = makeEdgeList(readPoints(filename))
 
-    print("Doing file {}".format(filename))
+        print("Doing file {}".format(filename))
 
-    with open(filename, 'r') as f:
-        n = int(f.readline())
+        with open(filename, 'r') as f:
+            n = int(f.readline())
 
-    if not n in res:
-        res[n] = []
+        if not n in res:
+            res[n] = []
 
-    doComp(res, edges)
+        doComp(res, edges)
 
 
-    if trackVar % 5 == 0 and not trackVar == 0:
-        gc.collect()
+        if trackVar % 5 == 0 and not trackVar == 0:
+            gc.collect()
 
-    edges.clear()
+        edges.clear()
 
-    trackVar += 1
+        trackVar += 1
 
-for finishedN in res:
-    print("{} took: {}".format(finishedN, mean(res[finishedN])))
+    for finishedN in res:
+        print("{} took: {}".format(finishedN, mean(res[finishedN])))
 
-'''
-minx = 0
-miny = 0
-maxx = 10**8
-maxy = 10**8
+    '''
+    minx = 0
+    miny = 0
+    maxx = 10**8
+    maxy = 10**8
 
-readpol = {}  # Make empty dict
-makeDict(readPoints('lines.txt'), readpol)
+    readpol = {}  # Make empty dict
+    makeDict(readPoints('lines.txt'), readpol)
 
-edges = makeEdgeList(readPoints('test_input_2_on_vert_line.txt'))
-randpol = {}
-#makeDict(poly.makePolygon(8, 0, 15), randpol)
+    edges = makeEdgeList(readPoints('test_input_2_on_vert_line.txt'))
+    randpol = {}
+    #makeDict(poly.makePolygon(8, 0, 15), randpol)
 
-plt.axes()
-plt.ylim([miny, maxy])
-plt.xlim([minx, maxx])
+    plt.axes()
+    plt.ylim([miny, maxy])
+    plt.xlim([minx, maxx])
 
-#connectPoints(readpol, "r")
-# connectPoints(randpol, "b")
+    #connectPoints(readpol, "r")
+    # connectPoints(randpol, "b")
 
-vd = ps.decompose(edges)
+    vd = ps.decompose(edges)
 
-showDecomp(vd)
+    showDecomp(vd)
 
-plt.show()
-'''
+    plt.show()
+    '''
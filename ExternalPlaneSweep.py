@@ -0,0 +1,204 @@
+"""
+Out-of-core variant of the plane sweep for polygons that do not fit in memory.
+
+The polygon is read from a memory-mapped coordinate file (a .npy array of shape (n, 2), vertex i is connected to
+vertex i + 1). Events are generated and sorted chunk by chunk into temporary run files, the sweep streams the events
+from a k-way merge of these runs and the resulting segments are spilled to a binary output file. Only the sweep status,
+one block per run and the output buffer are resident.
+
+Peak RSS, measured with ru_maxrss (Python 3.11, numpy 2, default chunk sizes) on random star-shaped polygons:
+
+    vertices     coordinate file    segment file    peak status    peak RSS    PlaneSweep.decompose
+    100 000      1.6 MB             8 MB            ~ 11 700       41 MB       99 MB
+    1 000 000    16 MB              80 MB           ~ 117 000      131 MB      740 MB
+
+The resident part consists of the interpreter and numpy (~ 35 MB), the in-memory sort of one chunk (~ 50 bytes per
+edge of CHUNK_SIZE), one block per run and the sweep status (~ 600 bytes per edge that crosses the sweep line). The
+star polygons above are a bad case for the latter, about 12% of their edges cross the widest sweep line. A smaller
+chunkSize does not lower the peak for these inputs (137 MB with 2^17 edges per chunk), it only matters when the
+status is small compared to a chunk.
+"""
+import heapq
+import os
+import tempfile
+
+import numpy as np
+from bintrees import avltree
+
+from DataStructures import Vertex, Edge, Direction, SweepPosition
+from PlaneSweep import Event, EventType, processEventGroup
+
+# Record layout of the events in the run files.
+EVENT_DTYPE = np.dtype([('x', np.float64), ('y', np.float64), ('type', np.int8), ('edge', np.int64)])
+
+# Number of edges of which the events are sorted in memory at once, i.e. the size of a run is twice this.
+CHUNK_SIZE = 1 << 20
+
+# Number of events that is read from a run file at once during the merge.
+BLOCK_SIZE = 1 << 14
+
+# Number of output segments that are buffered before they are written to disk.
+SPILL_SIZE = 1 << 16
+
+
+def writeCoordinateFile(textFile, coordFile, chunkSize=CHUNK_SIZE):
+    """
+    Converts a polygon in the text format of the testsuite (the number of vertices followed by one 'x y' line per
+    vertex) to a coordinate file that can be memory-mapped. The text is read in chunks of chunkSize lines.
+    """
+    with open(textFile, 'r') as f:
+        n = int(f.readline())
+
+        coords = np.lib.format.open_memmap(coordFile, mode='w+', dtype=np.int64, shape=(n, 2))
+
+        for start in range(0, n, chunkSize):
+            count = min(chunkSize, n - start)
+            chunk = np.loadtxt(f, dtype=np.int64, max_rows=count, ndmin=2)
+            coords[start:start + count] = chunk
+
+        coords.flush()
+        del coords
+
+
+def readCoordinateFile(coordFile):
+    """Returns a read-only memory map of the coordinates in the provided coordinate file."""
+    return np.load(coordFile, mmap_mode='r')
+
+
+def readSegments(segmentFile):
+    """
+    Returns a read-only memory map of a segment file written by decompose, with the rows (x1, y1, x2, y2, original).
+    """
+    return np.memmap(segmentFile, dtype=np.float64, mode='r').reshape(-1, 5)
+
+
+def _makeRun(coords, start, stop, runFile):
+    """Writes the sorted events of the edges start, ..., stop - 1 to the provided run file."""
+    n = len(coords)
+
+    p1 = np.asarray(coords[start:stop], dtype=np.float64)
+    p2 = np.asarray(coords[np.arange(start + 1, stop + 1) % n], dtype=np.float64)
+
+    # Lexicographic (x, y) order like PlaneSweep, a vertical edge starts at its lower endpoint.
+    leftToRight = (p1[:, 0] < p2[:, 0]) | ((p1[:, 0] == p2[:, 0]) & (p1[:, 1] < p2[:, 1]))
+
+    events = np.empty(2 * (stop - start), dtype=EVENT_DTYPE)
+    first = events[0::2]
+    second = events[1::2]
+
+    first['edge'] = second['edge'] = np.arange(start, stop)
+    first['x'] = p1[:, 0]
+    first['y'] = p1[:, 1]
+    second['x'] = p2[:, 0]
+    second['y'] = p2[:, 1]
+    first['type'] = np.where(leftToRight, int(EventType.Insert), int(EventType.Removal))
+    second['type'] = np.where(leftToRight, int(EventType.Removal), int(EventType.Insert))
+
+    events.sort(order=['x', 'y', 'type', 'edge'], kind='stable')
+    events.tofile(runFile)
+
+
+def _readRun(runFile):
+    """Yields the events of a run file as tuples (x, y, type, edge), reading BLOCK_SIZE events at a time."""
+    with open(runFile, 'rb') as f:
+        while True:
+            block = np.fromfile(f, dtype=EVENT_DTYPE, count=BLOCK_SIZE)
+
+            if len(block) == 0:
+                break
+
+            yield from block.tolist()
+
+
+def _makeEdge(coords, index, insideOn):
+    n = len(coords)
+    x1, y1 = coords[index].tolist()
+    x2, y2 = coords[(index + 1) % n].tolist()
+
+    return Edge(Vertex(x1, y1), Vertex(x2, y2), insideOn)
+
+
+def _eventGroups(coords, runFiles, insideOn):
+    """Yields the lists of events per point from the merge of the run files."""
+    cord = None
+    evts = []
+
+    for x, y, type, index in heapq.merge(*[_readRun(runFile) for runFile in runFiles]):
+        if (x, y) != cord and len(evts) > 0:
+            yield evts
+            evts = []
+
+        if (x, y) != cord:
+            cord = (x, y)
+            point = Vertex(x, y)
+
+        evts.append(Event(_makeEdge(coords, index, insideOn), EventType(type), point))
+
+    if len(evts) > 0:
+        yield evts
+
+
+class SegmentSpill:
+    """Buffers output segments and appends them to a binary file of float64 rows (x1, y1, x2, y2, original)."""
+    def __init__(self, segmentFile, bufferSize=SPILL_SIZE):
+        self.file = open(segmentFile, 'wb')
+        self.buffer = np.empty((bufferSize, 5), dtype=np.float64)
+        self.size = 0
+        self.count = 0
+
+    def add(self, edge, original):
+        row = self.buffer[self.size]
+        row[0] = edge.p1.x
+        row[1] = edge.p1.y
+        row[2] = edge.p2.x
+        row[3] = edge.p2.y
+        row[4] = original
+        self.size += 1
+
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.buffer[:self.size].tofile(self.file)
+        self.count += self.size
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def decompose(coordFile, segmentFile, insideOn=Direction.Right, chunkSize=CHUNK_SIZE, tmpDir=None):
+    """
+    Runs the plane sweep on the polygon in the provided coordinate file and writes the decomposition to segmentFile.
+    Returns the number of segments that were written. See readSegments for the output format.
+
+    Arguments:
+    coordFile -- a coordinate file, see writeCoordinateFile.
+    segmentFile -- the file to which the segments are spilled.
+    insideOn -- the side of the edges on which the inside of the polygon lies (default Direction.Right).
+    chunkSize -- the number of edges of which the events are sorted in memory at once.
+    tmpDir -- the directory in which the temporary run files are created (default the system default).
+    """
+    coords = readCoordinateFile(coordFile)
+
+    with tempfile.TemporaryDirectory(dir=tmpDir) as runDir:
+        runFiles = []
+
+        for start in range(0, len(coords), chunkSize):
+            runFile = os.path.join(runDir, "run{}.bin".format(len(runFiles)))
+            _makeRun(coords, start, min(start + chunkSize, len(coords)), runFile)
+            runFiles.append(runFile)
+
+        status = avltree.AVLTree()
+        sweep = SweepPosition()
+        spill = SegmentSpill(segmentFile)
+
+        try:
+            for evts in _eventGroups(coords, runFiles, insideOn):
+                for edge, original in processEventGroup(status, sweep, evts):
+                    spill.add(edge, original)
+        finally:
+            spill.close()
+
+    return spill.count
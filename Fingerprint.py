@@ -0,0 +1,313 @@
+"""
+Canonical, order-independent fingerprints of vertical decompositions, to check that the engines agree.
+
+A decomposition is given as rows (x1, y1, x2, y2) with a flag per row that is true iff the segment is an edge of the
+polygon, like VerticalDecomposition stores it. The canonical form (see canonicalForm) does not depend on the order of
+the segments, the direction of a segment or on how an engine cuts the vertical extensions into pieces:
+    - the coordinates are rounded to a number of decimals, so walls computed with different floating point
+      operations get the same coordinates,
+    - the original edges are stored with their lexicographically smallest endpoint first, without duplicates,
+    - the vertical extensions are merged per x-coordinate into maximal intervals (x, y_low, y_high), without the
+      parts that lie on vertical edges of the polygon,
+    - other segments that are not original (e.g. the edges of a bounding box) are kept like the original edges.
+Every part is sorted with NumPy and the fingerprint is the BLAKE2b hash of the parts.
+
+The randomized incremental algorithm decomposes the whole bounding box, trapezoidSegments only keeps the trapezoids
+inside the polygon (see IncrementalDataStructure.label_interior) so its output can be compared with the output of the
+plane sweep.
+
+Usage:
+    python Fingerprint.py <polygon files ...> [--seed S]
+    python Fingerprint.py diff [files ...] [--max-n N] [--generator rectangloid sharkteeth] [--sizes N ...]
+                               [--repeats R] [--seeds K] [--seed S] [--workers W]
+The first form prints the fingerprints of both engines. The second form compares the engines on the files (by default
+the testsuite up to --max-n) and on generated polygons in a process pool, and exits with status 1 on a mismatch.
+"""
+import argparse
+import hashlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Benchmark
+import CorpusBuilder
+import PlaneSweep as ps
+import IncrementalDataStructure as ds
+import RandomizedIncremental as ri
+from DataStructures import Direction, sweepY
+
+# The number of decimals to which the coordinates are rounded.
+DECIMALS = 6
+
+
+def normalizeSegments(coordinates, decimals=DECIMALS):
+    """Returns the rounded (n, 4) rows with the lexicographically smallest endpoint of every segment first."""
+    # Adding 0.0 turns -0.0 into 0.0, which has a different byte representation.
+    coords = np.round(np.asarray(coordinates, dtype=np.float64).reshape(-1, 4), decimals) + 0.0
+
+    swap = (coords[:, 2] < coords[:, 0]) | ((coords[:, 2] == coords[:, 0]) & (coords[:, 3] < coords[:, 1]))
+    coords[swap] = coords[swap][:, [2, 3, 0, 1]]
+
+    return coords
+
+
+def uniqueRows(rows):
+    """Returns the distinct rows of the (n, k) array in lexicographic order."""
+    if len(rows) == 0:
+        return rows.reshape(0, rows.shape[1])
+
+    return np.unique(rows, axis=0)
+
+
+def mergeIntervals(x, low, high):
+    """
+    Returns the (m, 3) array of maximal intervals (x, low, high) of the union of the provided vertical intervals, in
+    lexicographic order. Intervals on the same x that overlap or touch are merged.
+    """
+    if len(x) == 0:
+        return np.empty((0, 3), dtype=np.float64)
+
+    order = np.lexsort((low, x))
+    x = x[order]
+    low = low[order]
+    high = high[order]
+
+    # The running maximum of high has to restart for every x, so it is taken over the keys group * R + rank(high),
+    # which are exact integers and increase with the group.
+    ys = np.unique(np.concatenate((low, high)))
+    lowRank = np.searchsorted(ys, low)
+    highRank = np.searchsorted(ys, high)
+    group = np.concatenate(([0], np.cumsum(x[1:] != x[:-1])))
+
+    reach = np.maximum.accumulate(group * len(ys) + highRank)
+    previous = np.concatenate(([-1], reach[:-1]))
+    start = (previous // len(ys) != group) | (lowRank > previous % len(ys))
+
+    starts = np.flatnonzero(start)
+
+    return np.stack((x[starts], low[starts], np.maximum.reduceat(high, starts)), axis=1)
+
+
+def subtractIntervals(intervals, removed):
+    """
+    Returns the maximal intervals (see mergeIntervals) of the union of the (k, 3) intervals (x, low, high) without
+    the union of the removed intervals.
+    """
+    # Sweep over the endpoints per x, counting how many intervals of both kinds cover the piece after every endpoint.
+    x = np.concatenate((intervals[:, 0], intervals[:, 0], removed[:, 0], removed[:, 0]))
+    y = np.concatenate((intervals[:, 1], intervals[:, 2], removed[:, 1], removed[:, 2]))
+    k = len(intervals)
+    m = len(removed)
+    kept = np.concatenate((np.ones(k, dtype=np.int64), -np.ones(k, dtype=np.int64), np.zeros(2 * m, dtype=np.int64)))
+    cut = np.concatenate((np.zeros(2 * k, dtype=np.int64), np.ones(m, dtype=np.int64), -np.ones(m, dtype=np.int64)))
+
+    order = np.lexsort((y, x))
+    x = x[order]
+    y = y[order]
+    kept = np.cumsum(kept[order])
+    cut = np.cumsum(cut[order])
+
+    piece = (x[:-1] == x[1:]) & (y[:-1] < y[1:]) & (kept[:-1] > 0) & (cut[:-1] == 0)
+
+    return mergeIntervals(x[:-1][piece], y[:-1][piece], y[1:][piece])
+
+
+def canonicalForm(coordinates, original, decimals=DECIMALS):
+    """
+    Returns the canonical form of the decomposition as a tuple (edges, extensions, other) of sorted arrays, see the
+    module documentation.
+    """
+    coords = normalizeSegments(coordinates, decimals)
+    original = np.asarray(original, dtype=bool)
+
+    edges = uniqueRows(coords[original])
+    onEdges = edges[edges[:, 0] == edges[:, 2]][:, [0, 1, 3]]
+
+    rest = coords[~original]
+    vertical = rest[:, 0] == rest[:, 2]
+    walls = rest[vertical & (rest[:, 1] < rest[:, 3])][:, [0, 1, 3]]
+
+    return edges, subtractIntervals(walls, onEdges), uniqueRows(rest[~vertical])
+
+
+def fingerprint(coordinates, original, decimals=DECIMALS):
+    """Returns the fingerprint (hexadecimal string) of the decomposition given as rows and original flags."""
+    digest = hashlib.blake2b(digest_size=20)
+
+    for part in canonicalForm(coordinates, original, decimals):
+        part = np.ascontiguousarray(part, dtype=np.float64)
+        digest.update(np.int64(len(part)).tobytes())
+        digest.update(part.tobytes())
+
+    return digest.hexdigest()
+
+
+def decompositionFingerprint(decomposition, decimals=DECIMALS):
+    """Returns the fingerprint of a VerticalDecomposition."""
+    return fingerprint(decomposition.coordinates(), decomposition.isOriginal(), decimals)
+
+
+def trapezoidSegments(trapezoids, edges, interiorOnly=True):
+    """
+    Returns the tuple (coordinates, original) of the segments of the trapezoids, like VerticalDecomposition stores
+    them: the top and bottom edges are original, the walls are not. If interiorOnly is true, only the trapezoids
+    inside the polygon are used, they are labelled by IncrementalDataStructure.label_interior if they are not yet.
+    """
+    tops = []
+    bottoms = []
+    walls = []
+    flags = []
+
+    if interiorOnly and any(trapezoid.inside is None for trapezoid in trapezoids):
+        trapezoids = ds.label_interior(trapezoids, edges)
+    elif interiorOnly:
+        trapezoids = [trapezoid for trapezoid in trapezoids if trapezoid.inside]
+
+    for trapezoid in trapezoids:
+        top = trapezoid.top
+        bottom = trapezoid.bottom
+        tops.append((top.p1.x, top.p1.y, top.p2.x, top.p2.y))
+        bottoms.append((bottom.p1.x, bottom.p1.y, bottom.p2.x, bottom.p2.y))
+        flags.append((top.insideOn != Direction.Undefined, bottom.insideOn != Direction.Undefined))
+
+        # The walls through the vertices that define them, see Trapezoid.wall_y.
+        left = trapezoid.leftp.origin
+        right = trapezoid.rightp.origin
+        walls.append((left.x, left.y, right.x, right.y))
+
+    tops = np.array(tops, dtype=np.float64).reshape(-1, 4)
+    bottoms = np.array(bottoms, dtype=np.float64).reshape(-1, 4)
+    walls = np.array(walls, dtype=np.float64).reshape(-1, 2, 2)
+
+    # The rows (x, y_bottom, x, y_top) of the left and right walls, empty walls are dropped by canonicalForm.
+    sides = []
+
+    for side in (0, 1):
+        points = walls[:, side]
+        sides.append(np.stack((points[:, 0], sweepY(bottoms, points), points[:, 0], sweepY(tops, points)), axis=1))
+
+    coordinates = np.concatenate([tops, bottoms] + sides)
+    original = np.concatenate((np.array(flags, dtype=bool).reshape(-1, 2).T.ravel(),
+                               np.zeros(2 * len(walls), dtype=bool)))
+
+    return coordinates, original
+
+
+def trapezoidFingerprint(trapezoids, edges, decimals=DECIMALS):
+    """
+    Returns the fingerprint of the interior trapezoids of the decomposition of the edges by the randomized incremental
+    algorithm.
+    """
+    return fingerprint(*trapezoidSegments(trapezoids, edges), decimals)
+
+
+def _loadEdges(source):
+    if source[0] == "file":
+        return Benchmark.readEdges(source[1])
+
+    _, generator, n, seed = source
+    points = CorpusBuilder.generate(generator, CorpusBuilder.generatorParams(generator, n), seed)
+
+    return Benchmark.polygonEdges(np.asarray(points).tolist())
+
+
+def describe(source):
+    """Returns a readable name of an input of the differential runner."""
+    if source[0] == "file":
+        return source[1]
+
+    return "{}(n={}, seed={})".format(*source[1:])
+
+
+def compareEngines(source, seeds=(0,)):
+    """
+    Decomposes the input with the plane sweep and with the randomized incremental algorithm for every seed and
+    compares the fingerprints. The input is ("file", filename) or ("generator", generator, n, seed).
+    Returns a dictionary with the fingerprints, the mismatching seeds and the times in seconds.
+    """
+    edges = _loadEdges(source)
+
+    start = time.perf_counter()
+    decomposition = ps.decompose(edges)
+    middle = time.perf_counter()
+    expected = decompositionFingerprint(decomposition)
+
+    result = {"input": describe(source), "n": len(edges), "ps": expected, "ri": {}, "mismatches": [],
+              "decompose_time": middle - start, "fingerprint_time": time.perf_counter() - middle}
+
+    for seed in seeds:
+        start = time.perf_counter()
+        trapezoids = ri.decompose_basic(edges, seed=seed)
+        middle = time.perf_counter()
+        actual = trapezoidFingerprint(trapezoids, edges)
+
+        result["decompose_time"] += middle - start
+        result["fingerprint_time"] += time.perf_counter() - middle
+        result["ri"][seed] = actual
+
+        if actual != expected:
+            result["mismatches"].append(seed)
+
+    return result
+
+
+def _compareEngines(args):
+    return compareEngines(*args)
+
+
+def differential(sources, seeds=(0,), workers=None):
+    """
+    Compares the engines on all inputs (see compareEngines) in a process pool.
+    Yields the results in the order of the inputs.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_compareEngines, [(source, seeds) for source in sources])
+
+
+def generatedSources(generators, sizes, repeats=1, seed=0):
+    """Returns the generated inputs, with seeds derived like the corpus of CorpusBuilder."""
+    return [("generator", generator, n, CorpusBuilder.deriveSeed(seed, generator, n, repeat))
+            for generator in generators for n in sizes for repeat in range(repeats)]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "diff":
+        parser = argparse.ArgumentParser(description="Compares the output of the engines by fingerprint.")
+        parser.add_argument("files", nargs="*")
+        parser.add_argument("--max-n", type=int, default=2100)
+        parser.add_argument("--generator", choices=CorpusBuilder.GENERATORS, nargs="*",
+                            default=list(CorpusBuilder.GENERATORS))
+        parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000])
+        parser.add_argument("--repeats", type=int, default=2)
+        parser.add_argument("--seeds", type=int, default=2)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--workers", type=int, default=None)
+        args = parser.parse_args(sys.argv[2:])
+
+        files = args.files if len(args.files) > 0 else Benchmark.testsuiteFiles(maxN=args.max_n)
+        sources = [("file", filename) for filename in files] + \
+            generatedSources(args.generator, args.sizes, args.repeats, args.seed)
+
+        mismatches = 0
+
+        for result in differential(sources, tuple(range(args.seeds)), args.workers):
+            status = "ok" if len(result["mismatches"]) == 0 else "MISMATCH (seeds {})".format(result["mismatches"])
+            print("{:<45} n={:<7} {}  fingerprint {:.1f} ms  {}".format(
+                result["input"], result["n"], result["ps"][:12], result["fingerprint_time"] * 1000.0, status))
+            mismatches += len(result["mismatches"]) > 0
+
+        print("\n{} of {} inputs mismatch".format(mismatches, len(sources)))
+        sys.exit(1 if mismatches > 0 else 0)
+    else:
+        parser = argparse.ArgumentParser(description="Prints the fingerprints of the decompositions of the engines.")
+        parser.add_argument("files", nargs="+")
+        parser.add_argument("--seed", type=int, default=0)
+        args = parser.parse_args()
+
+        for filename in args.files:
+            edges = Benchmark.readEdges(filename)
+
+            print("{}\n    ps {}\n    ri {}".format(filename, decompositionFingerprint(ps.decompose(edges)),
+                                                    trapezoidFingerprint(ri.decompose_basic(edges, seed=args.seed), edges)))
@@ -1,8 +1,14 @@
 """
 Contains the data structure that can be used for an incremental trapezoidal decomposition.
 It is for instance used by the randomized incremental algorithm.
+
+The structure does not contain reference cycles: the search structure owns the trapezoids through its leaves, while
+a trapezoid only refers weakly to its node and to its neighbors. Trapezoids that are replaced are therefore freed by
+reference counting and the cyclic garbage collector can be disabled while a decomposition is built.
 """
-from DataStructures import Direction, Vertex, Edge
+from weakref import ref
+
+from DataStructures import Direction, Vertex, WallVertex, Edge, SweepKey, SweepPosition
 
 class Node:
     """A generic node."""
@@ -56,7 +62,7 @@ class TrapezoidSearchStructure:
         self.right = right
 
         if isinstance(self.root, TrapezoidLeaf):
-            self.root.trapezoid()._node = self
+            self.root.trapezoid()._node = ref(self)
 
     @staticmethod
     def from_bounding_box(bounding_box):
@@ -66,16 +72,21 @@ class TrapezoidSearchStructure:
     @staticmethod
     def insert(new_trapezoids, edge):
         """
-        Inserts the new trapezoids after the insertion of the specified edge.
-        Returns a new search structure if the complete search structure has changed.
-        Otherwise the existing search structure is altered.
+        Inserts the new trapezoids after the insertion of the specified edge, the search structure is altered.
+        Returns the maximum depth of the leaves of the new trapezoids.
         """
+        depth = 0
+
         for trapezoid in new_trapezoids:
             t_node = trapezoid.original.ref_node()
 
             tss = trapezoid.as_search_structure(edge)
             t_node.replace(tss)
 
+            depth = max(depth, trapezoid.assign_depths())
+
+        return depth
+
     def point_location_query(self, vertex):
         """
         Runs a point location query on the tree with the specified vertex.
@@ -85,7 +96,8 @@ class TrapezoidSearchStructure:
         matches = set()
 
         if isinstance(node, XNode):
-            if vertex.x <= node.vertex().x:
+            # Vertices are compared lexicographically, this is the symbolic shear of DataStructures.Vertex.
+            if vertex <= node.vertex():
                 matches |= self.left.point_location_query(vertex)
             else:
                 matches |= self.right.point_location_query(vertex)
@@ -117,7 +129,7 @@ class TrapezoidSearchStructure:
         if isinstance(self.root, TrapezoidLeaf):
             self.root.trapezoid()._node = None
         if isinstance(tss.root, TrapezoidLeaf):
-            tss.root.trapezoid()._node = self
+            tss.root.trapezoid()._node = ref(self)
 
         self.root = tss.root
 
@@ -138,10 +150,47 @@ class TrapezoidSearchStructure:
 
         return leafs
 
+class NeighborList:
+    """
+    A list of the neighbors of a trapezoid that only holds weak references to them, the trapezoids are owned by the
+    search structure. Membership and removal compare the trapezoids themselves, like a list of trapezoids.
+    """
+    def __init__(self, trapezoids=()):
+        if isinstance(trapezoids, NeighborList):
+            self._refs = list(trapezoids._refs)
+        else:
+            self._refs = [ref(trapezoid) for trapezoid in trapezoids]
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __iter__(self):
+        for trapezoid_ref in self._refs:
+            yield trapezoid_ref()
+
+    def __contains__(self, trapezoid):
+        return ref(trapezoid) in self._refs
+
+    def append(self, trapezoid):
+        """Adds the provided trapezoid to the neighbors."""
+        self._refs.append(ref(trapezoid))
+
+    def remove(self, trapezoid):
+        """Removes the provided trapezoid from the neighbors, a ValueError is raised if it is not a neighbor."""
+        self._refs.remove(ref(trapezoid))
+
 class Trapezoid:
     """A trapezoid defined by two vertices and two edges."""
     def __init__(self, leftp, rightp, top, bottom, neighbors_left, neighbors_right):
-        self._node = TrapezoidSearchStructure(TrapezoidLeaf(self))
+        # The node in the search structure is created when it is first requested, see ref_node.
+        self._node = None
+        # The number of inner nodes on the longest path from the root of the search structure to this trapezoid.
+        self.depth = 0
+        # True if the trapezoid lies inside the polygon, set by label_interior.
+        self.inside = None
         self.leftp = leftp
         self.rightp = rightp
         self.top = top
@@ -163,71 +212,113 @@ class Trapezoid:
     def __neq__(self, other):
         return not self == other
 
+    @property
+    def neighbors_left(self):
+        """Returns the trapezoids that border this trapezoid on the left."""
+        return self._neighbors_left
+
+    @neighbors_left.setter
+    def neighbors_left(self, trapezoids):
+        self._neighbors_left = NeighborList(trapezoids)
+
+    @property
+    def neighbors_right(self):
+        """Returns the trapezoids that border this trapezoid on the right."""
+        return self._neighbors_right
+
+    @neighbors_right.setter
+    def neighbors_right(self, trapezoids):
+        self._neighbors_right = NeighborList(trapezoids)
+
     def ref_node(self):
         """
         Returns the reference to the nodes that contains this trapezoid.
+        The node is created if the trapezoid is not (or no longer) part of a search structure. Only a weak reference
+        to it is kept, so it has to be added to a search structure to stay alive.
         """
-        return self._node
+        node = self._node() if self._node is not None else None
+
+        if node is None:
+            node = TrapezoidSearchStructure(TrapezoidLeaf(self))
+
+        return node
 
     def top_left(self):
         """Returns the left top vertex of the trapezoid."""
         # Find the y-value on the top edge.
-        x_left = self.leftp.x
+        vertex = self.leftp
 
-        if x_left < self.top.getStartVertex().x or self.top.getEndVertex().x < x_left:
+        if vertex < self.top.getStartVertex() or self.top.getEndVertex() < vertex:
             raise ValueError('The left point lies outside the top edge.')
 
-        y_top = self.top.getCorrespondingYValue(x_left)
+        y_top = Trapezoid.wall_y(self.top, vertex)
 
-        if y_top is None:
-            raise ValueError('The top edge is vertical.')
-
-        return Vertex(x_left, y_top)
+        return Vertex(vertex.x, y_top)
 
     def top_right(self):
         """Returns the right top vertex of the trapezoid."""
         # Find the y-value on the top edge.
-        x_right = self.rightp.x
+        vertex = self.rightp
 
-        if x_right < self.top.getStartVertex().x or self.top.getEndVertex().x < x_right:
+        if vertex < self.top.getStartVertex() or self.top.getEndVertex() < vertex:
             raise ValueError('The right point lies outside the top edge.')
 
-        y_top = self.top.getCorrespondingYValue(x_right)
-
-        if y_top is None:
-            raise ValueError('The top edge is vertical.')
+        y_top = Trapezoid.wall_y(self.top, vertex)
 
-        return Vertex(x_right, y_top)
+        return Vertex(vertex.x, y_top)
 
     def bottom_left(self):
         """Returns the bottom left vertex of the trapezoid."""
         # Find the y-value on the bototm edge.
-        x_left = self.leftp.x
+        vertex = self.leftp
 
-        if x_left < self.bottom.getStartVertex().x or self.bottom.getEndVertex().x < x_left:
+        if vertex < self.bottom.getStartVertex() or self.bottom.getEndVertex() < vertex:
             raise ValueError('The left point lies outside the bottom edge.')
 
-        y_bottom = self.bottom.getCorrespondingYValue(x_left)
+        y_bottom = Trapezoid.wall_y(self.bottom, vertex)
 
-        if y_bottom is None:
-            raise ValueError('The bottom edge is vertical.')
-
-        return Vertex(x_left, y_bottom)
+        return Vertex(vertex.x, y_bottom)
 
     def bottom_right(self):
         """Returns the bottom right vertex of the trapezoid."""
         # Find the y-value on the bottom edge.
-        x_right = self.rightp.x
+        vertex = self.rightp
 
-        if x_right < self.bottom.getStartVertex().x or self.bottom.getEndVertex().x < x_right:
+        if vertex < self.bottom.getStartVertex() or self.bottom.getEndVertex() < vertex:
             raise ValueError('The right point lies outside the bottom edge.')
 
-        y_bottom = self.bottom.getCorrespondingYValue(x_right)
+        y_bottom = Trapezoid.wall_y(self.bottom, vertex)
+
+        return Vertex(vertex.x, y_bottom)
+
+    @staticmethod
+    def wall_y(edge, vertex):
+        """
+        Returns the y-value of the provided edge on the vertical wall through the provided vertex.
+        A vertical edge is crossed at the y-value of the vertex (clamped to the edge), see Edge.yAtSweep.
+        """
+        if edge.is_vertical():
+            return edge.yAtSweep(vertex)
+
+        return edge.getCorrespondingYValue(vertex.x)
 
-        if y_bottom is None:
-            raise ValueError('The bottom edge is vertical.')
+    @staticmethod
+    def share_wall(trapezoid, other, vertex):
+        """
+        Returns true if the two trapezoids, which lie on opposite sides of the wall through the provided vertex,
+        border each other. This is the case if their parts of the wall overlap in more than a point.
+        """
+        return Trapezoid.walls_overlap(
+            trapezoid.bottom, trapezoid.top, other.bottom, other.top, SweepPosition(vertex.origin, 0))
 
-        return Vertex(x_right, y_bottom)
+    @staticmethod
+    def walls_overlap(bottom, top, other_bottom, other_top, sweep):
+        """
+        Returns true if the part of the wall between bottom and top overlaps the part between other_bottom and
+        other_top in more than a point. The wall is given as sweep position at its defining vertex with side 0.
+        """
+        return SweepKey(bottom, sweep) < SweepKey(other_top, sweep) and \
+            SweepKey(other_bottom, sweep) < SweepKey(top, sweep)
 
     def left(self):
         """Returns the left edge of the trapezoid."""
@@ -280,7 +371,12 @@ class Trapezoid:
         return Edge(bottom_r, bottom_l, self.bottom.insideOn)
 
     def get_number_of_intersections(self, edge):
-        """Returns the number of intersections that the provided edge has with this trapezoid."""
+        """
+        Returns the number of intersections that the provided edge has with this trapezoid: 0 if the edge misses the
+        trapezoid or lies completely inside it, 1 if one of its vertices lies inside it and 2 if it crosses it.
+        The test is combinatorial (see DataStructures.SweepKey) so it also holds for vertical edges and walls that
+        share an x-coordinate.
+        """
         p1_con = self.contains_vertex(edge.p1)
         p2_con = self.contains_vertex(edge.p2)
 
@@ -291,48 +387,21 @@ class Trapezoid:
             # The trapezoid contains one vertex.
             return 1
 
-        top = self.top_segment()
-        right = self.right()
-        bottom = self.bottom_segment()
-        left = self.left()
-
-        top_left = top.getStartVertex()
-        top_right = top.getEndVertex()
-        bottom_left = bottom.getStartVertex()
-        bottom_right = bottom.getEndVertex()
-
-        top_left_int = top_left.lies_on(edge)
-        top_right_int = top_right.lies_on(edge)
-        bottom_left_int = left is not None and top_left != bottom_left and bottom_left.lies_on(edge)
-        bottom_right_int = right is not None and top_right != bottom_right and bottom_right.lies_on(edge)
-
-        # Determine the number of vertex intersections.
-        vertex_ints = top_left_int + top_right_int + bottom_left_int + bottom_right_int
-
-        if vertex_ints == 2:
-            # There are two vertex intersections. There cannot be any more.
-            return 2
-
-        # Determine the edge intersections.
-        top_int = top.intersects(edge)
-        right_int = False if right is None else right.intersects(edge)
-        bottom_int = bottom.intersects(edge)
-        left_int = False if left is None else left.intersects(edge)
-
-        # There are two intersections opposite of each other.
-        if (right_int and left_int) or (top_int and bottom_int):
-            return 2
-        elif right_int and (top_left_int or bottom_left_int):
-            return 2
-        elif left_int and (top_right_int or bottom_right_int):
-            return 2
-        elif top_int and (bottom_left_int or bottom_right_int):
-            return 2
-        elif bottom_int and (top_left_int or top_right_int):
-            return 2
-
-        # Subtract the vertex intersections as these are also included in the edge intersections.
-        return (top_int + right_int + bottom_int + left_int) - vertex_ints
+        # Determine the part of the edge between the left and right wall of the trapezoid.
+        start = max(edge.getStartVertex(), self.leftp)
+        end = min(edge.getEndVertex(), self.rightp)
+
+        if start.sweepOrder() == end.sweepOrder():
+            # The edge only touches the wall through one of its vertices.
+            return 1
+        if end < start:
+            return 0
+
+        # The edge crosses the trapezoid if it lies between the top and bottom edge just after the start of this part.
+        sweep = SweepPosition(Vertex(*start.sweepOrder()), 1)
+        key = SweepKey(edge, sweep)
+
+        return 2 if SweepKey(self.bottom, sweep) < key < SweepKey(self.top, sweep) else 0
 
     def is_intersected_by(self, edge):
         """Returns true if the provided edge intersects this trapezoid."""
@@ -340,11 +409,19 @@ class Trapezoid:
 
     def contains_vertex(self, vertex):
         """Returns tue if this trapezoids strictly contains the provided vertex."""
-        return self.leftp.x < vertex.x and vertex.x < self.rightp.x and \
+        return self.leftp < vertex and vertex < self.rightp and \
             vertex.lies_below(self.top) and vertex.liesAbove(self.bottom)
 
-    def split(self, edge):
-        """Splits this trapezoid over the specified edge."""
+    def split(self, edge, previous=None):
+        """
+        Splits this trapezoid over the specified edge.
+        Returns the split or None if this trapezoid is not split by the edge.
+
+        Arguments:
+        edge -- the edge that is inserted.
+        previous -- the split of the trapezoid to the left of this one along the edge (default None). Its top and
+            bottom trapezoid are extended over this trapezoid if they would be merged, see can_extend.
+        """
         nr_of_intersections = self.get_number_of_intersections(edge)
 
         if nr_of_intersections == 0:
@@ -357,7 +434,7 @@ class Trapezoid:
                     rightp=edge.getStartVertex(),
                     top=self.top,
                     bottom=self.bottom,
-                    neighbors_left=list(self.neighbors_left),
+                    neighbors_left=self.neighbors_left,
                     neighbors_right=[])
 
                 # Update the neighbors of the original trapezoid.
@@ -371,7 +448,7 @@ class Trapezoid:
                     top=self.top,
                     bottom=self.bottom,
                     neighbors_left=[],
-                    neighbors_right=list(self.neighbors_right))
+                    neighbors_right=self.neighbors_right)
 
                 # Update the neighbors of the original trapezoid.
                 for neighbor in t_r.neighbors_right:
@@ -412,38 +489,23 @@ class Trapezoid:
             if self.contains_vertex(edge.getStartVertex()):
                 # Vertically split this trapezoid such that there is an empty trapezoid.
                 # e.g. does not contain a vertex of the edge.
+                # Its right neighbor is the part that is split horizontally below, which still is this trapezoid.
                 empty_trapezoid = Trapezoid(
                     leftp=self.leftp,
                     rightp=edge.getStartVertex(),
                     top=self.top,
                     bottom=self.bottom,
-                    neighbors_left=list(self.neighbors_left),
-                    neighbors_right=[])
+                    neighbors_left=self.neighbors_left,
+                    neighbors_right=[self])
 
                 # Replace the split trapezoid in its neighbors.
                 for neighbor in empty_trapezoid.neighbors_left:
                     neighbor.neighbors_right.remove(self)
                     neighbor.neighbors_right.append(empty_trapezoid)
 
-                # Construct the other trapezoid resulting from the vertical split.
-                # This trapezoid is to be split horizontally. (Note the recursive call.)
-                horizontal_split = Trapezoid(
-                    leftp=edge.getStartVertex(),
-                    rightp=self.rightp,
-                    top=self.top,
-                    bottom=self.bottom,
-                    neighbors_left=[empty_trapezoid],
-                    neighbors_right=list(self.neighbors_right))
-
-                # Set the right neighbor of the empty trapezoid to this new trapezoid.
-                empty_trapezoid.neighbors_right = [horizontal_split]
-
-                # Replace the split trapezoid in its neighbors.
-                for neighbor in horizontal_split.neighbors_right:
-                    neighbor.neighbors_left.remove(self)
-                    neighbor.neighbors_left.append(horizontal_split)
-
-                horizontal_splits = horizontal_split.split(edge)
+                # Split the other part of this trapezoid horizontally.
+                horizontal_splits = self.split_horizontally(
+                    edge, edge.getStartVertex(), self.rightp, [empty_trapezoid], self.neighbors_right, previous)
 
                 return TrapezoidSplit(
                     original=self,
@@ -453,38 +515,23 @@ class Trapezoid:
             elif self.contains_vertex(edge.getEndVertex()):
                 # Vertically split this trapezoid such that there is an empty trapezoid.
                 # e.g. does not contain a vertex of the edge.
+                # Its left neighbor is the part that is split horizontally below, which still is this trapezoid.
                 empty_trapezoid = Trapezoid(
                     leftp=edge.getEndVertex(),
                     rightp=self.rightp,
                     top=self.top,
                     bottom=self.bottom,
-                    neighbors_left=[],
-                    neighbors_right=list(self.neighbors_right))
+                    neighbors_left=[self],
+                    neighbors_right=self.neighbors_right)
 
                 # Replace the split trapezoid in its neighbors.
                 for neighbor in empty_trapezoid.neighbors_right:
                     neighbor.neighbors_left.remove(self)
                     neighbor.neighbors_left.append(empty_trapezoid)
 
-                # Construct the other trapezoid resulting from the vertical split.
-                horizontal_split = Trapezoid(
-                    leftp=self.leftp,
-                    rightp=edge.getEndVertex(),
-                    top=self.top,
-                    bottom=self.bottom,
-                    neighbors_left=list(self.neighbors_left),
-                    neighbors_right=[empty_trapezoid])
-
-                # Set the left neighbor of the empty trapezoid to this new trapezoid.
-                empty_trapezoid.neighbors_left = [horizontal_split]
-
-                # Replace the split trapezoid in its neighbors.
-                for neighbor in horizontal_split.neighbors_left:
-                    neighbor.neighbors_right.remove(self)
-                    neighbor.neighbors_right.append(horizontal_split)
-
-                # This trapezoid is to be split horizontally. (Note the recursive call.)
-                horizontal_splits = horizontal_split.split(edge)
+                # Split the other part of this trapezoid horizontally.
+                horizontal_splits = self.split_horizontally(
+                    edge, self.leftp, edge.getEndVertex(), self.neighbors_left, [empty_trapezoid], previous)
 
                 return TrapezoidSplit(
                     original=self,
@@ -496,182 +543,159 @@ class Trapezoid:
                 return None
         else:
             # The edge crosses this whole trapezoid. Split this trapezoid horizontally.
-            # First determine the left- and right vertex of the top and bottom trapezoid.
-            if self.leftp.isVertexOf(edge):
-                leftp_t = self.leftp
-                leftp_b = self.leftp
-            if self.leftp.liesAbove(edge):
-                leftp_t = self.leftp
-                leftp_b = Vertex(self.leftp.x, self.bottom.getCorrespondingYValue(self.leftp.x))
-            else:
-                leftp_t = Vertex(self.leftp.x, self.top.getCorrespondingYValue(self.leftp.x))
-                leftp_b = self.leftp
-
-            if self.rightp.isVertexOf(edge):
-                rightp_t = self.rightp
-                rightp_b = self.rightp
-            elif self.rightp.liesAbove(edge):
-                rightp_t = self.rightp
-                rightp_b = Vertex(self.rightp.x, self.bottom.getCorrespondingYValue(self.rightp.x))
-            else:
-                rightp_t = Vertex(self.rightp.x, self.top.getCorrespondingYValue(self.rightp.x))
-                rightp_b = self.rightp
-
-            # Next, determine the left- and right vertex of the intersecting edge.
-            leftp_edge = Vertex(self.leftp.x, edge.getCorrespondingYValue(self.leftp.x))
-            rightp_edge = Vertex(self.rightp.x, edge.getCorrespondingYValue(self.rightp.x))
-
-            # Give preference to an actually existing vertex.
-            # If the vertex on the intersecting edge is not a fake,
-            # while the one determined above is, override it.
-            if leftp_edge.isVertexOf(edge):
-                if not leftp_t.isVertexOf(self.top):
-                    leftp_t = leftp_edge
-                if not leftp_b.isVertexOf(self.bottom):
-                    leftp_b = leftp_edge
-            if rightp_edge.isVertexOf(edge):
-                if not rightp_t.isVertexOf(self.top):
-                    rightp_t = rightp_edge
-                if not rightp_b.isVertexOf(self.bottom):
-                    rightp_b = rightp_edge
+            return self.split_horizontally(
+                edge, self.leftp, self.rightp, self.neighbors_left, self.neighbors_right, previous)
+
+    def split_horizontally(self, edge, leftp, rightp, neighbors_left, neighbors_right, previous=None):
+        """
+        Splits the part of this trapezoid between the walls through leftp and rightp horizontally over the specified
+        edge, which crosses this part. Returns the split into a top and bottom trapezoid.
 
+        Arguments:
+        edge -- the edge that is inserted.
+        leftp -- the vertex that defines the left wall of the part.
+        rightp -- the vertex that defines the right wall of the part.
+        neighbors_left -- the left neighbors of the part, this trapezoid is replaced in their neighbors.
+        neighbors_right -- the right neighbors of the part, this trapezoid is replaced in their neighbors.
+        previous -- the split of the trapezoid to the left of this one along the edge (default None).
+        """
+        # First determine the left- and right vertex of the top and bottom trapezoid.
+        if leftp.origin.isVertexOf(edge):
+            leftp_t = leftp
+            leftp_b = leftp
+        if leftp.origin.liesAbove(edge):
+            leftp_t = leftp
+            leftp_b = WallVertex(leftp.x, Trapezoid.wall_y(self.bottom, leftp), leftp)
+        else:
+            leftp_t = WallVertex(leftp.x, Trapezoid.wall_y(self.top, leftp), leftp)
+            leftp_b = leftp
+
+        if rightp.origin.isVertexOf(edge):
+            rightp_t = rightp
+            rightp_b = rightp
+        elif rightp.origin.liesAbove(edge):
+            rightp_t = rightp
+            rightp_b = WallVertex(rightp.x, Trapezoid.wall_y(self.bottom, rightp), rightp)
+        else:
+            rightp_t = WallVertex(rightp.x, Trapezoid.wall_y(self.top, rightp), rightp)
+            rightp_b = rightp
+
+        # Next, determine the left- and right vertex of the intersecting edge.
+        leftp_edge = WallVertex(leftp.x, Trapezoid.wall_y(edge, leftp), leftp)
+        rightp_edge = WallVertex(rightp.x, Trapezoid.wall_y(edge, rightp), rightp)
+
+        # Give preference to an actually existing vertex.
+        # If the vertex on the intersecting edge is not a fake,
+        # while the one determined above is, override it.
+        # The wall is compared on its defining vertex, a fake point can have the coordinates of a vertex with the
+        # same x-coordinate.
+        if leftp.origin.isVertexOf(edge):
+            if not leftp_t.isVertexOf(self.top):
+                leftp_t = leftp_edge
+            if not leftp_b.isVertexOf(self.bottom):
+                leftp_b = leftp_edge
+        if rightp.origin.isVertexOf(edge):
+            if not rightp_t.isVertexOf(self.top):
+                rightp_t = rightp_edge
+            if not rightp_b.isVertexOf(self.bottom):
+                rightp_b = rightp_edge
+
+        # Determine which left neighbors border the top and the bottom part before anything is allocated. If the
+        # wall with the previous split is removed, the trapezoid of the previous split is extended instead of
+        # creating a new trapezoid and merging it afterwards.
+        sweep = SweepPosition(leftp.origin, 0)
+        shares_left = [(neighbor,
+                        Trapezoid.walls_overlap(neighbor.bottom, neighbor.top, edge, self.top, sweep),
+                        Trapezoid.walls_overlap(neighbor.bottom, neighbor.top, self.bottom, edge, sweep))
+                       for neighbor in neighbors_left]
+
+        t_top = None
+        t_bottom = None
+
+        if previous is not None:
+            if previous.top.can_extend(self, self.top, edge, [n for n, top, _ in shares_left if top]):
+                t_top = previous.top
+            if previous.bottom.can_extend(self, edge, self.bottom, [n for n, _, bottom in shares_left if bottom]):
+                t_bottom = previous.bottom
+
+        if t_top is None:
             t_top = Trapezoid(leftp_t, rightp_t, self.top, edge, [], [])
+        else:
+            t_top.rightp = rightp_t
+
+        if t_bottom is None:
             t_bottom = Trapezoid(leftp_b, rightp_b, edge, self.bottom, [], [])
+        else:
+            t_bottom.rightp = rightp_b
+
+        # Determine the neighbors of these new trapezoids.
+        for neighbor, shares_top, shares_bottom in shares_left:
+            # Remove this split trapezoid from its left neighbors.
+            neighbor.neighbors_right.remove(self)
+
+            for t_new, shares in ((t_top, shares_top), (t_bottom, shares_bottom)):
+                if shares and t_new is not neighbor:
+                    neighbor.neighbors_right.append(t_new)
+                    t_new.neighbors_left.append(neighbor)
+
+        sweep = SweepPosition(rightp.origin, 0)
 
-            # Determine the neighbors of these new trapezoids.
-            for neighbor in self.neighbors_left:
-                # Remove this split trapezoid from its left neighbors.
-                neighbor.neighbors_right.remove(self)
-
-                # If the trapezoid lies both above and below the new edge.
-                if edge.lies_above(neighbor.bottom) and neighbor.top.lies_above(edge):
-                    t_top.neighbors_left.append(neighbor)
-                    t_bottom.neighbors_left.append(neighbor)
-
-                    neighbor.neighbors_right.append(t_top)
-                    neighbor.neighbors_right.append(t_bottom)
-                else:
-                    if neighbor.rightp == t_top.leftp or \
-                            neighbor.top == t_top.top or \
-                            neighbor.bottom == t_top.bottom or \
-                            neighbor.bottom.lies_above(edge):
-
-                        neighbor.neighbors_right.append(t_top)
-                        t_top.neighbors_left.append(neighbor)
-
-                    if neighbor.rightp == t_bottom.leftp or \
-                            neighbor.top == t_bottom.top or \
-                            neighbor.bottom == t_bottom.bottom or \
-                            edge.lies_above(neighbor.top):
-
-                        neighbor.neighbors_right.append(t_bottom)
-                        t_bottom.neighbors_left.append(neighbor)
-
-            for neighbor in self.neighbors_right:
-                # Remove this split trapezoid from its right neighbors.
-                neighbor.neighbors_left.remove(self)
-
-                # If the trapezoid lies both above and below the new edge.
-                if edge.lies_above(neighbor.bottom) and neighbor.top.lies_above(edge):
-                    t_top.neighbors_right.append(neighbor)
-                    t_bottom.neighbors_right.append(neighbor)
-
-                    neighbor.neighbors_left.append(t_top)
-                    neighbor.neighbors_left.append(t_bottom)
-                else:
-                    if neighbor.leftp == t_top.rightp or \
-                            neighbor.top == t_top.top or \
-                            neighbor.bottom == t_top.bottom or \
-                            neighbor.bottom.lies_above(edge):
-
-                        neighbor.neighbors_left.append(t_top)
-                        t_top.neighbors_right.append(neighbor)
-
-                    if neighbor.leftp == t_bottom.rightp or \
-                            neighbor.top == t_bottom.top or \
-                            neighbor.bottom == t_bottom.bottom or \
-                            edge.lies_above(neighbor.top):
-
-                        neighbor.neighbors_left.append(t_bottom)
-                        t_bottom.neighbors_right.append(neighbor)
-
-            return TrapezoidSplit(
-                original=self,
-                top=t_top,
-                bottom=t_bottom)
+        for neighbor in neighbors_right:
+            # Remove this split trapezoid from its right neighbors.
+            neighbor.neighbors_left.remove(self)
+
+            for t_new in (t_top, t_bottom):
+                if Trapezoid.walls_overlap(neighbor.bottom, neighbor.top, t_new.bottom, t_new.top, sweep):
+                    neighbor.neighbors_left.append(t_new)
+                    t_new.neighbors_right.append(neighbor)
+
+        return TrapezoidSplit(
+            original=self,
+            top=t_top,
+            bottom=t_bottom)
 
     @staticmethod
     def split_all(trapezoids, edge):
         """
-        Splits all provided trapezoids over the specified edge.
-        Returns a collection of splitted trapezoids.
+        Splits all provided trapezoids, ordered along the edge, over the specified edge.
+        Returns a collection of splitted trapezoids, in which the top and bottom trapezoids are already merged.
         """
         result = []
+        previous = None
 
         for trapezoid in trapezoids:
-            splitted = trapezoid.split(edge)
+            splitted = trapezoid.split(edge, previous)
 
             if splitted is not None:
                 result.append(splitted)
+                previous = splitted
 
         return result
 
-    def can_merge(self, other):
+    def can_extend(self, trapezoid, top, bottom, neighbors):
         """
-        Returns true if this trapezoid can be merged with the other trapezoid.
-        Otherwise false is returned.
+        Returns true if this trapezoid, which was created by the split of the previous trapezoid, can be extended over
+        the part between top and bottom of the provided trapezoid that is being split. This is the case if they would
+        be merged: they have the same top and bottom edge, the wall between them is fake and they are each others
+        only neighbors.
+
+        Arguments:
+        trapezoid -- the trapezoid that is being split, it lies right of this trapezoid.
+        top -- the top edge of the part of the trapezoid.
+        bottom -- the bottom edge of the part of the trapezoid.
+        neighbors -- the trapezoids that border the part on the left.
         """
         # They both need to have the same top and bottom edge.
-        if self.top == other.top and self.bottom == other.bottom:
-            # Check that they trapezoids are each others only neighbors.
-            if len(self.neighbors_left) == 1 and other in self.neighbors_left and \
-                    len(other.neighbors_right) == 1 and self in other.neighbors_right:
-                # Verify whether the edge between them if fake.
-                return (not self.top_left().isVertexOf(self.top)) and \
-                    (not self.bottom_left().isVertexOf(self.bottom))
-            elif len(self.neighbors_right) == 1 and other in self.neighbors_right and \
-                    len(other.neighbors_left) == 1 and self in other.neighbors_left:
-                # Verify whether the edge between them if fake.
-                return (not self.top_right().isVertexOf(self.top)) and \
-                    (not self.bottom_right().isVertexOf(self.bottom))
-
-        return False
-
-    def merge(self, other):
-        """
-        Merges this trapezoid with the provided trapezoid if possible.
-        If the merge was performed, then the merged trapezoid is returned.
-        Otherwise None is returned.
-        """
-        if self.can_merge(other):
-            if other in self.neighbors_left:
-                t_left = other
-                t_right = self
-            else:
-                t_left = self
-                t_right = other
-
-            # Note that the top and bottom edge are the same for both trapezoids.
-            merged = Trapezoid(
-                leftp=t_left.leftp,
-                rightp=t_right.rightp,
-                top=self.top,
-                bottom=self.bottom,
-                neighbors_left=list(t_left.neighbors_left),
-                neighbors_right=list(t_right.neighbors_right))
-
-            # Update the neighbors after the merge.
-            for neighbor_left in merged.neighbors_left:
-                neighbor_left.neighbors_right.remove(t_left)
-                neighbor_left.neighbors_right.append(merged)
-
-            for neighbor_right in merged.neighbors_right:
-                neighbor_right.neighbors_left.remove(t_right)
-                neighbor_right.neighbors_left.append(merged)
-
-            return merged
-        else:
-            return None
+        if self.top != top or self.bottom != bottom:
+            return False
+
+        # Verify whether the edge between them if fake.
+        if self.rightp.origin.isVertexOf(top) or self.rightp.origin.isVertexOf(bottom):
+            return False
+
+        # This trapezoid only borders the trapezoid, which is replaced by the part, and the part only borders this one.
+        return len(self.neighbors_right) == 1 and trapezoid in self.neighbors_right and \
+            len(neighbors) == 1 and neighbors[0] is self
 
 class BoundingBox(Trapezoid):
     """Represents a bounding box around a set of vertices."""
@@ -770,60 +794,27 @@ class TrapezoidSplit:
 
         return sub_tree
 
-    @staticmethod
-    def merge(trapezoid_splits):
+    def assign_depths(self):
         """
-        Merges the provided splitted trapezoids. Note that the provided collection is changed.
+        Sets the depth of the new trapezoids below the node of the original trapezoid, see as_search_structure.
+        A merged trapezoid is shared by consecutive splits and keeps the largest depth.
+        Returns the maximum depth of the new trapezoids.
         """
-        if len(trapezoid_splits) < 1:
-            return
-
-        # Keep track of the top merge process.
-        t_top = trapezoid_splits[0].top
-        t_top_merging = [trapezoid_splits[0]]
-
-        # Keep track of the bottom merge process.
-        t_bottom = trapezoid_splits[0].bottom
-        t_bottom_merging = [trapezoid_splits[0]]
-
-        # Inline functions to process the accumulated merge data.
-        def save_top_merges():
-            """Processes the accummulated top trapezoid merges."""
-            for merging in t_top_merging:
-                merging.top = t_top
-
-        def save_bottom_merges():
-            """Processes the accumulated bottom trapezoid merges."""
-            for merging in t_bottom_merging:
-                merging.bottom = t_bottom
-
-        # Process each trapezoidal split.
-        for i in range(1, len(trapezoid_splits)):
-            cur_split = trapezoid_splits[i]
-
-            if t_top.can_merge(cur_split.top):
-                t_top = t_top.merge(cur_split.top)
-                t_top_merging.append(cur_split)
-            else:
-                save_top_merges()
+        depth = self.original.depth
 
-                # Re-initialize the top merge data.
-                t_top = cur_split.top
-                t_top_merging = [cur_split]
+        if self.left is not None:
+            depth += 1
+            self.left.depth = depth
 
-            if t_bottom.can_merge(cur_split.bottom):
-                t_bottom = t_bottom.merge(cur_split.bottom)
-                t_bottom_merging.append(cur_split)
-            else:
-                save_bottom_merges()
+        if self.right is not None:
+            depth += 1
+            self.right.depth = depth
 
-                # Re-initialize the bottom merge data.
-                t_bottom = cur_split.bottom
-                t_bottom_merging = [cur_split]
+        depth += 1
+        self.top.depth = max(self.top.depth, depth)
+        self.bottom.depth = max(self.bottom.depth, depth)
 
-        # Process any merge that is still going on.
-        save_top_merges()
-        save_bottom_merges()
+        return depth
 
 class TrapezoidalDecomposition:
     """Contains the functions related to the trapezoidal decomposition of a simple polygon."""
@@ -849,7 +840,7 @@ class TrapezoidalDecomposition:
             if neighbor.is_intersected_by(edge) or neighbor.contains_vertex(edge.getStartVertex()):
                 intersections.append(neighbor)
 
-                neighbors_right = sorted(neighbor.neighbors_right, key=lambda n: n.top.getStartVertex().x)
+                neighbors_right = sorted(neighbor.neighbors_right, key=lambda n: n.top.getStartVertex())
 
                 for neighbor_right in neighbors_right:
                     if neighbor_right not in neighbors:
@@ -858,7 +849,7 @@ class TrapezoidalDecomposition:
         return list(intersections)
 
     @staticmethod
-    def insert(ss_d, edge):
+    def insert(ss_d, edge, stats=None, hints=None):
         """
         Inserts the provided edge into the trapezoidal decomposition.
         Returns a tuple (old, new)
@@ -867,23 +858,187 @@ class TrapezoidalDecomposition:
         Arguments
         ss_d -- The search structure that belongs to the trapezoidal decomposition.
         edge -- The edge that is to be inserted.
+        stats -- An InsertionStats object that records the insertion (default None).
+        hints -- A dictionary that maps the vertices of the inserted edges to search structure nodes, see below
+                 (default None). It is updated by the insertion.
+
+        The node of a vertex is the node of the trapezoid that contained the vertex when it was inserted. Nodes are
+        replaced in place and the structure above them does not change, so a query for the vertex from its node
+        ends in the same leaves as a query from the root, without visiting the nodes above it. Edges that start at
+        the end point of an inserted edge are located from there.
         """
+        if stats is not None:
+            stats.begin()
+
+        start = edge.getStartVertex()
+        end = edge.getEndVertex()
+
         # First, determine the trapezoids intersecting with the provided edge.
-        int_trapezoid_leaves = ss_d.point_location_query(edge.getStartVertex())
+        start_node = hints.get(start, ss_d) if hints is not None else ss_d
+        int_trapezoid_leaves = start_node.point_location_query(start)
+
+        if stats is not None:
+            stats.lap("locate")
 
         # Get the trapezoids from the leaves.
         int_trapezoids = [int_t.trapezoid() for int_t in int_trapezoid_leaves]
 
         t_intersections = TrapezoidalDecomposition.find_intersections(int_trapezoids, edge)
 
-        # Split these intersecting trapezoids.
+        if hints is not None:
+            if start not in hints and len(int_trapezoids) == 1:
+                hints[start] = int_trapezoids[0].ref_node()
+
+            if end not in hints:
+                for trapezoid in reversed(t_intersections):
+                    if trapezoid.contains_vertex(end):
+                        hints[end] = trapezoid.ref_node()
+                        break
+
+        if stats is not None:
+            stats.lap("find")
+
+        # Split these intersecting trapezoids, this also merges the trapezoids of which the wall is removed.
         t_splitted = Trapezoid.split_all(t_intersections, edge)
 
-        # Try to merge the splitted trapezoids by moving over them.
-        TrapezoidSplit.merge(t_splitted)
+        if stats is not None:
+            stats.lap("split")
+            stats.record_split(t_intersections, t_splitted)
 
         return t_splitted
 
+def label_interior(trapezoids, edges):
+    """
+    Labels the trapezoids of the decomposition of the provided edges as inside or outside the polygon (the attribute
+    inside) in linear time. Returns the trapezoids that lie inside.
+
+    The trapezoids at the bounding box lie outside. The labels are spread through the neighbor graph: neighbors
+    across a wall lie on the same side, while the trapezoids above a polygon edge lie on the other side than the ones
+    below it. The labels therefore do not depend on the orientation of the edges or on their insideOn.
+    The neighbor lists are left as they are, the trapezoids inside may still refer to trapezoids outside.
+    """
+    polygon_edges = set(id(edge) for edge in edges)
+    above = {}
+    below = {}
+
+    for trapezoid in trapezoids:
+        trapezoid.inside = None
+        above.setdefault(id(trapezoid.bottom), []).append(trapezoid)
+        below.setdefault(id(trapezoid.top), []).append(trapezoid)
+
+    stack = []
+
+    def shares_wall(left, right):
+        # Neighbors may only touch in the vertex of the wall: if the top and bottom edge of one of them meet in it, or
+        # the wall of one of them lies above it and the wall of the other one below it.
+        vertex = left.rightp.origin
+
+        if vertex != right.leftp.origin:
+            return min(left.top_right().y, right.top_left().y) > max(left.bottom_right().y, right.bottom_left().y)
+
+        left_top = vertex == left.top.p1 or vertex == left.top.p2
+        left_bottom = vertex == left.bottom.p1 or vertex == left.bottom.p2
+        right_top = vertex == right.top.p1 or vertex == right.top.p2
+        right_bottom = vertex == right.bottom.p1 or vertex == right.bottom.p2
+
+        return not ((left_top or right_top) and (left_bottom or right_bottom))
+
+    def label(trapezoids, inside):
+        for trapezoid in trapezoids:
+            if trapezoid.inside is None:
+                trapezoid.inside = inside
+                stack.append(trapezoid)
+
+    label([t for t in trapezoids if id(t.top) not in polygon_edges or id(t.bottom) not in polygon_edges], False)
+
+    # Every polygon edge is crossed once.
+    crossed = set()
+
+    while len(stack) > 0:
+        trapezoid = stack.pop()
+
+        label([n for n in trapezoid.neighbors_left if shares_wall(n, trapezoid)], trapezoid.inside)
+        label([n for n in trapezoid.neighbors_right if shares_wall(trapezoid, n)], trapezoid.inside)
+
+        for edge in (trapezoid.top, trapezoid.bottom):
+            if id(edge) in polygon_edges and id(edge) not in crossed:
+                crossed.add(id(edge))
+                inside_below = trapezoid.inside if edge is trapezoid.top else not trapezoid.inside
+
+                label(below.get(id(edge), []), inside_below)
+                label(above.get(id(edge), []), not inside_below)
+
+    if any(trapezoid.inside is None for trapezoid in trapezoids):
+        raise ValueError("The trapezoids are not connected to the bounding box, provide the whole decomposition.")
+
+    return [trapezoid for trapezoid in trapezoids if trapezoid.inside]
+
+def pack_trapezoids(trapezoids, edges):
+    """
+    Returns a picklable representation of the trapezoids of the decomposition of the provided edges, e.g. to return
+    a decomposition from another process. Trapezoids only refer weakly to their neighbors, which cannot be pickled, so
+    the neighbors are stored by their index in trapezoids and the edges of the polygon by their index in edges.
+    """
+    trapezoid_index = {id(trapezoid): i for i, trapezoid in enumerate(trapezoids)}
+    edge_index = {id(edge): i for i, edge in enumerate(edges)}
+
+    def pack_vertex(vertex):
+        if vertex.origin is vertex:
+            return vertex.x, vertex.y
+
+        return vertex.x, vertex.y, vertex.origin.x, vertex.origin.y
+
+    def pack_edge(edge):
+        if id(edge) in edge_index:
+            return edge_index[id(edge)]
+
+        # An edge of the bounding box.
+        return pack_vertex(edge.p1), pack_vertex(edge.p2), edge.insideOn
+
+    return [(pack_vertex(t.leftp), pack_vertex(t.rightp), pack_edge(t.top), pack_edge(t.bottom),
+             [trapezoid_index[id(n)] for n in t.neighbors_left], [trapezoid_index[id(n)] for n in t.neighbors_right],
+             t.depth) for t in trapezoids]
+
+def unpack_trapezoids(packed, edges):
+    """
+    Returns the trapezoids of a representation of pack_trapezoids, the edges must be equal to the edges that were
+    packed. The trapezoids refer to the provided edges and their vertices.
+    """
+    vertices = {}
+
+    for edge in edges:
+        vertices[(edge.p1.x, edge.p1.y)] = edge.p1
+        vertices[(edge.p2.x, edge.p2.y)] = edge.p2
+
+    bounding_edges = {}
+
+    def unpack_vertex(packed_vertex):
+        if len(packed_vertex) == 2:
+            return vertices.get(packed_vertex) or Vertex(*packed_vertex)
+
+        x, y, origin_x, origin_y = packed_vertex
+        return WallVertex(x, y, unpack_vertex((origin_x, origin_y)))
+
+    def unpack_edge(packed_edge):
+        if isinstance(packed_edge, int):
+            return edges[packed_edge]
+
+        if packed_edge not in bounding_edges:
+            p1, p2, inside_on = packed_edge
+            bounding_edges[packed_edge] = Edge(unpack_vertex(p1), unpack_vertex(p2), inside_on)
+
+        return bounding_edges[packed_edge]
+
+    trapezoids = [Trapezoid(unpack_vertex(leftp), unpack_vertex(rightp), unpack_edge(top), unpack_edge(bottom), [], [])
+                  for leftp, rightp, top, bottom, _, _, _ in packed]
+
+    for trapezoid, (_, _, _, _, neighbors_left, neighbors_right, depth) in zip(trapezoids, packed):
+        trapezoid.neighbors_left = [trapezoids[i] for i in neighbors_left]
+        trapezoid.neighbors_right = [trapezoids[i] for i in neighbors_right]
+        trapezoid.depth = depth
+
+    return trapezoids
+
 """Debug function"""
 def contains_trapezoid_with_leftp(t_splitted, vertex):
     for trapezoid in t_splitted:
@@ -0,0 +1,271 @@
+"""
+Instrumentation of the insertions of the randomized incremental algorithm.
+
+An InsertionStats object is passed as stats to RandomizedIncremental.decompose_basic or
+IncrementalDataStructure.TrapezoidalDecomposition.insert and records per insertion:
+    path_length -- the number of nodes of the search structure that the point location visits.
+    crossed -- the number of trapezoids that find_intersections returns.
+    splits -- the number of trapezoids that are split (and replaced).
+    merges -- the number of merges of split trapezoids, see Trapezoid.can_extend.
+    created -- the number of trapezoids that replace the split ones.
+    predicates -- the number of geometric predicate calls, see PREDICATES.
+    locate_time, find_time, split_time, dag_time -- the wall time of the phases in seconds.
+
+Node visits and predicate calls are counted by wrapping the methods while the object is active (used as a context
+manager, decompose_basic does this). Without stats nothing is wrapped or recorded.
+
+Usage: python InsertionStats.py <polygon file> [--seed S] [--order uniform|brio] [--json summary.json]
+                                [--csv insertions.csv]
+"""
+import argparse
+import csv
+import json
+import math
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+import DataStructures
+import IncrementalDataStructure as ids
+
+# The geometric predicates of which the calls are counted.
+PREDICATES = (
+    (DataStructures.Vertex, "__lt__"),
+    (DataStructures.Vertex, "__le__"),
+    (DataStructures.Vertex, "__gt__"),
+    (DataStructures.Vertex, "__ge__"),
+    (DataStructures.Vertex, "liesAbove"),
+    (DataStructures.Vertex, "lies_below"),
+    (DataStructures.Vertex, "lies_on"),
+    (DataStructures.Vertex, "isVertexOf"),
+    (DataStructures.SweepKey, "_compare"),
+)
+
+COUNT_FIELDS = ("path_length", "crossed", "splits", "merges", "created", "predicates")
+
+TIME_FIELDS = ("locate_time", "find_time", "split_time", "dag_time")
+
+FIELDS = COUNT_FIELDS + TIME_FIELDS
+
+class InsertionStats:
+    """Records statistics per insertion, the records are stored per field in columns."""
+    def __init__(self):
+        self.columns = {field: [] for field in FIELDS}
+        self.predicate_calls = Counter()
+        self._path_length = 0
+        self._predicates = 0
+        self._current = None
+        self._wrapped = []
+
+    def reset(self):
+        """Removes all records, e.g. when decompose_basic rebuilds the search structure."""
+        self.columns = {field: [] for field in FIELDS}
+        self.predicate_calls = Counter()
+        self._current = None
+
+    def __len__(self):
+        self._commit()
+        return len(self.columns["crossed"])
+
+    def __enter__(self):
+        """Starts counting the node visits and predicate calls."""
+        if len(self._wrapped) > 0:
+            return self
+
+        self._wrap(ids.TrapezoidSearchStructure, "point_location_query", self._count_visit)
+
+        for cls, name in PREDICATES:
+            self._wrap(cls, name, self._count_predicate(cls.__name__ + "." + name))
+
+        return self
+
+    def __exit__(self, *exc):
+        """Stops counting and restores the wrapped methods."""
+        for cls, name, method in reversed(self._wrapped):
+            setattr(cls, name, method)
+
+        self._wrapped = []
+        self._commit()
+        return False
+
+    def _wrap(self, cls, name, count):
+        method = cls.__dict__[name]
+
+        def counted(*args, **kwargs):
+            count()
+            return method(*args, **kwargs)
+
+        self._wrapped.append((cls, name, method))
+        setattr(cls, name, counted)
+
+    def _count_visit(self):
+        self._path_length += 1
+
+    def _count_predicate(self, name):
+        def count():
+            self._predicates += 1
+            self.predicate_calls[name] += 1
+
+        return count
+
+    def begin(self):
+        """Starts the record of a new insertion, the previous record is completed."""
+        self._commit()
+
+        self._current = dict.fromkeys(FIELDS, 0)
+        self._current["path_length"] = -self._path_length
+        self._current["predicates"] = -self._predicates
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Adds the time since the previous lap (or the begin) to the time of the provided phase."""
+        now = time.perf_counter()
+        self._current[phase + "_time"] += now - self._last
+        self._last = now
+
+    def record_split(self, intersections, splits):
+        """Records the structural change of the insertion from the intersected trapezoids and their splits."""
+        current = self._current
+        current["crossed"] = len(intersections)
+        current["splits"] = len(splits)
+
+        created = set()
+
+        for i in range(len(splits)):
+            split = splits[i]
+
+            for trapezoid in (split.top, split.bottom, split.left, split.right):
+                if trapezoid is not None:
+                    created.add(id(trapezoid))
+
+            if i > 0:
+                # A merged trapezoid is shared by the consecutive splits.
+                current["merges"] += (split.top is splits[i - 1].top) + (split.bottom is splits[i - 1].bottom)
+
+        current["created"] = len(created)
+
+    def _commit(self):
+        if self._current is None:
+            return
+
+        self._current["path_length"] += self._path_length
+        self._current["predicates"] += self._predicates
+
+        for field in FIELDS:
+            self.columns[field].append(self._current[field])
+
+        self._current = None
+
+    def array(self, field):
+        """Returns the values of the field for all insertions as a NumPy array."""
+        self._commit()
+        return np.asarray(self.columns[field], dtype=np.float64)
+
+    def histogram(self, field, bins=None):
+        """
+        Returns the histogram of the field as a list of tuples (low, high, count). The count fields use one bin per
+        integer value (bins is ignored), the time fields use the provided number of bins (default 20).
+        """
+        values = self.array(field)
+
+        if len(values) == 0:
+            return []
+
+        if field in COUNT_FIELDS:
+            counts = np.bincount(values.astype(np.int64))
+            return [(value, value, int(count)) for value, count in enumerate(counts) if count > 0]
+
+        counts, edges = np.histogram(values, bins=20 if bins is None else bins)
+        return [(float(edges[i]), float(edges[i + 1]), int(counts[i])) for i in range(len(counts))]
+
+    def summary(self):
+        """
+        Returns a dictionary with the number of insertions and per field the mean, maximum, total and the 50th, 90th
+        and 99th percentile. The path length is also compared with log2 of the number of insertions.
+        """
+        n = len(self)
+        result = {"insertions": n, "log2_n": math.log2(n) if n > 0 else 0.0, "fields": {}}
+
+        for field in FIELDS:
+            values = self.array(field)
+
+            if n == 0:
+                result["fields"][field] = None
+                continue
+
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            result["fields"][field] = {"mean": float(values.mean()), "max": float(values.max()),
+                                       "total": float(values.sum()), "p50": float(p50), "p90": float(p90),
+                                       "p99": float(p99)}
+
+        if n > 0:
+            result["path_length_per_log2_n"] = result["fields"]["path_length"]["mean"] / max(result["log2_n"], 1.0)
+
+        result["predicate_calls"] = dict(self.predicate_calls)
+
+        return result
+
+    def write_json(self, filename, bins=None):
+        """Writes the summary and the histograms of all fields as JSON."""
+        data = self.summary()
+        data["histograms"] = {field: self.histogram(field, bins) for field in FIELDS}
+
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+    def write_csv(self, filename):
+        """Writes one row per insertion with all fields."""
+        self._commit()
+
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(("insertion",) + FIELDS)
+
+            for i, row in enumerate(zip(*(self.columns[field] for field in FIELDS))):
+                writer.writerow((i,) + row)
+
+def print_summary(stats):
+    """Prints the summary of the stats and the histograms of the count fields."""
+    summary = stats.summary()
+
+    print("{} insertions (log2 n = {:.1f})".format(summary["insertions"], summary["log2_n"]))
+    print("{:<12} {:>10} {:>10} {:>10} {:>10} {:>10}".format("field", "mean", "p50", "p90", "p99", "max"))
+
+    for field in FIELDS:
+        values = summary["fields"][field]
+
+        if values is not None:
+            print("{:<12} {:>10.4g} {:>10.4g} {:>10.4g} {:>10.4g} {:>10.4g}".format(
+                field, values["mean"], values["p50"], values["p90"], values["p99"], values["max"]))
+
+    for field in ("path_length", "crossed", "created"):
+        print("\n{}:".format(field))
+
+        for low, _, count in stats.histogram(field):
+            print("{:>6} {:>8}".format(low, count))
+
+if __name__ == "__main__":
+    import Benchmark
+    import RandomizedIncremental as ri
+
+    parser = argparse.ArgumentParser(description="Records insertion statistics of the randomized incremental algorithm.")
+    parser.add_argument("input")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--order", choices=sorted(ri.ORDERS), default="uniform")
+    parser.add_argument("--json", default=None)
+    parser.add_argument("--csv", default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    stats = InsertionStats()
+    ri.decompose_basic(Benchmark.readEdges(args.input), stats=stats, order=args.order)
+
+    print_summary(stats)
+
+    if args.json is not None:
+        stats.write_json(args.json)
+    if args.csv is not None:
+        stats.write_csv(args.csv)
@@ -1,11 +1,36 @@
 from enum import IntEnum
 from bintrees import avltree
-from DataStructures import Vertex, StatusKey, Direction
+from DataStructures import Vertex, Direction, SweepKey, SweepPosition
 from DataStructures import Edge
 from VerticalDecomposition import VerticalDecomposition
+import PolygonValidator
 
 
-def decompose(edges):
+def decompose(edges, validate=False, interiorOnly=True):
+    vd = VerticalDecomposition()
+
+    for edge, original in decompose_iter(edges, validate, interiorOnly):
+        if original:
+            vd.addEdge(edge)
+        else:
+            vd.addVertEdge(edge)
+
+    return vd
+
+
+def decompose_iter(edges, validate=False, interiorOnly=True):
+    """
+    Runs the plane sweep and yields tuples (edge, original) in sweep order, where original is true iff the edge is
+    an edge of the polygon and false for a vertical extension. The output of an event group is yielded as soon as the
+    group has been processed, so only the event queue and the sweep status are kept in memory.
+    If validate is true, a ValueError is raised before the sweep starts if the polygon is not simple.
+    If interiorOnly is true, only the vertical extensions inside the polygon are yielded (on the insideOn side of the
+    edges they end on), otherwise the extensions outside it as well, like the trapezoids of the randomized
+    incremental algorithm without interior_only.
+    """
+    if validate:
+        PolygonValidator.validate(edges)
+
     # Build event queue
 
     evtQ = builEventQueue(edges)
@@ -13,97 +38,121 @@ def decompose(edges):
     # empty status
 
     status = avltree.AVLTree()
+    sweep = SweepPosition()
 
     # start processing events
 
-    vd = VerticalDecomposition()
-
-    while len(evtQ) > 1:
+    while len(evtQ) > 0:
         evtT = evtQ.pop_min()
 
-        edgePoints = {}
+        yield from processEventGroup(status, sweep, evtT[1], interiorOnly)
 
-        if len(evtT[1]) > 2:
-            None # print("Degenerate case, multiple vertices on a vertical line!!!111!!!!1!!1!")
 
-        for evt in evtT[1]:
+def processEventGroup(status, sweep, evts, interiorOnly=True):
+    """
+    Processes all events at one point and yields the resulting tuples (edge, original).
+    A ValueError is raised if an edge that ends in the point is not found in the status, which happens when edges
+    cross.
+    The points are processed in lexicographic (x, y) order, i.e. the plane is sheared symbolically so that vertical
+    edges and vertices with the same x-coordinate need no special cases, see Vertex.__lt__ and SweepKey.
+    """
+    point = evts[0].cord
+    sweep.point = point
 
-            realX = evt.cord
+    # The edges that end in the point are removed just before it, the edges that start in it inserted just after it.
+    sweep.side = -1
 
-            realY = evt.edge.pointAtEdge(realX).y
+    for evt in evts:
+        if evt.type == EventType.Removal:
+            try:
+                status.remove(SweepKey(evt.edge, sweep))
+            except KeyError:
+                # The status is only ordered consistently if no edges cross, name an edge that crosses this one.
+                crossing = PolygonValidator.findCrossing(evt.edge, status.values())
 
-            edgePoints[realY] = evt.edge
+                if crossing is None:
+                    raise ValueError("The polygon is not simple, the edge {} is not in the sweep status.".format(
+                        evt.edge)) from None
 
-            if evt.type == EventType.Insert:
-                status.insert(evt.edge.statusKeyForEdge(), evt.edge)
-                vd.addEdge(evt.edge)
-            if evt.type == EventType.Removal:
-                status.remove(evt.edge.statusKeyForEdge())
+                raise ValueError("The polygon is not simple, the edges {} and {} intersect.".format(
+                    evt.edge, crossing)) from None
 
-        attemptAddEdges(status, realX, edgePoints, vd)
+    yield from attemptAddEdges(status, sweep, evts, interiorOnly)
 
-    # build deco
+    sweep.side = 1
+
+    for evt in evts:
+        if evt.type == EventType.Insert:
+            status.insert(SweepKey(evt.edge, sweep), evt.edge)
+            yield evt.edge, True
 
-    return vd
 
+def attemptAddEdges(status, sweep, evts, interiorOnly=True):
+    """
+    Yields the vertical extensions up and down from the event point to the edges directly above and below it. If
+    interiorOnly is true, only the extensions inside the polygon are yielded.
+    """
+    point = sweep.point
+    key = SweepKey.forPoint(sweep)
 
-def attemptAddEdges(status, realX, edgePoints, vd):
     upper = None
     lower = None
 
-    for key in edgePoints:
-        edge = edgePoints[key]
-        status.insert(edge.statusKeyForEdge(), edge)
+    try:
+        upper = status.ceiling_item(key)
+    except KeyError:
+        None
 
-    for dKey in edgePoints:
+    try:
+        lower = status.floor_item(key)
+    except KeyError:
+        None
 
-        edge = edgePoints[dKey]
+    # An extension along a vertical edge of the vertex is not added, the other endpoint of the edge adds the rest.
+    up = True
+    down = True
 
-        key = edge.statusKeyForEdge()
+    for evt in evts:
+        if evt.edge.is_vertical():
+            other = evt.edge.p2 if evt.edge.p1 == point else evt.edge.p1
+            up = up and other.y < point.y
+            down = down and other.y > point.y
 
-        try:
-            upper = status.succ_item(key)
-        except KeyError:
-            None
+    if up and upper is not None and (not interiorOnly or
+                                     (upper[1].isLeftToRight() and upper[1].insideOn == Direction.Right) or
+                                     (upper[1].isRightToLeft() and upper[1].insideOn == Direction.Left)):
+        yield Edge(point, upper[1].pointAtSweep(point), Direction.Both), False
 
-        try:
-            lower = status.prev_item(key)
-        except KeyError:
-            None
-
-        if upper is not None and ((upper[1].isLeftToRight() and upper[1].insideOn == Direction.Right) or
-                                      (upper[1].isRightToLeft() and upper[1].insideOn == Direction.Left)):
-            vd.addVertEdge(Edge(edge.pointAtEdge(realX), upper[1].pointAtEdge(realX), Direction.Both))
-
-        if lower is not None and ((lower[1].isRightToLeft() and lower[1].insideOn == Direction.Right) or
-                                      (lower[1].isLeftToRight() and lower[1].insideOn == Direction.Left)):
-            vd.addVertEdge(Edge(edge.pointAtEdge(realX), lower[1].pointAtEdge(realX), Direction.Both))
+    if down and lower is not None and (not interiorOnly or
+                                       (lower[1].isRightToLeft() and lower[1].insideOn == Direction.Right) or
+                                       (lower[1].isLeftToRight() and lower[1].insideOn == Direction.Left)):
+        yield Edge(point, lower[1].pointAtSweep(point), Direction.Both), False
 
 
 def builEventQueue(edges):
+    """
+    Returns the event queue: a tree that maps the points (x, y) to the list of the events at that point. The events
+    are polygon vertices, so the plain (x, y) tuples give the lexicographic order of Vertex.
+    """
     tree = avltree.AVLTree()
 
     events = []
 
     for edge in edges:
-        if edge.p1.x < edge.p2.x:
-            events.append(Event(edge, EventType.Insert, edge.p1.x))
-            events.append(Event(edge, EventType.Removal, edge.p2.x))
-        else:
-            events.append(Event(edge, EventType.Removal, edge.p1.x))
-            events.append(Event(edge, EventType.Insert, edge.p2.x))
+        events.append(Event(edge, EventType.Insert, edge.getStartVertex()))
+        events.append(Event(edge, EventType.Removal, edge.getEndVertex()))
 
-    events = sorted(events, key=lambda evt: (evt.cord, evt.type))
+    events = sorted(events, key=lambda evt: (evt.cord.x, evt.cord.y, evt.type))
 
-    cord = -1
+    cord = None
     evts = []
 
     for evt in events:
-        if evt.cord == cord:
+        if cord is not None and evt.cord == cord:
             evts.append(evt)
         else:
             if len(evts) > 0:
-                tree.insert(cord, evts)
+                tree.insert((cord.x, cord.y), evts)
 
             evts = []
 
@@ -111,28 +160,20 @@ def builEventQueue(edges):
 
             evts.append(evt)
 
-    tree.insert(cord, evts)
+    # Without edges the queue stays empty.
+    if len(evts) > 0:
+        tree.insert((cord.x, cord.y), evts)
 
     return tree
 
 
 def printEventQueue(tree):
-    ceil = -1
-
-    while len(tree) > 0:
-        try:
-            tuple = tree.ceiling_item(ceil + 0.01)
-            evts = tuple[1]
-
-            for evt in evts:
-                if evt.type == EventType.Insert:
-                    print("Insert at x: {} of edge {}".format(evt.cord, repr(evt.edge)))
-                else:
-                    print("Removal at x: {} of edge {}".format(evt.cord, repr(evt.edge)))
-
-            ceil = tuple[0]
-        except KeyError:
-            break
+    for cord, evts in tree.items():
+        for evt in evts:
+            if evt.type == EventType.Insert:
+                print("Insert at {} of edge {}".format(cord, repr(evt.edge)))
+            else:
+                print("Removal at {} of edge {}".format(cord, repr(evt.edge)))
 
 
 class Event:
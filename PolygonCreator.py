@@ -2,8 +2,7 @@ import random
 import string
 import math
 
-
-# import numpy as np
+import numpy as np
 
 def makeTestPolygon(n, min, max):
     # Creates n amount of points in between <min>,<min> and <max>,<max>. Extremely unlikely to be simple, should not be used for anything but testing.
@@ -115,6 +114,8 @@ def makeRectangloid(x, y, size, general=0):
             print("Size too small!")
             return []
     elif (general == 2):
+        # Avoids vertical edges. The decompositions handle them (and shared x-coordinates) with a symbolic shear, so
+        # this is only needed to compare with older results.
         lastx = -1
 
     for i in range(1, y, 1):
@@ -219,3 +220,125 @@ def writePoints(poly,
         for i in poly:
             f.write(str(i) + "\n")
         f.closed
+
+
+def rectangloidArray(x, y, size, general=True, seed=None):
+    # Vectorized makeRectangloid: returns the 2x+2y-4 points as an (n, 2) int64 array in the same order (up the left
+    # column, right along the top row, down the right column and left along the bottom row).
+    # With general=True all x-coordinates and all y-coordinates are distinct (requires size >= max(x, y)).
+    # Runs in O(n) time and memory, use <seed> for reproducible output.
+    if x < 2 or y < 2:
+        raise ValueError("A rectangloid needs at least 2x2 squares, got {}x{}.".format(x, y))
+    if general and (x > size or y > size):
+        raise ValueError("Size too small! Need size >= max(x, y) = {} for general position.".format(max(x, y)))
+
+    rng = np.random.default_rng(seed)
+
+    if general:
+        # The two outer columns (rows) hold y (x) points each, the inner ones two, draw them without repetition.
+        col0 = rng.choice(size, y, replace=False)
+        colLast = (x - 1) * size + rng.choice(size, y, replace=False)
+        row0 = rng.choice(size, x, replace=False)
+        rowLast = (y - 1) * size + rng.choice(size, x, replace=False)
+
+        colTop, colBottom = _distinctPairs(rng, x - 2, size)
+        rowLeft, rowRight = _distinctPairs(rng, y - 2, size)
+
+        cols = np.arange(1, x - 1) * size
+        rows = np.arange(1, y - 1) * size
+
+        leftX = col0[:y - 1]
+        leftY = np.concatenate((row0[:1], rows + rowLeft))
+        topX = np.concatenate((col0[y - 1:], cols + colTop))
+        topY = rowLast[:x - 1]
+        rightX = colLast[:y - 1]
+        rightY = np.concatenate((rowLast[x - 1:], (rows + rowRight)[::-1]))
+        bottomX = np.concatenate((colLast[y - 1:], (cols + colBottom)[::-1]))
+        bottomY = row0[1:]
+    else:
+        leftX = rng.integers(0, size, y - 1)
+        leftY = np.arange(0, y - 1) * size + rng.integers(0, size, y - 1)
+        topX = np.arange(0, x - 1) * size + rng.integers(0, size, x - 1)
+        topY = (y - 1) * size + rng.integers(0, size, x - 1)
+        rightX = (x - 1) * size + rng.integers(0, size, y - 1)
+        rightY = np.arange(y - 1, 0, -1) * size + rng.integers(0, size, y - 1)
+        bottomX = np.arange(x - 1, 0, -1) * size + rng.integers(0, size, x - 1)
+        bottomY = rng.integers(0, size, x - 1)
+
+    xs = np.concatenate((leftX, topX, rightX, bottomX))
+    ys = np.concatenate((leftY, topY, rightY, bottomY))
+
+    return np.stack((xs, ys), axis=1).astype(np.int64)
+
+
+def _distinctPairs(rng, k, size):
+    # Draws k pairs (a, b) of distinct values in range(size).
+    a = rng.integers(0, size, k)
+    b = rng.integers(0, size - 1, k)
+    b += b >= a
+
+    return a, b
+
+
+def sharkTeethArray(n, inrad, outrad, pierce=0, red=0, seed=None, jitter=0.0):
+    # Vectorized makeChallengePolygon: returns the 4*<n>+4+red points as an (m, 2) int64 array.
+    # (makeChallengePolygon generates the same 4*<n>+4 base points, but its header only counts 4*<n>+2 of them.)
+    # The red redundant vertices are spread over the edges (all but the closing one) with a multinomial draw and put
+    # evenly spaced on their edge, instead of being spliced in one by one.
+    # With jitter > 0 the outer tips are moved outwards by up to <jitter> * outrad and the inner tips inwards by up to
+    # <jitter> * inrad, drawn from <seed>. The tips only move away from the middle circle, so the polygon stays simple.
+    # The seed has no effect if both jitter and red are 0.
+    rng = np.random.default_rng(seed)
+
+    step = math.pi * 0.5 / n
+    up = np.arange(0, n + 1) * step
+    down = (np.arange(n, -1, -1) + 0.5) * step
+
+    ring = np.empty((4 * n + 4, 2), dtype=np.float64)
+    ring[0:2 * n + 2:2] = _onCircle(up, (inrad + outrad) / (2 + pierce))
+    ring[1:2 * n + 2:2] = _onCircle(up, outrad * (1 + jitter * rng.random(n + 1)))
+    ring[2 * n + 2::2] = _onCircle(down, (inrad + outrad) / (2 - pierce))
+    ring[2 * n + 3::2] = _onCircle(down, inrad * (1 - jitter * rng.random(n + 1)))
+    ring = np.ceil(ring).astype(np.int64)
+
+    if red == 0:
+        return ring
+
+    counts = rng.multinomial(red, np.full(len(ring) - 1, 1.0 / (len(ring) - 1)))
+    edge = np.repeat(np.arange(len(ring) - 1), counts)
+    rank = np.arange(red) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    t = rank / (counts[edge] + 1)
+
+    extra = np.ceil(ring[edge] + t[:, None] * (ring[edge + 1] - ring[edge])).astype(np.int64)
+
+    # Merge the redundant vertices into the ring, ordered by their position along the edges.
+    keys = np.concatenate((np.arange(len(ring), dtype=np.float64), edge + t))
+    order = np.argsort(keys, kind='stable')
+
+    return np.concatenate((ring, extra))[order]
+
+
+def _onCircle(angles, radius):
+    return np.stack((np.cos(angles) * radius, np.sin(angles) * radius), axis=1)
+
+
+def writePointsArray(points, output='filename', binary=False, chunkSize=1 << 18):
+    # Streams an (n, 2) point array to [output].txt in the format of writePoints, <chunkSize> lines at a time.
+    # With binary=True it writes [output].npy instead, which can be memory-mapped (see ExternalPlaneSweep).
+    points = np.asarray(points, dtype=np.int64)
+
+    if binary:
+        target = np.lib.format.open_memmap(output + ".npy", mode='w+', dtype=np.int64, shape=points.shape)
+
+        for start in range(0, len(points), chunkSize):
+            target[start:start + chunkSize] = points[start:start + chunkSize]
+
+        target.flush()
+        del target
+    else:
+        with open(output + ".txt", 'w') as f:
+            f.write(str(len(points)) + "\n")
+
+            for start in range(0, len(points), chunkSize):
+                chunk = points[start:start + chunkSize].tolist()
+                f.write("".join(["{} {}\n".format(px, py) for px, py in chunk]))
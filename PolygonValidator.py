@@ -0,0 +1,174 @@
+"""
+Validates that a polygon is simple before it is decomposed.
+
+The check is a Shamos-Hoey sweep on the event and status machinery of the plane sweep: the endpoints of the edges are
+processed in lexicographic (x, y) order and every edge is only tested against its neighbors in the status, which takes
+O(n log n) time. Vertical edges and shared x-coordinates are handled with a symbolic shear, ties are decided with exact
+(integer) arithmetic when the coordinates are integers.
+"""
+from bintrees import avltree
+
+import PlaneSweep as ps
+from DataStructures import SweepKey, SweepPosition
+
+
+def findIntersection(edges):
+    """
+    Returns the first pair of edges (in sweep order) that shows that the polygon formed by the provided edges is not
+    simple, or None if it is simple. Edges that share an endpoint only intersect if they overlap.
+    Degenerate input is reported as well: a zero length edge is returned as the pair (edge, edge), a vertex that is
+    used more than once as the pair of edges that start in it and a gap in the ring as the two edges around the gap.
+    """
+    pair = _findDegeneracy(edges)
+
+    if pair is not None:
+        return pair
+
+    sweep = SweepPosition()
+    status = avltree.AVLTree()
+
+    for point, evts in _eventGroups(edges):
+        sweep.point = point
+
+        # The removals are processed just before the point, the insertions just after it.
+        sweep.side = -1
+
+        for evt in evts:
+            if evt.type != ps.EventType.Removal:
+                continue
+
+            key = SweepKey(evt.edge, sweep)
+            lower = _neighbor(status.prev_key, key)
+            upper = _neighbor(status.succ_key, key)
+
+            status.remove(key)
+
+            if lower is not None and upper is not None and _intersects(lower.edge, upper.edge):
+                return lower.edge, upper.edge
+
+        sweep.side = 1
+
+        for evt in evts:
+            if evt.type != ps.EventType.Insert:
+                continue
+
+            key = SweepKey(evt.edge, sweep)
+            status.insert(key, None)
+
+            for other in (_neighbor(status.prev_key, key), _neighbor(status.succ_key, key)):
+                if other is not None and _intersects(evt.edge, other.edge):
+                    return evt.edge, other.edge
+
+    return None
+
+
+def validate(edges):
+    """Raises a ValueError that names the offending edges if the polygon formed by the edges is not simple."""
+    pair = findIntersection(edges)
+
+    if pair is not None:
+        raise ValueError("The polygon is not simple, the edges {} and {} intersect.".format(pair[0], pair[1]))
+
+
+def findCrossing(edge, others):
+    """Returns the first of the other edges that intersects the provided edge (see findIntersection), or None."""
+    for other in others:
+        if other is not edge and _intersects(edge, other):
+            return other
+
+    return None
+
+
+def _findDegeneracy(edges):
+    if len(edges) < 3:
+        raise ValueError("A polygon needs at least 3 edges, got {}.".format(len(edges)))
+
+    starts = {}
+
+    for i in range(len(edges)):
+        edge = edges[i]
+        successor = edges[(i + 1) % len(edges)]
+
+        if edge.p1 == edge.p2:
+            return edge, edge
+        if edge.p2 != successor.p1:
+            return edge, successor
+
+        key = (edge.p1.x, edge.p1.y)
+
+        if key in starts:
+            return starts[key], edge
+
+        starts[key] = edge
+
+    return None
+
+
+def _neighbor(find, key):
+    try:
+        return find(key)
+    except KeyError:
+        return None
+
+
+def _eventGroups(edges):
+    """Yields tuples (point, events) in lexicographic order of the points, the events have the point as cord."""
+    evts = []
+
+    for edge in edges:
+        evts.append(ps.Event(edge, ps.EventType.Insert, edge.getStartVertex()))
+        evts.append(ps.Event(edge, ps.EventType.Removal, edge.getEndVertex()))
+
+    evts.sort(key=lambda evt: evt.cord)
+
+    group = []
+
+    for evt in evts:
+        if len(group) > 0 and group[0].cord != evt.cord:
+            yield group[0].cord, group
+            group = []
+
+        group.append(evt)
+
+    if len(group) > 0:
+        yield group[0].cord, group
+
+
+def _orientation(a, b, c):
+    """Returns the sign of the cross product (b - a) x (c - a)."""
+    cross = (b.x - a.x) * (c.y - a.y) - (b.y - a.y) * (c.x - a.x)
+
+    return (cross > 0) - (cross < 0)
+
+
+def _onSegment(a, b, p):
+    """Returns true if the point p, which is collinear with a and b, lies on the closed segment ab."""
+    return min(a.x, b.x) <= p.x <= max(a.x, b.x) and min(a.y, b.y) <= p.y <= max(a.y, b.y)
+
+
+def _intersects(e, f):
+    """
+    Returns true if the closed edges e and f intersect, where edges that share an endpoint only count as
+    intersecting if they overlap.
+    """
+    o1 = _orientation(e.p1, e.p2, f.p1)
+    o2 = _orientation(e.p1, e.p2, f.p2)
+    o3 = _orientation(f.p1, f.p2, e.p1)
+    o4 = _orientation(f.p1, f.p2, e.p2)
+
+    if e.has_common_vertex(f):
+        # Adjacent edges only intersect if they are collinear and point in the same direction from the shared vertex.
+        if o1 != 0 or o2 != 0:
+            return False
+
+        shared = e.p1 if e.p1 == f.p1 or e.p1 == f.p2 else e.p2
+        a = e.p2 if shared == e.p1 else e.p1
+        b = f.p2 if shared == f.p1 else f.p1
+
+        return (a.x - shared.x) * (b.x - shared.x) + (a.y - shared.y) * (b.y - shared.y) > 0
+
+    if o1 != o2 and o3 != o4:
+        return True
+
+    return (o1 == 0 and _onSegment(e.p1, e.p2, f.p1)) or (o2 == 0 and _onSegment(e.p1, e.p2, f.p2)) or \
+        (o3 == 0 and _onSegment(f.p1, f.p2, e.p1)) or (o4 == 0 and _onSegment(f.p1, f.p2, e.p2))
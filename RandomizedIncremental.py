@@ -3,24 +3,97 @@ A module containing functions and classes related to the randomized incremental
 that creates a trapezoidal deconstruction of a simple polygon.
 """
 import gc
+import logging
 import math as math
+import multiprocessing
+import os
 from math import floor, sqrt
-from random import shuffle
+from random import shuffle, randrange, Random
+import numpy as np
 from DataStructures import Vertex, Edge, Direction
 import IncrementalDataStructure as ds
 import VerticalDecomposition as vd
+import PolygonValidator
 
-def randomize(collection):
+logger = logging.getLogger(__name__)
+
+# The depth of the search structure of n edges is bounded by DEPTH_FACTOR * log2(n + 1), see decompose_basic. The
+# expected depth is O(log n), the structures of the testsuite are about 3.5 * log2(n) deep.
+DEPTH_FACTOR = 6.0
+
+# The number of builds after which the depth is no longer bounded.
+MAX_ATTEMPTS = 8
+
+def randomize(collection, seed=None):
     """
     Returns a new collection containing the same data as the provided collection,
     but in a random order.
+    If a seed is provided the order only depends on the seed, otherwise the global random generator is used.
     """
     # Copy the collection first to keep the old order intact.
     c_collection = list(collection)
-    shuffle(c_collection)
+
+    if seed is None:
+        shuffle(c_collection)
+    else:
+        Random(seed).shuffle(c_collection)
 
     return c_collection
 
+def hilbert_keys(x, y, bits=16):
+    """
+    Returns the indices of the points along the Hilbert curve of the provided order, x and y are integer arrays with
+    values in [0, 2^bits).
+    """
+    n = 1 << bits
+    keys = np.zeros(len(x), dtype=np.int64)
+    s = n >> 1
+
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant, so the curve continues in the same orientation at the next level.
+        flip = rx & ~ry
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+
+        s >>= 1
+
+    return keys
+
+def brio(collection, seed=None, bits=16):
+    """
+    Returns a new list containing the edges of the provided collection in a biased randomized insertion order. Every
+    edge is put in the last round with probability 1/2, every other edge in the round before it with probability 1/2,
+    and so on (at most log2 n rounds). The rounds are inserted from the first to the last, so every round is preceded
+    by a random sample of the edges, which keeps the expected complexity of a uniform order. Within a round the edges
+    are ordered along a Hilbert curve through their midpoints, so consecutive insertions visit nearby trapezoids.
+    If a seed is provided the order only depends on the seed, otherwise the global random generator is used.
+    """
+    edges = list(collection)
+
+    if len(edges) == 0:
+        return edges
+
+    rng = np.random.default_rng(seed if seed is not None else randrange(2 ** 32))
+    rounds = np.minimum(rng.geometric(0.5, len(edges)), max(1, floor(log(len(edges)))))
+
+    midpoints = np.array([((e.p1.x + e.p2.x) / 2.0, (e.p1.y + e.p2.y) / 2.0) for e in edges], dtype=np.float64)
+    low = midpoints.min(axis=0)
+    span = (midpoints.max(axis=0) - low).max()
+    grid = ((midpoints - low) * (((1 << bits) - 1) / (span if span > 0 else 1.0))).astype(np.int64)
+
+    # The first round has the most rounds after it.
+    order = np.lexsort((hilbert_keys(grid[:, 0], grid[:, 1], bits), -rounds))
+
+    return [edges[i] for i in order.tolist()]
+
+# The insertion orders of the randomized incremental algorithm.
+ORDERS = {"uniform": randomize, "brio": brio}
+
 def to_output(original_edges, trapezoids):
     """Converts the trapezoidal decomposition to the output structure."""
     decomp = vd.VerticalDecomposition()
@@ -39,31 +112,169 @@ def to_output(original_edges, trapezoids):
 
     return decomp
 
-def decompose_basic(edges):
+def depth_bound(n, factor=DEPTH_FACTOR):
+    """Returns the bound on the depth of the search structure of n edges."""
+    return factor * log(n + 1)
+
+def build(edges, seed, bound=None, stats=None, order="uniform"):
+    """
+    Builds the search structure of the edges, which are inserted in the random order (see ORDERS) of the seed.
+    Returns the tuple (search structure, depth). If the depth exceeds the bound the build is stopped and the search
+    structure is None.
+    If stats (an active InsertionStats object) is provided, every insertion is recorded in it.
+    """
+    r = ds.BoundingBox.around_edges(edges)
+    d = ds.TrapezoidSearchStructure.from_bounding_box(r)
+    depth = 0
+    # The vertices of the inserted edges with their search structure nodes, see TrapezoidalDecomposition.insert.
+    hints = {}
+
+    for edge in ORDERS[order](edges, seed):
+        t_new = ds.TrapezoidalDecomposition.insert(d, edge, stats, hints)
+        depth = max(depth, ds.TrapezoidSearchStructure.insert(t_new, edge))
+
+        if stats is not None:
+            stats.lap("dag")
+
+        if bound is not None and depth > bound:
+            return None, depth
+
+    return d, depth
+
+def decompose_basic(edges, validate=False, stats=None, seed=None, depth_factor=DEPTH_FACTOR, builds=1, keep="first",
+                    order="uniform", interior_only=False):
     """
     Runs the basic randomized incremental algorithm on the provided collection of edges.
     Returns the vertical decomposition.
+    If validate is true, a ValueError is raised before the decomposition starts if the polygon is not simple.
+    If stats (an InsertionStats object) is provided, every insertion is recorded in it.
+
+    The insertion order is drawn from the seed, or from a seed drawn from the global random generator if it is None.
+    If the depth of the search structure exceeds depth_factor * log2(n + 1), the build is restarted with a fresh
+    seed, so queries take O(log n) time. The fresh seeds are drawn from the seed, so the same seed gives the same
+    structure. The last of MAX_ATTEMPTS builds is not bounded, a warning is logged if it is kept. If depth_factor is
+    None the depth is not bounded at all. The seed and depth of every build are logged.
+    The edges are inserted in a uniform random order or in a biased randomized insertion order, see brio.
+
+    With builds > 1 (None for one per CPU) the decomposition is built speculatively, see decompose_speculative.
+
+    The decomposition covers the bounding box of the edges. If interior_only is true, the trapezoids are labelled
+    (see IncrementalDataStructure.label_interior) and only the ones inside the polygon are returned.
     """
-    r = ds.BoundingBox.around_edges(edges)
-    edges = randomize(edges)
+    if validate:
+        PolygonValidator.validate(edges)
 
-    #print(edges)
+    if order not in ORDERS:
+        raise ValueError("The unknown insertion order {} was provided, use uniform or brio.".format(order))
 
-    d = ds.TrapezoidSearchStructure.from_bounding_box(r)
+    if builds is None:
+        builds = os.cpu_count() or 1
 
-    for i in range(0, len(edges)):
-        edge = edges[i]
+    if builds > 1:
+        if stats is not None:
+            raise ValueError("Insertion statistics cannot be recorded for speculative builds.")
 
-        if edge.is_vertical():
-            raise ValueError("Vertical edges are not supported. Edge: {}".format(edge))
+        trapezoids = decompose_speculative(edges, builds, keep, seed, depth_factor, order)
+    else:
+        d, _ = build_search_structure(edges, stats, seed, depth_factor, order)
+        trapezoids = [l.trapezoid() for l in d.get_leafs()]
 
-        t_new = ds.TrapezoidalDecomposition.insert(d, edge)
-        ds.TrapezoidSearchStructure.insert(t_new, edge)
+    if interior_only:
+        interior = ds.label_interior(trapezoids, edges)
 
-        if i % 1000 == 0:
-            gc.collect()
+        # Trapezoids inside can have neighbors outside that only touch them at a vertex. These are freed together with
+        # the search structure, so they are removed from the neighbor lists.
+        for trapezoid in interior:
+            trapezoid.neighbors_left = [n for n in trapezoid.neighbors_left if n.inside]
+            trapezoid.neighbors_right = [n for n in trapezoid.neighbors_right if n.inside]
 
-    return [l.trapezoid() for l in d.get_leafs()]
+        return interior
+
+    return trapezoids
+
+def build_search_structure(edges, stats=None, seed=None, depth_factor=DEPTH_FACTOR, order="uniform"):
+    """
+    Builds the search structure of the edges with depth bounded rebuilds, see decompose_basic for the arguments.
+    Returns the tuple (search structure, depth).
+    """
+    # The search structure and the trapezoids do not form reference cycles, replaced trapezoids are freed by reference
+    # counting. The cyclic garbage collector would only traverse the growing structure, so it is disabled.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    # The seeds of the rebuilds are drawn from the seed, so a seeded build is reproducible including its rebuilds.
+    rng = Random(seed) if seed is not None else None
+
+    try:
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt == 0 and seed is not None:
+                attempt_seed = seed
+            else:
+                attempt_seed = rng.randrange(2 ** 32) if rng is not None else randrange(2 ** 32)
+
+            bound = depth_bound(len(edges), depth_factor) \
+                if depth_factor is not None and attempt < MAX_ATTEMPTS - 1 else None
+
+            if stats is None:
+                d, depth = build(edges, attempt_seed, bound, order=order)
+            else:
+                # Only the insertions of the returned structure are recorded.
+                stats.reset()
+
+                with stats:
+                    d, depth = build(edges, attempt_seed, bound, stats, order)
+
+            if d is not None:
+                if bound is None and depth_factor is not None:
+                    logger.warning("The search structure of %d edges exceeded the depth bound in %d builds, kept the "
+                                   "unbounded build %d (seed %d) of depth %d.", len(edges), attempt, attempt,
+                                   attempt_seed, depth)
+                else:
+                    logger.info("Built the search structure of %d edges in build %d (seed %d), depth %d.",
+                                len(edges), attempt, attempt_seed, depth)
+
+                return d, depth
+
+            logger.warning("The search structure of %d edges exceeded the depth bound %.1f in build %d (seed %d), "
+                           "rebuilding.", len(edges), bound, attempt, attempt_seed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _speculative_build(args):
+    edges, seed, depth_factor, order = args
+    trapezoids = decompose_basic(edges, seed=seed, depth_factor=depth_factor, order=order)
+
+    # The depth of the search structure is the largest depth of its leaves.
+    return seed, max(t.depth for t in trapezoids), ds.pack_trapezoids(trapezoids, edges)
+
+def decompose_speculative(edges, builds, keep="first", seed=None, depth_factor=DEPTH_FACTOR, order="uniform"):
+    """
+    Builds the decomposition of the edges with the provided number of seeds in parallel processes, which trades idle
+    cores for a lower (tail) build time. The seeds are drawn from the seed, or from the global random generator if
+    it is None. With keep "first" the first build that finishes is returned, with keep "shallowest" the one with the
+    smallest search structure depth. The builds that are still running are terminated.
+    Returns the vertical decomposition like decompose_basic.
+    """
+    if keep not in ("first", "shallowest"):
+        raise ValueError("The unknown strategy {} was provided, use first or shallowest.".format(keep))
+
+    rng = Random(seed) if seed is not None else None
+    seeds = [rng.randrange(2 ** 32) if rng is not None else randrange(2 ** 32) for _ in range(builds)]
+    tasks = [(list(edges), s, depth_factor, order) for s in seeds]
+
+    # Leaving the pool terminates its processes, which cancels the builds that are still running.
+    with multiprocessing.Pool(builds) as pool:
+        results = pool.imap_unordered(_speculative_build, tasks)
+
+        if keep == "first":
+            seed, depth, packed = next(results)
+        else:
+            seed, depth, packed = min(results, key=lambda result: result[1])
+
+    logger.info("Kept the build with seed %d and depth %d of %d speculative builds (%s).", seed, depth, builds, keep)
+
+    return ds.unpack_trapezoids(packed, list(edges))
 
 def log(value):
     """Returns the result of the logarithm of the provided value with base 2."""
@@ -199,9 +410,6 @@ def decompose_improved(edges):
 
 def _decompose_improved_insert(vertex_trace, edge):
     """Inserts the provided edge into the structures D and T using the provided trace."""
-    if edge.is_vertical():
-        raise ValueError("Vertical edges are not supported. Edge: {}".format(edge))
-
     d_sub = vertex_trace[edge.getStartVertex()]
     t_new = ds.TrapezoidalDecomposition.insert(d_sub, edge)
     ds.TrapezoidSearchStructure.insert(t_new, edge)
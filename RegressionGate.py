@@ -0,0 +1,274 @@
+"""
+Performance regression gate for PlaneSweep.decompose and RandomizedIncremental.decompose_basic.
+
+A fixed subset of the testsuite (SUBSET) is decomposed a number of times by every engine. Every timing is normalized
+by the time of a calibration loop (see calibrate) that is measured right before it, which removes most of the
+difference in speed between machines and of the load of the machine. The normalized samples are compared with the
+samples in a committed baseline file (regression_baseline.json):
+    - a one-sided Mann-Whitney U test decides whether the new samples are larger than the baseline samples. The
+      exact distribution of U is used for small samples without ties, the normal approximation otherwise. The
+      p-values of all 'engine:file' keys are adjusted for multiple testing by the Holm-Bonferroni method.
+    - a bootstrap confidence interval of the ratio of the medians shows how much slower (or faster) an engine is.
+An engine regresses on a file if the adjusted test is significant (p < alpha) and the whole confidence interval lies
+above 1 + tolerance. The check exits with status 1 if any engine regresses, after printing a report.
+
+Usage:
+    python RegressionGate.py record [--baseline FILE] [--repeats R]
+    python RegressionGate.py check [--baseline FILE] [--repeats R] [--alpha A] [--tolerance T]
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+
+import Benchmark
+
+BASELINE = "regression_baseline.json"
+
+BASELINE_VERSION = 1
+
+# The files that are decomposed, small enough to run the gate in about a minute.
+SUBSET = ("testsuite/testSuite700_0.txt", "testsuite/testSuite1400_0.txt", "testsuite/testSuite2100_0.txt")
+
+ENGINES = ("ps", "ri")
+
+CALIBRATION_SIZE = 20000
+
+# The largest sample size for which the exact distribution of the Mann-Whitney U statistic is used.
+EXACT_SIZE = 25
+
+
+def calibrate(size=CALIBRATION_SIZE, repeats=3):
+    """
+    Returns the time in milliseconds of a fixed pure Python workload, the minimum of the provided number of repeats.
+    The loop allocates small objects, calls methods and compares tuples like the engines do.
+    """
+    class Point:
+        def __init__(self, x, y):
+            self.x = x
+            self.y = y
+
+        def key(self):
+            return self.x, self.y
+
+    best = math.inf
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+
+        points = [Point((i * 7919) % size, (i * 104729) % size) for i in range(size)]
+        points.sort(key=Point.key)
+        sum(1 for i in range(1, size) if points[i - 1].key() < points[i].key())
+
+        best = min(best, (time.perf_counter() - start) * 1000.0)
+
+    return best
+
+
+def measure(engines=ENGINES, files=SUBSET, repeats=5, seed=0):
+    """
+    Returns a dictionary that maps 'engine:file' to the list of normalized timings, i.e. the time of a run divided by
+    the time of the calibration loop before it. Run r of the randomized engine uses seed + r.
+    """
+    samples = {}
+
+    for filename in files:
+        edges = Benchmark.readEdges(filename)
+
+        for engine in engines:
+            key = "{}:{}".format(engine, filename)
+            samples[key] = []
+
+            for repeat in range(repeats):
+                calibration = calibrate()
+                samples[key].append(Benchmark.timeRun(engine, edges, seed + repeat) / calibration)
+
+    return samples
+
+
+def exactUCounts(n1, n2):
+    """
+    Returns the list of the number of orderings of n1 baseline and n2 current samples (without ties) per value of
+    the U statistic, i.e. the number of pairs in which the current sample is the larger one.
+    """
+    # counts[j] holds the counts for i baseline and j current samples, starting with i = 0.
+    counts = [[1] for _ in range(n2 + 1)]
+
+    for i in range(1, n1 + 1):
+        row = [[1]]
+
+        for j in range(1, n2 + 1):
+            # The largest sample is a baseline sample (no pairs are added) or a current sample (i pairs are added).
+            combined = counts[j] + [0] * j
+
+            for u, count in enumerate(row[j - 1]):
+                combined[u + i] += count
+
+            row.append(combined)
+
+        counts = row
+
+    return counts[n2]
+
+
+def mannWhitney(baseline, current):
+    """
+    Returns the p-value of the one-sided Mann-Whitney U test with the alternative that the current samples tend to be
+    larger than the baseline samples. Without ties and with at most EXACT_SIZE samples on either side the exact
+    distribution of U is used, otherwise the normal approximation with tie and continuity correction.
+    """
+    n1 = len(baseline)
+    n2 = len(current)
+    values = np.concatenate((np.asarray(baseline, dtype=np.float64), np.asarray(current, dtype=np.float64)))
+
+    # Average ranks (starting at 1) for ties.
+    order = np.argsort(values, kind='stable')
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(1, len(values) + 1)
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ranks = np.bincount(inverse, weights=ranks)[inverse] / counts[inverse]
+
+    u = ranks[n1:].sum() - n2 * (n2 + 1) / 2.0
+
+    if len(counts) == n1 + n2 and max(n1, n2) <= EXACT_SIZE:
+        return sum(exactUCounts(n1, n2)[int(round(u)):]) / math.comb(n1 + n2, n1)
+
+    mean = n1 * n2 / 2.0
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - (counts ** 3 - counts).sum() / (n * (n - 1)))
+
+    if variance <= 0:
+        return 0.5
+
+    z = (u - mean - 0.5) / math.sqrt(variance)
+
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrapRatio(baseline, current, confidence=0.95, resamples=2000, seed=0):
+    """Returns the ratio of the medians (current / baseline) and its bootstrap confidence interval (low, high)."""
+    rng = np.random.default_rng(seed)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+
+    b = np.median(rng.choice(baseline, (resamples, len(baseline))), axis=1)
+    c = np.median(rng.choice(current, (resamples, len(current))), axis=1)
+    low, high = np.percentile(c / b, [50 * (1 - confidence), 50 * (1 + confidence)])
+
+    return float(np.median(current) / np.median(baseline)), (float(low), float(high))
+
+
+def holm(pValues):
+    """Returns the p-values adjusted for multiple testing by the Holm-Bonferroni method, in the same order."""
+    adjusted = [0.0] * len(pValues)
+    largest = 0.0
+
+    for rank, index in enumerate(sorted(range(len(pValues)), key=lambda i: pValues[i])):
+        largest = max(largest, min(1.0, (len(pValues) - rank) * pValues[index]))
+        adjusted[index] = largest
+
+    return adjusted
+
+
+def compare(baseline, current, alpha=0.05, tolerance=0.1):
+    """
+    Compares the current samples with the baseline samples per 'engine:file' key.
+    Returns the list of result dictionaries, see the module documentation for when a result is a regression.
+    """
+    results = []
+
+    for key in sorted(current):
+        if key not in baseline:
+            results.append({"key": key, "status": "new"})
+            continue
+
+        ratio, interval = bootstrapRatio(baseline[key], current[key])
+        results.append({"key": key, "p": mannWhitney(baseline[key], current[key]), "ratio": ratio,
+                        "interval": interval, "baseline": float(np.median(baseline[key])),
+                        "current": float(np.median(current[key]))})
+
+    tested = [result for result in results if "p" in result]
+
+    for result, adjusted in zip(tested, holm([result["p"] for result in tested])):
+        regression = adjusted < alpha and result["interval"][0] > 1 + tolerance
+        result.update({"adjusted_p": adjusted, "status": "REGRESSION" if regression else "ok"})
+
+    return results
+
+
+def report(results, alpha, tolerance):
+    """Returns the readable report of the results of compare."""
+    lines = ["Regression gate (alpha {}, tolerance {:.0%}), timings relative to the calibration loop:".format(
+        alpha, tolerance), ""]
+    lines.append("{:<38} {:>10} {:>10} {:>8} {:>17} {:>9}  {}".format(
+        "engine:file", "baseline", "current", "ratio", "95% interval", "adj. p", "status"))
+
+    for result in results:
+        if result["status"] == "new":
+            lines.append("{:<38} {:>69}".format(result["key"], "not in the baseline"))
+            continue
+
+        lines.append("{:<38} {:>10.2f} {:>10.2f} {:>8.3f} {:>8.3f} - {:<6.3f} {:>9.2g}  {}".format(
+            result["key"], result["baseline"], result["current"], result["ratio"], result["interval"][0],
+            result["interval"][1], result["adjusted_p"], result["status"]))
+
+    regressions = [r for r in results if r["status"] == "REGRESSION"]
+    lines.append("")
+    lines.append("{} regression(s) found".format(len(regressions)) if len(regressions) > 0 else "No regressions found")
+
+    return "\n".join(lines)
+
+
+def readBaseline(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def writeBaseline(filename, samples, repeats, seed):
+    data = {"version": BASELINE_VERSION, "python": platform.python_version(), "repeats": repeats, "seed": seed,
+            "calibration_size": CALIBRATION_SIZE, "samples": samples}
+
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the speed of the engines with a stored baseline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    recordParser = commands.add_parser("record")
+    recordParser.add_argument("--baseline", default=BASELINE)
+    recordParser.add_argument("--repeats", type=int, default=5)
+    recordParser.add_argument("--seed", type=int, default=0)
+
+    checkParser = commands.add_parser("check")
+    checkParser.add_argument("--baseline", default=BASELINE)
+    checkParser.add_argument("--repeats", type=int, default=None)
+    checkParser.add_argument("--alpha", type=float, default=0.05)
+    checkParser.add_argument("--tolerance", type=float, default=0.1)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        writeBaseline(args.baseline, measure(repeats=args.repeats, seed=args.seed), args.repeats, args.seed)
+        print("Recorded the baseline in {}".format(args.baseline))
+    else:
+        baseline = readBaseline(args.baseline)
+
+        if baseline.get("version") != BASELINE_VERSION:
+            raise ValueError("The baseline {} has an unsupported version.".format(args.baseline))
+
+        repeats = args.repeats if args.repeats is not None else baseline["repeats"]
+        engines = sorted(set(key.split(":", 1)[0] for key in baseline["samples"]))
+        files = sorted(set(key.split(":", 1)[1] for key in baseline["samples"]))
+
+        results = compare(baseline["samples"], measure(engines, files, repeats, baseline["seed"]), args.alpha,
+                          args.tolerance)
+
+        print(report(results, args.alpha, args.tolerance))
+        sys.exit(1 if any(r["status"] == "REGRESSION" for r in results) else 0)
@@ -0,0 +1,235 @@
+"""
+Empirical scaling report of the decomposition engines over benchmark output.
+
+The timings are read from the output of Benchmark.py (engine, n, time_ms) or from the historical files results.csv
+(solution, n, time) and ps.csv (n, time). Per engine the median time per n is fitted with the models n, n log* n,
+n log n and n^2 (time = c * f(n), least squares on the relative error) and with a power law time = a * n^b. The
+report lists the constant factors and the goodness of fit (relative RMS error and R^2) of every model.
+
+An engine is flagged if it grows faster than its expected complexity (EXPECTED): either a faster growing model fits
+better than the expected one, or the ratio time / f(n) of the expected model grows with n, i.e. the exponent of
+log(time / f(n)) against log(n) exceeds the threshold.
+
+Usage: python ScalingReport.py <timing files ...> [--output DIRECTORY] [--threshold T]
+Writes scaling.json and one plot scaling_<engine>.png per engine to the output directory.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+from collections import defaultdict
+
+import numpy as np
+from matplotlib.figure import Figure
+
+
+def logStar(n):
+    """Returns the iterated logarithm (base 2) of n, the number of times log2 is applied until the value is <= 1."""
+    count = 0
+
+    while n > 1:
+        n = math.log2(n)
+        count += 1
+
+    return count
+
+
+# The models in order of growth.
+MODELS = {
+    "n": lambda n: n,
+    "n log* n": lambda n: n * np.array([logStar(v) for v in n], dtype=np.float64),
+    "n log n": lambda n: n * np.log2(n),
+    "n^2": lambda n: n ** 2,
+}
+
+# The expected complexity of every engine, the randomized incremental algorithm in expectation.
+EXPECTED = {"ps": "n log n", "ri": "n log n"}
+
+# The engine names that are used in the historical result files.
+ENGINE_NAMES = {"planesweep": "ps", "plane sweep": "ps", "randomized incremental": "ri"}
+
+
+def normalizeEngine(name):
+    name = name.strip()
+    return ENGINE_NAMES.get(name.lower(), name)
+
+
+def loadTimings(filename, engine=None):
+    """
+    Returns a dictionary that maps the engine to a list of tuples (n, milliseconds) from a timing file.
+    Files without engine column (like ps.csv) use the provided engine, or the name of the file if it is None.
+    """
+    if engine is None:
+        engine = normalizeEngine(os.path.splitext(os.path.basename(filename))[0])
+
+    timings = defaultdict(list)
+
+    with open(filename, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader)]
+
+        engineColumn = next((header.index(c) for c in ("engine", "solution") if c in header), None)
+        timeColumn = next(header.index(c) for c in ("time_ms", "time") if c in header)
+        nColumn = header.index("n")
+
+        for row in reader:
+            if len(row) == 0:
+                continue
+
+            name = normalizeEngine(row[engineColumn]) if engineColumn is not None else engine
+            timings[name].append((int(row[nColumn]), float(row[timeColumn])))
+
+    return timings
+
+
+def medians(samples):
+    """Returns the arrays (n, median milliseconds) of the samples, ordered by n."""
+    perN = defaultdict(list)
+
+    for n, ms in samples:
+        perN[n].append(ms)
+
+    ns = np.array(sorted(perN), dtype=np.float64)
+
+    return ns, np.array([np.median(perN[n]) for n in sorted(perN)], dtype=np.float64)
+
+
+def fitModel(ns, times, model):
+    """
+    Fits time = c * f(n) by minimizing the sum of the squared relative errors.
+    Returns a dictionary with the constant c, the relative RMS error and R^2.
+    """
+    f = MODELS[model](ns)
+    q = f / times
+
+    c = q.sum() / (q * q).sum()
+    predicted = c * f
+    residual = times - predicted
+    total = ((times - times.mean()) ** 2).sum()
+
+    return {"c": float(c), "relative_rmse": float(np.sqrt(np.mean((residual / times) ** 2))),
+            "r2": float(1 - (residual ** 2).sum() / total) if total > 0 else 1.0}
+
+
+def fitPowerLaw(ns, times):
+    """Fits time = a * n^b on the log-log scale. Returns a dictionary with a, b and R^2 of the log-log fit."""
+    x = np.log(ns)
+    y = np.log(times)
+    b, loga = np.polyfit(x, y, 1)
+    residual = y - (loga + b * x)
+    total = ((y - y.mean()) ** 2).sum()
+
+    return {"a": float(math.exp(loga)), "b": float(b),
+            "r2": float(1 - (residual ** 2).sum() / total) if total > 0 else 1.0}
+
+
+def analyze(samples, expected, threshold=0.1):
+    """
+    Returns the analysis of the (n, milliseconds) samples of one engine with the provided expected model, see the
+    module documentation.
+    """
+    ns, times = medians(samples)
+
+    if len(ns) < 3:
+        raise ValueError("At least 3 different n are needed for a scaling analysis, got {}.".format(len(ns)))
+
+    fits = {model: fitModel(ns, times, model) for model in MODELS}
+    best = min(fits, key=lambda model: fits[model]["relative_rmse"])
+
+    # The exponent of the growth that is left after dividing by the expected model.
+    excess = float(np.polyfit(np.log(ns), np.log(times / MODELS[expected](ns)), 1)[0])
+
+    flags = []
+    order = list(MODELS)
+
+    if order.index(best) > order.index(expected):
+        flags.append("{} fits better than the expected {}".format(best, expected))
+    if excess > threshold:
+        flags.append("time / ({}) grows like n^{:.2f}".format(expected, excess))
+
+    return {"n": ns.tolist(), "median_ms": times.tolist(), "models": fits, "best_model": best,
+            "expected_model": expected, "power_law": fitPowerLaw(ns, times), "excess_exponent": excess,
+            "super_linear_deviation": len(flags) > 0, "flags": flags}
+
+
+def plot(engine, analysis, filename):
+    """Plots the measured medians with the fitted models (log-log) and the time relative to the expected model."""
+    ns = np.array(analysis["n"])
+    times = np.array(analysis["median_ms"])
+    expected = analysis["expected_model"]
+
+    fig = Figure(figsize=(12, 5))
+    ax = fig.add_subplot(1, 2, 1)
+    ax.loglog(ns, times, "ko", label="median")
+
+    for model, fit in analysis["models"].items():
+        ax.loglog(ns, fit["c"] * MODELS[model](ns), "-", label="{} (rel. RMSE {:.3f})".format(model,
+                                                                                            fit["relative_rmse"]))
+
+    ax.set_xlabel("n")
+    ax.set_ylabel("time (ms)")
+    ax.set_title("{}: best fit {}".format(engine, analysis["best_model"]))
+    ax.legend()
+
+    ax = fig.add_subplot(1, 2, 2)
+    ax.semilogx(ns, times / (analysis["models"][expected]["c"] * MODELS[expected](ns)), "ko-")
+    ax.axhline(1.0, color="gray", linestyle="--")
+    ax.set_xlabel("n")
+    ax.set_ylabel("time / fitted {}".format(expected))
+    ax.set_title("excess exponent {:.3f}".format(analysis["excess_exponent"]))
+
+    fig.tight_layout()
+    fig.savefig(filename)
+
+
+def report(analyses):
+    """Returns the readable report of the analyses per engine."""
+    lines = []
+
+    for engine, analysis in sorted(analyses.items()):
+        lines.append("{} ({} sizes, n = {:.0f} .. {:.0f}), expected {}:".format(
+            engine, len(analysis["n"]), analysis["n"][0], analysis["n"][-1], analysis["expected_model"]))
+
+        for model, fit in analysis["models"].items():
+            lines.append("    {:<9} c = {:<12.4g} relative RMSE {:.4f}  R^2 {:.4f}{}".format(
+                model, fit["c"], fit["relative_rmse"], fit["r2"], "  (best)" if model == analysis["best_model"]
+                else ""))
+
+        power = analysis["power_law"]
+        lines.append("    power law: time = {:.4g} * n^{:.3f} (R^2 {:.4f})".format(power["a"], power["b"], power["r2"]))
+
+        for flag in analysis["flags"]:
+            lines.append("    FLAG: {}".format(flag))
+
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fits scaling models to benchmark timings.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--output", default="scaling")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    samples = defaultdict(list)
+
+    for filename in args.files:
+        for engine, timings in loadTimings(filename).items():
+            samples[engine].extend(timings)
+
+    analyses = {engine: analyze(samples[engine], EXPECTED.get(engine, "n log n"), args.threshold)
+                for engine in samples}
+
+    os.makedirs(args.output, exist_ok=True)
+
+    for engine, analysis in analyses.items():
+        plot(engine, analysis, os.path.join(args.output, "scaling_{}.png".format(engine)))
+
+    with open(os.path.join(args.output, "scaling.json"), 'w') as f:
+        json.dump(analyses, f, indent=2)
+        f.write("\n")
+
+    print(report(analyses))
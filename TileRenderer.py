@@ -0,0 +1,271 @@
+"""
+Renders decomposition segments headless into a zoomable z/x/y PNG tile pyramid.
+
+The segments are rasterized with NumPy (no matplotlib), tile by tile. A spatial bucket index restricts every tile to
+the segments whose bounding box overlaps it and the tiles are rendered in a process pool. Tile (z, x, y) covers the
+square world extent split into 2^z by 2^z tiles, with y = 0 at the top like the usual web map viewers. Tiles without
+any segment are not written.
+
+Usage: python TileRenderer.py <input> <output directory> [--max-zoom Z] [--tile-size S] [--workers W]
+where the input is a polygon text file (decomposed with PlaneSweep), a .npz written by VerticalDecomposition.save or a
+segment file written by ExternalPlaneSweep.decompose.
+"""
+import argparse
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+TILE_SIZE = 256
+
+# Colors (RGBA) of the original edges and of the vertical extensions, as in DrawDecompOutput.
+ORIGINAL_COLOR = (255, 0, 0, 255)
+EXTENSION_COLOR = (0, 128, 0, 255)
+
+
+def writePng(filename, image):
+    """Writes a (height, width, 4) uint8 RGBA image as PNG using only zlib."""
+    height, width = image.shape[:2]
+
+    # Every scanline starts with filter type 0 (none).
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 4)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(filename, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+class BucketIndex:
+    """
+    A uniform grid of 2^level by 2^level buckets over the world extent. Every segment is registered in all buckets that
+    its bounding box overlaps, the registrations are stored in CSR form (offsets per bucket into one id array).
+    """
+    def __init__(self, segments, origin, extent, level):
+        self.origin = origin
+        self.extent = extent
+        self.level = level
+
+        cells = 1 << level
+        lo = np.minimum(segments[:, 0:2], segments[:, 2:4])
+        hi = np.maximum(segments[:, 0:2], segments[:, 2:4])
+
+        c0 = self._cell(lo)
+        c1 = self._cell(hi)
+        spans = (c1[:, 0] - c0[:, 0] + 1) * (c1[:, 1] - c0[:, 1] + 1)
+
+        # Expand every segment into the buckets of its bounding box.
+        ids = np.repeat(np.arange(len(segments)), spans)
+        local = np.arange(len(ids)) - np.repeat(np.cumsum(spans) - spans, spans)
+        width = np.repeat(c1[:, 0] - c0[:, 0] + 1, spans)
+        bx = np.repeat(c0[:, 0], spans) + local % width
+        by = np.repeat(c0[:, 1], spans) + local // width
+        buckets = by * cells + bx
+
+        order = np.argsort(buckets, kind='stable')
+        self.ids = ids[order]
+        self.offsets = np.searchsorted(buckets[order], np.arange(cells * cells + 1))
+
+    def _cell(self, points):
+        cells = 1 << self.level
+        c = np.floor((points - self.origin) / self.extent * cells).astype(np.int64)
+
+        return np.clip(c, 0, cells - 1)
+
+    def query(self, cx0, cy0, cx1, cy1):
+        """Returns the ids of the segments registered in the buckets cx0..cx1 by cy0..cy1 (inclusive, world y up)."""
+        cells = 1 << self.level
+        parts = [self.ids[self.offsets[row * cells + cx0]:self.offsets[row * cells + cx1 + 1]]
+                 for row in range(cy0, cy1 + 1)]
+
+        return np.unique(np.concatenate(parts)) if len(parts) > 0 else np.empty(0, dtype=np.int64)
+
+    def segmentsInTile(self, z, x, y):
+        """Returns the ids of the segments that possibly intersect tile (z, x, y)."""
+        # Row y of the tiles counts from the top, the buckets count from the bottom.
+        yUp = (1 << z) - 1 - y
+
+        if z <= self.level:
+            shift = self.level - z
+            return self.query(x << shift, yUp << shift, ((x + 1) << shift) - 1, ((yUp + 1) << shift) - 1)
+        else:
+            shift = z - self.level
+            return self.query(x >> shift, yUp >> shift, x >> shift, yUp >> shift)
+
+
+def clipSegments(segments, xmin, ymin, xmax, ymax):
+    """
+    Clips the (k, 4) segments to the provided rectangle with the Liang-Barsky algorithm.
+    Returns the clipped segments and a mask of the segments that have a part inside the rectangle.
+    """
+    x1, y1, x2, y2 = segments.T
+    dx = x2 - x1
+    dy = y2 - y1
+
+    t0 = np.zeros(len(segments))
+    t1 = np.ones(len(segments))
+    inside = np.ones(len(segments), dtype=np.bool_)
+
+    for p, q in ((-dx, x1 - xmin), (dx, xmax - x1), (-dy, y1 - ymin), (dy, ymax - y1)):
+        parallel = p == 0
+        inside &= ~(parallel & (q < 0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.where(parallel, 0.0, q / np.where(parallel, 1.0, p))
+
+        t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+        t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+
+    inside &= t0 <= t1
+
+    clipped = np.stack((x1 + t0 * dx, y1 + t0 * dy, x1 + t1 * dx, y1 + t1 * dy), axis=1)
+
+    return clipped[inside], inside
+
+
+def rasterize(image, pixels, color):
+    """
+    Draws the (k, 4) segments, given in pixel coordinates, with the provided color into image.
+    Every segment is sampled once per pixel along its major axis.
+    """
+    if len(pixels) == 0:
+        return
+
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = pixels.T
+
+    counts = np.ceil(np.maximum(np.abs(x2 - x1), np.abs(y2 - y1))).astype(np.int64) + 1
+    starts = np.cumsum(counts) - counts
+    seg = np.repeat(np.arange(len(pixels)), counts)
+    step = np.arange(counts.sum()) - np.repeat(starts, counts)
+    t = step / np.maximum(counts - 1, 1)[seg]
+
+    px = np.clip(np.floor(x1[seg] + t * (x2 - x1)[seg]).astype(np.int64), 0, width - 1)
+    py = np.clip(np.floor(y1[seg] + t * (y2 - y1)[seg]).astype(np.int64), 0, height - 1)
+
+    image[py, px] = color
+
+
+# State of the worker processes, set by _initWorker.
+_worker = {}
+
+
+def _initWorker(segments, original, origin, extent, level, tileSize, outDir):
+    _worker.update(segments=segments, original=original, origin=origin, extent=extent, tileSize=tileSize,
+                   outDir=outDir, index=BucketIndex(segments, origin, extent, level))
+
+
+def renderTile(z, x, y):
+    """Renders tile (z, x, y) in a worker process. Returns true iff the tile contains segments and was written."""
+    w = _worker
+    tileSize = w["tileSize"]
+    tileExtent = w["extent"] / (1 << z)
+
+    xmin = w["origin"][0] + x * tileExtent
+    ymax = w["origin"][1] + ((1 << z) - y) * tileExtent
+
+    ids = w["index"].segmentsInTile(z, x, y)
+    clipped, inside = clipSegments(w["segments"][ids], xmin, ymax - tileExtent, xmin + tileExtent, ymax)
+
+    if len(clipped) == 0:
+        return False
+
+    # World to pixel coordinates, the pixel rows count from the top.
+    scale = tileSize / tileExtent
+    pixels = np.empty_like(clipped)
+    pixels[:, 0::2] = (clipped[:, 0::2] - xmin) * scale
+    pixels[:, 1::2] = (ymax - clipped[:, 1::2]) * scale
+
+    original = w["original"][ids][inside]
+
+    image = np.zeros((tileSize, tileSize, 4), dtype=np.uint8)
+    rasterize(image, pixels[~original], EXTENSION_COLOR)
+    rasterize(image, pixels[original], ORIGINAL_COLOR)
+
+    directory = os.path.join(w["outDir"], str(z), str(x))
+    os.makedirs(directory, exist_ok=True)
+    writePng(os.path.join(directory, "{}.png".format(y)), image)
+
+    return True
+
+
+def _renderTiles(tiles):
+    return [renderTile(z, x, y) for z, x, y in tiles]
+
+
+def renderTiles(segments, original, outDir, maxZoom=6, tileSize=TILE_SIZE, workers=None, bucketLevel=None):
+    """
+    Renders the tile pyramid of zoom levels 0..maxZoom to outDir/z/x/y.png. Returns the number of tiles written.
+
+    Arguments:
+    segments -- array-like of shape (n, 4) or (n, 2, 2) with the segments.
+    original -- array-like of n flags that are true iff the segment is an edge of the original polygon.
+    outDir -- the root directory of the pyramid.
+    maxZoom -- the deepest zoom level, level z consists of 2^z by 2^z tiles.
+    tileSize -- the width and height of a tile in pixels.
+    workers -- the number of worker processes (default the number of CPUs).
+    bucketLevel -- the bucket index uses 2^bucketLevel by 2^bucketLevel buckets (default min(maxZoom, 7)).
+    """
+    segments = np.ascontiguousarray(np.asarray(segments, dtype=np.float64).reshape(-1, 4))
+    original = np.asarray(original, dtype=np.bool_)
+    bucketLevel = min(maxZoom, 7) if bucketLevel is None else bucketLevel
+
+    if len(segments) == 0:
+        return 0
+
+    lo = np.minimum(segments[:, 0:2].min(axis=0), segments[:, 2:4].min(axis=0))
+    hi = np.maximum(segments[:, 0:2].max(axis=0), segments[:, 2:4].max(axis=0))
+
+    # Pad the square extent by one pixel of the deepest level so that the border segments are visible.
+    extent = max(hi[0] - lo[0], hi[1] - lo[1], 1.0)
+    pad = extent / (tileSize << maxZoom)
+    origin = lo - pad
+    extent += 2 * pad
+
+    tiles = [(z, x, y) for z in range(maxZoom + 1) for x in range(1 << z) for y in range(1 << z)]
+    batch = 64
+    batches = [tiles[i:i + batch] for i in range(0, len(tiles), batch)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker,
+                             initargs=(segments, original, origin, extent, bucketLevel, tileSize, outDir)) as pool:
+        return sum(sum(written) for written in pool.map(_renderTiles, batches))
+
+
+def loadSegments(filename):
+    """Returns the tuple (segments, original) of a polygon text file, a .npz decomposition or a segment file."""
+    if filename.endswith(".npz"):
+        with np.load(filename) as data:
+            return data["coordinates"], data["original"]
+    elif filename.endswith(".txt"):
+        import Benchmark
+        import PlaneSweep as ps
+
+        vd = ps.decompose(Benchmark.readEdges(filename))
+        return vd.coordinates(), vd.isOriginal()
+    else:
+        import ExternalPlaneSweep as eps
+
+        data = eps.readSegments(filename)
+        return data[:, :4], data[:, 4] != 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders a decomposition into a z/x/y PNG tile pyramid.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--max-zoom", type=int, default=6)
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    segments, original = loadSegments(args.input)
+    written = renderTiles(segments, original, args.output, args.max_zoom, args.tile_size, args.workers)
+
+    print("Wrote {} tiles to {}".format(written, args.output))
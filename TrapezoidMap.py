@@ -0,0 +1,561 @@
+"""
+Queries on a trapezoidal map that is built by the randomized incremental algorithm.
+
+A TrapezoidMap keeps the search structure (DAG) of the build together with its trapezoids. A point is located in the
+trapezoid that contains it: with leftp < point <= rightp in the lexicographic order of DataStructures.Vertex and the
+point above the bottom edge and not above the top edge. Points on a wall or on an edge therefore belong to the
+trapezoid on the left or below, like in the search structure.
+
+Besides the query from the root of the search structure, locate supports a walk for spatially coherent queries: it
+starts at the trapezoid of the previous query and moves through the neighbor graph towards the point. Walls are
+crossed through neighbors_left and neighbors_right, top and bottom edges through an index of the trapezoids above and
+below every edge. If the walk takes more steps than the budget, the point is located in the search structure.
+
+For batches of points the search structure is flattened into NumPy arrays (node kind, children, the key of an x-node
+and the line of a y-node), which locate_batch descends level by level for all points at once. classify_points uses
+it to classify points as inside, outside or on the boundary of the polygon in O(log n) per point, from the labels of
+IncrementalDataStructure.label_interior. shoot and shoot_batch answer vertical ray shooting queries: the polygon edges
+directly above and below a point are the top and bottom edge of its trapezoid. window_query reports the trapezoids
+that intersect a rectangle by a flood from the trapezoid of one of its corners, through the same neighbors as the walk.
+
+Usage: python TrapezoidMap.py <polygon file> [--queries Q] [--step S] [--seed S]
+Times the located queries of a random walk through the bounding box with and without walking. The classification of
+points is compared with ray casting (see ray_casting) by Benchmark.py --classify.
+"""
+import argparse
+import time
+from bisect import bisect_left
+from math import inf
+
+import numpy as np
+
+import RandomizedIncremental as ri
+from DataStructures import Vertex, sweepY
+from IncrementalDataStructure import XNode, TrapezoidLeaf, label_interior
+
+# The classes of classify_points.
+OUTSIDE = 0
+INSIDE = 1
+BOUNDARY = 2
+
+# The kinds of the nodes of the flattened search structure.
+_LEAF = 0
+_X_NODE = 1
+_Y_NODE = 2
+
+class TrapezoidMap:
+    """
+    The trapezoids of a decomposition with their search structure. If the edges of the polygon are provided, the
+    trapezoids are labelled as inside or outside (see classify_points) and the map answers ray shooting queries.
+    """
+    def __init__(self, search_structure, depth=None, edges=None):
+        self.search_structure = search_structure
+        self._flatten()
+        self.depth = depth if depth is not None else max(t.depth for t in self.trapezoids)
+
+        # A walk of more steps than the depth of the search structure is slower than a query.
+        self.walk_budget = max(self.depth, 1)
+
+        self.walks = 0
+        self.fallbacks = 0
+        self._last = None
+
+        self._above = self._edge_index(lambda t: t.bottom)
+        self._below = self._edge_index(lambda t: t.top)
+
+        # The predicates of the queries are evaluated on plain tuples: per edge (start x, start y, end x, end y) and
+        # per trapezoid (left key, right key, top line, bottom line), where a key is the sweep order of a vertex.
+        self._lines = {}
+
+        for trapezoid in self.trapezoids:
+            for edge in (trapezoid.top, trapezoid.bottom):
+                if id(edge) not in self._lines:
+                    start = edge.getStartVertex()
+                    end = edge.getEndVertex()
+                    self._lines[id(edge)] = (start.x, start.y, end.x, end.y)
+
+        self._shapes = {id(t): (t.leftp.sweepOrder(), t.rightp.sweepOrder(), self._lines[id(t.top)],
+                                self._lines[id(t.bottom)]) for t in self.trapezoids}
+
+        self._bounds = None
+        self.edges = None
+
+        if edges is not None:
+            self.edges = list(edges)
+            label_interior(self.trapezoids, self.edges)
+
+            self._edge_numbers = {id(edge): i for i, edge in enumerate(self.edges)}
+
+            # The index of the top and bottom edge of every trapezoid in edges, -1 for an edge of the bounding box.
+            self._top_edges = np.array([self._edge_numbers.get(id(t.top), -1) for t in self.trapezoids],
+                                       dtype=np.int64)
+            self._bottom_edges = np.array([self._edge_numbers.get(id(t.bottom), -1) for t in self.trapezoids],
+                                          dtype=np.int64)
+
+            self._inside = np.array([t.inside for t in self.trapezoids], dtype=bool)
+            self._top_lines = np.array([self._lines[id(t.top)] for t in self.trapezoids], dtype=np.float64)
+            self._bottom_lines = np.array([self._lines[id(t.bottom)] for t in self.trapezoids], dtype=np.float64)
+            self._vertices = np.unique(np.array([complex(e.p1.x, e.p1.y) for e in self.edges], dtype=np.complex128))
+
+    @staticmethod
+    def from_edges(edges, seed=None, depth_factor=ri.DEPTH_FACTOR, order="uniform"):
+        """Builds the map of the polygon with the provided edges, see RandomizedIncremental.decompose_basic."""
+        return TrapezoidMap(*ri.build_search_structure(edges, None, seed, depth_factor, order), edges=edges)
+
+    def __len__(self):
+        return len(self.trapezoids)
+
+    def _flatten(self):
+        """
+        Numbers the nodes of the search structure (shared nodes once) and stores them in arrays, see the module
+        documentation. The trapezoids are numbered in the order of their leaves.
+        """
+        nodes = [self.search_structure]
+        index = {id(self.search_structure): 0}
+        i = 0
+
+        while i < len(nodes):
+            node = nodes[i]
+            i += 1
+
+            if not isinstance(node.root, TrapezoidLeaf):
+                for child in (node.left, node.right):
+                    if id(child) not in index:
+                        index[id(child)] = len(nodes)
+                        nodes.append(child)
+
+        self.trapezoids = []
+        self._kind = np.zeros(len(nodes), dtype=np.int8)
+        self._children = np.zeros((len(nodes), 2), dtype=np.int64)
+        self._keys = np.zeros((len(nodes), 2), dtype=np.float64)
+        self._node_lines = np.zeros((len(nodes), 4), dtype=np.float64)
+        self._leaf_trapezoid = np.full(len(nodes), -1, dtype=np.int64)
+
+        for i, node in enumerate(nodes):
+            if isinstance(node.root, TrapezoidLeaf):
+                self._kind[i] = _LEAF
+                self._leaf_trapezoid[i] = len(self.trapezoids)
+                self.trapezoids.append(node.root.trapezoid())
+                continue
+
+            self._children[i] = index[id(node.left)], index[id(node.right)]
+
+            if isinstance(node.root, XNode):
+                self._kind[i] = _X_NODE
+                self._keys[i] = node.root.vertex().sweepOrder()
+            else:
+                edge = node.root.edge()
+                start = edge.getStartVertex()
+                end = edge.getEndVertex()
+
+                self._kind[i] = _Y_NODE
+                self._node_lines[i] = start.x, start.y, end.x, end.y
+
+    def _edge_index(self, edge_of):
+        """
+        Returns a dictionary that maps the id of an edge to the tuple (keys, trapezoids) of the trapezoids for which
+        edge_of returns the edge, ordered by their left point.
+        """
+        index = {}
+
+        for trapezoid in sorted(self.trapezoids, key=lambda t: t.leftp.sweepOrder()):
+            keys, trapezoids = index.setdefault(id(edge_of(trapezoid)), ([], []))
+            keys.append(trapezoid.leftp.sweepOrder())
+            trapezoids.append(trapezoid)
+
+        return index
+
+    @staticmethod
+    def contains(trapezoid, vertex):
+        """Returns true if the trapezoid contains the vertex, see the module documentation."""
+        return trapezoid.leftp < vertex <= trapezoid.rightp and \
+            vertex.liesAbove(trapezoid.bottom) and not vertex.liesAbove(trapezoid.top)
+
+    @staticmethod
+    def _lies_above(x, y, line):
+        """Returns true if the point lies above the line of an edge, like Vertex.liesAbove."""
+        start_x, start_y, end_x, end_y = line
+        return (end_x - start_x) * (y - end_y) - (end_y - start_y) * (x - end_x) > 0
+
+    def query(self, vertex):
+        """Returns the trapezoid that contains the vertex, by a query from the root of the search structure."""
+        x, y = key = vertex.sweepOrder()
+        lines = self._lines
+        node = self.search_structure
+
+        while not isinstance(node.root, TrapezoidLeaf):
+            if isinstance(node.root, XNode):
+                node = node.left if key <= node.root.vertex().sweepOrder() else node.right
+            else:
+                node = node.right if TrapezoidMap._lies_above(x, y, lines[id(node.root.edge())]) else node.left
+
+        return node.root.trapezoid()
+
+    def walk(self, start, vertex, budget=None):
+        """
+        Returns the trapezoid that contains the vertex by walking from the start trapezoid, or None if that takes
+        more steps than the budget (default walk_budget) or the walk leaves the bounding box.
+        """
+        budget = self.walk_budget if budget is None else budget
+        x, y = key = vertex.sweepOrder()
+        lies_above = TrapezoidMap._lies_above
+        trapezoid = start
+
+        for _ in range(budget + 1):
+            if trapezoid is None:
+                return None
+
+            left, right, top, bottom = self._shapes[id(trapezoid)]
+
+            if key <= left:
+                trapezoid = TrapezoidMap._across_wall(trapezoid.neighbors_left, vertex)
+            elif right < key:
+                trapezoid = TrapezoidMap._across_wall(trapezoid.neighbors_right, vertex)
+            elif lies_above(x, y, top):
+                trapezoid = TrapezoidMap._across_edge(self._above.get(id(trapezoid.top)), key)
+            elif not lies_above(x, y, bottom):
+                trapezoid = TrapezoidMap._across_edge(self._below.get(id(trapezoid.bottom)), key)
+            else:
+                return trapezoid
+
+        return None
+
+    @staticmethod
+    def _across_wall(neighbors, vertex):
+        """
+        Returns the neighbor on the other side of a wall that is closest to the vertex. The neighbors are stacked on
+        the wall, the top of one is the bottom of the next.
+        """
+        neighbors = list(neighbors)
+
+        if len(neighbors) <= 1:
+            return neighbors[0] if len(neighbors) == 1 else None
+
+        below = [n for n in neighbors if vertex.liesAbove(n.bottom)]
+
+        if len(below) == 0:
+            # The vertex lies below all neighbors, take the lowest one.
+            tops = set(id(n.top) for n in neighbors)
+            return next(n for n in neighbors if id(n.bottom) not in tops)
+
+        # Take the highest neighbor of which the vertex lies above the bottom.
+        bottoms = set(id(n.bottom) for n in below)
+        return next(n for n in below if id(n.top) not in bottoms)
+
+    @staticmethod
+    def _across_edge(entry, key):
+        """
+        Returns the trapezoid of the edge index entry (on the other side of the edge) below or above the point with
+        the provided sweep order.
+        """
+        if entry is None:
+            # The edge is an edge of the bounding box.
+            return None
+
+        keys, trapezoids = entry
+        return trapezoids[max(bisect_left(keys, key) - 1, 0)]
+
+    def locate(self, x, y, walk=False):
+        """
+        Returns the trapezoid that contains the point (x, y). If walk is true, the point is located by a walk from
+        the trapezoid of the previous query, with the search structure as fall back, see the module documentation.
+        """
+        vertex = Vertex(x, y)
+        trapezoid = None
+
+        if walk and self._last is not None:
+            self.walks += 1
+            trapezoid = self.walk(self._last, vertex)
+
+            if trapezoid is None:
+                self.fallbacks += 1
+
+        if trapezoid is None:
+            trapezoid = self.query(vertex)
+
+        self._last = trapezoid
+
+        return trapezoid
+
+    def locate_all(self, xs, ys, walk=True):
+        """Returns the list of trapezoids that contain the points (xs[i], ys[i]), located in order, see locate."""
+        return [self.locate(x, y, walk) for x, y in zip(np.asarray(xs).tolist(), np.asarray(ys).tolist())]
+
+    def locate_batch(self, xs, ys):
+        """
+        Returns the array of the indices in trapezoids of the trapezoids that contain the points (xs[i], ys[i]), like
+        query. All points descend the flattened search structure together, one level per step.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+
+        nodes = np.zeros(len(xs), dtype=np.int64)
+        active = np.arange(len(xs)) if self._kind[0] != _LEAF else np.zeros(0, dtype=np.int64)
+
+        while len(active) > 0:
+            current = nodes[active]
+            x = xs[active]
+            y = ys[active]
+
+            # An x-node sends the points after its vertex in the lexicographic order to the right.
+            key_x = self._keys[current, 0]
+            after = (x > key_x) | ((x == key_x) & (y > self._keys[current, 1]))
+
+            # A y-node sends the points above its edge to the right.
+            start_x, start_y, end_x, end_y = self._node_lines[current].T
+            above = (end_x - start_x) * (y - end_y) - (end_y - start_y) * (x - end_x) > 0
+
+            right = np.where(self._kind[current] == _X_NODE, after, above)
+            current = self._children[current, right.astype(np.int64)]
+
+            nodes[active] = current
+            active = active[self._kind[current] != _LEAF]
+
+        return self._leaf_trapezoid[nodes]
+
+    def classify_points(self, xs, ys):
+        """
+        Returns an int8 array with the class of every point (xs[i], ys[i]): INSIDE, OUTSIDE or BOUNDARY (on an edge
+        or a vertex of the polygon). The map must have been built with the edges of a simple polygon (see
+        PolygonValidator), the labels of polygons that touch themselves in a vertex are not reliable.
+        """
+        self._require_edges()
+
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        trapezoids = self.locate_batch(xs, ys)
+
+        classes = np.where(self._inside[trapezoids], INSIDE, OUTSIDE).astype(np.int8)
+
+        # A point on an edge lies in the trapezoid below it, a vertex may lie in a trapezoid to the left of it.
+        start_x, start_y, end_x, end_y = self._top_lines[trapezoids].T
+        on_edge = (self._top_edges[trapezoids] >= 0) & \
+            ((end_x - start_x) * (ys - end_y) - (end_y - start_y) * (xs - end_x) == 0)
+
+        classes[on_edge | np.isin(xs + 1j * ys, self._vertices)] = BOUNDARY
+
+        return classes
+
+    def _require_edges(self):
+        """Raises a ValueError if the map was built without the edges of the polygon."""
+        if self.edges is None:
+            raise ValueError("The map was built without the edges of the polygon, see TrapezoidMap.from_edges.")
+
+    def shoot(self, x, y):
+        """
+        Shoots vertical rays up and down from the point (x, y). Returns the tuple (above, below) with per ray the tuple
+        (edge, hit point) of the first polygon edge that it hits, or None if it only hits the bounding box. A point on
+        an edge lies below it (see the module documentation), so its ray up hits that edge in the point itself. A
+        vertex of the polygon lies in the trapezoid to the left of its wall, so its rays hit the edges above and below
+        that trapezoid.
+        """
+        self._require_edges()
+
+        vertex = Vertex(x, y)
+        trapezoid = self.query(vertex)
+        hits = []
+
+        for edge in (trapezoid.top, trapezoid.bottom):
+            if id(edge) in self._edge_numbers:
+                hits.append((edge, Vertex(x, edge.yAtSweep(vertex))))
+            else:
+                hits.append(None)
+
+        return hits[0], hits[1]
+
+    def shoot_batch(self, xs, ys):
+        """
+        Shoots vertical rays up and down from the points (xs[i], ys[i]), like shoot. Returns the arrays (above,
+        above_ys, below, below_ys): the indices in edges of the edges that the rays hit (-1 for none) and the
+        y-coordinates of the hit points (NaN for none).
+        """
+        self._require_edges()
+
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        trapezoids = self.locate_batch(xs, ys)
+        points = np.column_stack((xs, ys))
+
+        above = self._top_edges[trapezoids]
+        below = self._bottom_edges[trapezoids]
+        above_ys = np.where(above >= 0, sweepY(self._top_lines[trapezoids], points), np.nan)
+        below_ys = np.where(below >= 0, sweepY(self._bottom_lines[trapezoids], points), np.nan)
+
+        return above, above_ys, below, below_ys
+
+    def _intersects(self, trapezoid, xmin, ymin, xmax, ymax):
+        """Returns true if the trapezoid and the (closed) rectangle intersect."""
+        left, right, top, bottom = self._shapes[id(trapezoid)]
+        low = max(left[0], xmin)
+        high = min(right[0], xmax)
+
+        # Narrow the x-values down to the ones at which the top edge lies above ymin and the bottom edge below ymax.
+        for (start_x, start_y, end_x, end_y), y, above in ((top, ymin, True), (bottom, ymax, False)):
+            if start_x == end_x or start_y == end_y:
+                # The highest point of a vertical top edge and the lowest point of a vertical bottom edge count.
+                value = max(start_y, end_y) if above else min(start_y, end_y)
+
+                if (value < y) if above else (value > y):
+                    return False
+            else:
+                slope = (end_y - start_y) / (end_x - start_x)
+                x = start_x + (y - start_y) / slope
+
+                if (slope > 0) == above:
+                    low = max(low, x)
+                else:
+                    high = min(high, x)
+
+        return low <= high
+
+    def window_query(self, xmin, ymin, xmax, ymax):
+        """
+        Returns the trapezoids that intersect the rectangle [xmin, xmax] x [ymin, ymax] (including its boundary) in
+        O(log n + k) for k trapezoids. The trapezoid of a corner is located in the search structure, the others are
+        found by a flood through the neighbors that only visits trapezoids that intersect the rectangle.
+        """
+        if xmin > xmax or ymin > ymax:
+            raise ValueError("The window [{}, {}] x [{}, {}] is empty.".format(xmin, xmax, ymin, ymax))
+
+        # The corner is moved into the bounding box, which the trapezoids cover.
+        box_xmin, box_ymin, box_xmax, box_ymax = self._box()
+
+        if xmin > box_xmax or xmax < box_xmin or ymin > box_ymax or ymax < box_ymin:
+            return []
+
+        start = self.query(Vertex(min(max(xmin, box_xmin), box_xmax), min(max(ymin, box_ymin), box_ymax)))
+
+        result = []
+        visited = {id(start)}
+        stack = [start]
+
+        while len(stack) > 0:
+            trapezoid = stack.pop()
+
+            if not self._intersects(trapezoid, xmin, ymin, xmax, ymax):
+                continue
+
+            result.append(trapezoid)
+
+            left, right, _, _ = self._shapes[id(trapezoid)]
+            low = (max(left[0], xmin), -inf)
+            high = (min(right[0], xmax), inf)
+
+            neighbors = list(trapezoid.neighbors_left) + list(trapezoid.neighbors_right) + \
+                TrapezoidMap._along_edge(self._above.get(id(trapezoid.top)), low, high) + \
+                TrapezoidMap._along_edge(self._below.get(id(trapezoid.bottom)), low, high)
+
+            for neighbor in neighbors:
+                if id(neighbor) not in visited:
+                    visited.add(id(neighbor))
+                    stack.append(neighbor)
+
+        return result
+
+    @staticmethod
+    def _along_edge(entry, low, high):
+        """Returns the trapezoids of the edge index entry that overlap the sweep keys from low to high."""
+        if entry is None:
+            return []
+
+        keys, trapezoids = entry
+        i = max(bisect_left(keys, low) - 1, 0)
+        result = []
+
+        while i < len(keys) and keys[i] <= high:
+            result.append(trapezoids[i])
+            i += 1
+
+        return result
+
+    def _box(self):
+        """Returns the bounding box (xmin, ymin, xmax, ymax) that the trapezoids cover."""
+        if self._bounds is None:
+            lines = np.array(list(self._lines.values()), dtype=np.float64)
+            self._bounds = (float(lines[:, [0, 2]].min()), float(lines[:, [1, 3]].min()),
+                            float(lines[:, [0, 2]].max()), float(lines[:, [1, 3]].max()))
+
+        return self._bounds
+
+def coherent_points(trapezoid_map, count, step, seed=None):
+    """
+    Returns the arrays (xs, ys) of a random walk of count points with steps of at most step in both coordinates,
+    reflected at the bounding box of the map.
+    """
+    rng = np.random.default_rng(seed)
+    edges = [e for t in trapezoid_map.trapezoids for e in (t.top, t.bottom)]
+    low = np.array([min(min(e.p1.x, e.p2.x) for e in edges), min(min(e.p1.y, e.p2.y) for e in edges)], dtype=float)
+    high = np.array([max(max(e.p1.x, e.p2.x) for e in edges), max(max(e.p1.y, e.p2.y) for e in edges)], dtype=float)
+
+    points = np.cumsum(rng.uniform(-step, step, (count, 2)), axis=0) + rng.uniform(low, high)
+
+    # Reflect the walk into the box.
+    span = high - low
+    points = np.abs((points - low) % (2 * span) - span)
+    points = high - points
+
+    return points[:, 0], points[:, 1]
+
+def ray_casting(edges, xs, ys):
+    """
+    Returns the classes of the points like TrapezoidMap.classify_points, by casting a ray to the right from every
+    point and counting the crossed edges, which takes O(n) per point.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    inside = np.zeros(len(xs), dtype=bool)
+    boundary = np.zeros(len(xs), dtype=bool)
+
+    for edge in edges:
+        x1, y1, x2, y2 = edge.p1.x, edge.p1.y, edge.p2.x, edge.p2.y
+        cross = (x2 - x1) * (ys - y1) - (y2 - y1) * (xs - x1)
+
+        # The edge crosses the ray if the point lies on the side of the edge towards which the ray points.
+        inside ^= ((y1 > ys) != (y2 > ys)) & ((cross > 0) == (y2 > y1))
+        boundary |= (cross == 0) & (np.minimum(x1, x2) <= xs) & (xs <= np.maximum(x1, x2)) & \
+            (np.minimum(y1, y2) <= ys) & (ys <= np.maximum(y1, y2))
+
+    return np.where(boundary, BOUNDARY, np.where(inside, INSIDE, OUTSIDE)).astype(np.int8)
+
+def sample_points(edges, count, seed=None):
+    """
+    Returns the arrays (xs, ys) of count points: uniform in the bounding box of the edges, with a quarter of them on
+    the edges and vertices of the polygon.
+    """
+    rng = np.random.default_rng(seed)
+    segments = np.array([(e.p1.x, e.p1.y, e.p2.x, e.p2.y) for e in edges], dtype=np.float64)
+    low = segments[:, :2].min(axis=0)
+    high = segments[:, :2].max(axis=0)
+
+    points = rng.uniform(low, high, (count, 2))
+
+    # Vertices and midpoints of edges.
+    chosen = segments[rng.integers(0, len(segments), count // 4)]
+    t = rng.integers(0, 2, len(chosen))[:, None] * 0.5
+    points[:len(chosen)] = chosen[:, :2] + t * (chosen[:, 2:] - chosen[:, :2])
+
+    return points[:, 0], points[:, 1]
+
+if __name__ == "__main__":
+    import Benchmark
+
+    parser = argparse.ArgumentParser(description="Times point location with and without walking.")
+    parser.add_argument("input")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--step", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    edges = Benchmark.readEdges(args.input)
+    trapezoid_map = TrapezoidMap.from_edges(edges, seed=args.seed)
+    xs, ys = coherent_points(trapezoid_map, args.queries, args.step, args.seed)
+
+    for walk in (False, True):
+        start = time.perf_counter()
+        trapezoid_map.locate_all(xs, ys, walk)
+        elapsed = time.perf_counter() - start
+
+        print("{:<6} {:10.0f} queries/s".format("walk" if walk else "dag", args.queries / elapsed))
+
+    print("{} trapezoids, depth {}, {} walks, {} fall backs".format(
+        len(trapezoid_map), trapezoid_map.depth, trapezoid_map.walks, trapezoid_map.fallbacks))
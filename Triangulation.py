@@ -0,0 +1,274 @@
+"""
+Triangulation of a simple polygon from its trapezoidal decomposition.
+
+Every trapezoid inside the polygon is defined by a vertex on its left and a vertex on its right wall. If these vertices
+are not the endpoints of a polygon edge, the segment between them is a diagonal of the polygon that lies inside the
+trapezoid. The diagonals of all trapezoids split the polygon into monotone mountains: pieces that are monotone in the
+lexicographic order of DataStructures.Vertex (the symbolic shear of the decompositions). The pieces are traced from the
+planar graph of the edges and diagonals and every piece is triangulated by the stack algorithm for monotone polygons.
+Both steps take linear time: a vertex lies on the walls of at most four trapezoids, so it has at most six neighbors
+in the graph and sorting them around the vertex takes constant time. The triangulation costs less than the
+decomposition itself.
+
+The trapezoids are the ones of RandomizedIncremental.decompose_basic. PlaneSweep.decompose yields the vertical
+extensions without the vertices that define the trapezoids between them, its output cannot be triangulated this way.
+
+Usage: python Triangulation.py <polygon file> [--seed S]
+Times the decomposition and the triangulation and checks the area of the triangles.
+"""
+import argparse
+import time
+from functools import cmp_to_key
+
+import numpy as np
+
+import PolygonValidator
+import RandomizedIncremental as ri
+from IncrementalDataStructure import label_interior
+
+def vertex_indices(edges):
+    """
+    Returns a dictionary that maps the coordinates (x, y) of the vertices of the polygon to their index: vertex i is
+    the first point of edge i, like the vertex array of Benchmark.readEdges.
+    """
+    return {(edge.p1.x, edge.p1.y): i for i, edge in enumerate(edges)}
+
+def diagonals(trapezoids, indices):
+    """
+    Returns the set of diagonals (i, j), i < j, between the vertices that define the provided interior trapezoids,
+    see the module documentation. indices maps the coordinates of the vertices to their index, see vertex_indices.
+    """
+    n = len(indices)
+    result = set()
+
+    for trapezoid in trapezoids:
+        left = trapezoid.leftp.origin
+        right = trapezoid.rightp.origin
+        i = indices[(left.x, left.y)]
+        j = indices[(right.x, right.y)]
+
+        # Consecutive vertices are the endpoints of a polygon edge.
+        if i != j and (i - j) % n not in (1, n - 1):
+            result.add((min(i, j), max(i, j)))
+
+    return result
+
+def trace_pieces(points, diagonals):
+    """
+    Returns the pieces into which the diagonals split the polygon of the (n, 2) array of points, as lists of vertex
+    indices in counterclockwise order. Every piece is a face of the planar graph of the polygon edges and the
+    diagonals, traced by turning to the next edge clockwise at every vertex. The neighbors are ordered around a vertex
+    by the sign of cross products, which is exact for integer coordinates below 2^26.
+    """
+    n = len(points)
+    area = float(np.sum(points[:, 0] * np.roll(points[:, 1], -1) - np.roll(points[:, 0], -1) * points[:, 1]))
+    step = 1 if area > 0 else -1
+
+    neighbors = [[(i - 1) % n, (i + 1) % n] for i in range(n)]
+
+    for i, j in diagonals:
+        neighbors[i].append(j)
+        neighbors[j].append(i)
+
+    coords = points.tolist()
+
+    def counterclockwise(center):
+        x, y = coords[center]
+
+        def compare(a, b):
+            ax, ay = coords[a][0] - x, coords[a][1] - y
+            bx, by = coords[b][0] - x, coords[b][1] - y
+            # The directions in the upper half plane come after the ones in the lower half plane.
+            a_upper = ay > 0 or (ay == 0 and ax < 0)
+            b_upper = by > 0 or (by == 0 and bx < 0)
+
+            if a_upper != b_upper:
+                return 1 if a_upper else -1
+
+            cross = ax * by - ay * bx
+            return -1 if cross > 0 else (1 if cross < 0 else 0)
+
+        return cmp_to_key(compare)
+
+    # The neighbors of every vertex in counterclockwise order, with the position of every neighbor.
+    position = []
+
+    for i in range(n):
+        neighbors[i].sort(key=counterclockwise(i))
+        position.append({j: k for k, j in enumerate(neighbors[i])})
+
+    # The half-edges with the inside on their left: the edges in counterclockwise order and both sides of a diagonal.
+    half_edges = [(i, (i + step) % n) for i in range(n)] + list(diagonals) + [(j, i) for i, j in diagonals]
+    visited = set()
+    pieces = []
+
+    for half_edge in half_edges:
+        if half_edge in visited:
+            continue
+
+        piece = []
+        u, v = half_edge
+
+        while (u, v) not in visited:
+            visited.add((u, v))
+            piece.append(u)
+
+            around = neighbors[v]
+            u, v = v, around[(position[v][u] - 1) % len(around)]
+
+        pieces.append(piece)
+
+    return pieces
+
+def triangulate_monotone(points, piece):
+    """
+    Returns the triangles (as tuples of vertex indices) of a piece that is monotone in the lexicographic order, the
+    vertices of the piece are given in counterclockwise order. Collinear vertices on a chain stay on the stack until a
+    vertex sees them from outside their line, so no triangle has zero area.
+    """
+    if len(piece) == 3:
+        return [tuple(piece)]
+
+    def key(i):
+        return points[i, 0], points[i, 1]
+
+    first = min(range(len(piece)), key=lambda k: key(piece[k]))
+    last = max(range(len(piece)), key=lambda k: key(piece[k]))
+
+    # Counterclockwise from the first vertex runs the lower chain, clockwise the upper chain.
+    lower = []
+    k = first
+    while k != last:
+        lower.append(piece[k])
+        k = (k + 1) % len(piece)
+
+    upper = []
+    k = (first - 1) % len(piece)
+    while k != last:
+        upper.append(piece[k])
+        k = (k - 1) % len(piece)
+
+    # Merge the chains in the lexicographic order, the last vertex belongs to neither chain.
+    ordered = []
+    i = 0
+    j = 1
+    upper = [piece[first]] + upper
+
+    while i < len(lower) or j < len(upper):
+        if j >= len(upper) or (i < len(lower) and key(lower[i]) <= key(upper[j])):
+            ordered.append((lower[i], True))
+            i += 1
+        else:
+            ordered.append((upper[j], False))
+            j += 1
+
+    ordered.append((piece[last], None))
+
+    def cross(a, b, c):
+        return (points[b, 0] - points[a, 0]) * (points[c, 1] - points[b, 1]) - \
+            (points[b, 1] - points[a, 1]) * (points[c, 0] - points[b, 0])
+
+    triangles = []
+    stack = [ordered[0], ordered[1]]
+
+    for vertex, is_lower in ordered[2:-1]:
+        if is_lower != stack[-1][1]:
+            # The vertex lies on the other chain: it sees all vertices on the stack.
+            for k in range(len(stack) - 1):
+                triangles.append((vertex, stack[k][0], stack[k + 1][0]))
+
+            stack = [stack[-1], (vertex, is_lower)]
+        else:
+            popped = stack.pop()
+
+            # Cut off the vertices on the stack that the vertex sees, the inside lies above the lower chain. The turn
+            # has to be strict, a collinear vertex would give a triangle without area.
+            side = 1 if is_lower else -1
+
+            while len(stack) > 0 and side * cross(stack[-1][0], popped[0], vertex) > 0:
+                triangles.append((vertex, popped[0], stack[-1][0]))
+                popped = stack.pop()
+
+            stack.extend((popped, (vertex, is_lower)))
+
+    vertex = ordered[-1][0]
+
+    for k in range(len(stack) - 1):
+        triangles.append((vertex, stack[k][0], stack[k + 1][0]))
+
+    return triangles
+
+def triangulate(edges, trapezoids=None, seed=None, validate=False):
+    """
+    Returns the triangulation of the simple polygon with the provided edges as an (n - 2, 3) int32 array of indices
+    of the vertices (see vertex_indices), every triangle in counterclockwise order and with a positive area, also if
+    consecutive vertices are collinear. The trapezoids of the decomposition are computed by
+    RandomizedIncremental.decompose_basic (with the seed) if they are not provided, provided trapezoids may be all
+    trapezoids or the interior ones.
+    If validate is true, a ValueError is raised before the triangulation starts if the polygon is not simple. A
+    polygon that is not simple may also be detected afterwards, by the number of triangles.
+    """
+    edges = list(edges)
+    indices = vertex_indices(edges)
+
+    if validate:
+        PolygonValidator.validate(edges)
+
+    if len(indices) != len(edges):
+        raise ValueError("The polygon visits a vertex more than once, it is not simple.")
+
+    if trapezoids is None:
+        trapezoids = ri.decompose_basic(edges, seed=seed, interior_only=True)
+    elif any(trapezoid.inside is None for trapezoid in trapezoids):
+        trapezoids = label_interior(trapezoids, edges)
+    else:
+        trapezoids = [trapezoid for trapezoid in trapezoids if trapezoid.inside]
+
+    points = np.array([(edge.p1.x, edge.p1.y) for edge in edges], dtype=np.float64)
+    triangles = [triangle for piece in trace_pieces(points, diagonals(trapezoids, indices))
+                 for triangle in triangulate_monotone(points, piece)]
+
+    result = np.array(triangles, dtype=np.int32).reshape(-1, 3)
+
+    if len(result) != len(edges) - 2:
+        raise ValueError("The polygon is not simple, its {} vertices gave {} triangles.".format(len(edges),
+                                                                                            len(result)))
+
+    # Orient the triangles counterclockwise.
+    a, b, c = points[result[:, 0]], points[result[:, 1]], points[result[:, 2]]
+    clockwise = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]) < 0
+    result[clockwise] = result[clockwise][:, ::-1]
+
+    return result
+
+def triangle_areas(points, triangles):
+    """Returns the (signed) areas of the triangles, counterclockwise triangles have a positive area."""
+    a, b, c = points[triangles[:, 0]], points[triangles[:, 1]], points[triangles[:, 2]]
+    return ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) / 2
+
+if __name__ == "__main__":
+    import Benchmark
+
+    parser = argparse.ArgumentParser(description="Triangulates a polygon from its trapezoidal decomposition.")
+    parser.add_argument("input")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    edges = Benchmark.readEdges(args.input)
+    points = np.array([(edge.p1.x, edge.p1.y) for edge in edges], dtype=np.float64)
+
+    start = time.perf_counter()
+    trapezoids = ri.decompose_basic(edges, seed=args.seed, interior_only=True)
+    decomposed = time.perf_counter()
+    triangles = triangulate(edges, trapezoids)
+    triangulated = time.perf_counter()
+
+    areas = triangle_areas(points, triangles)
+    polygon_area = abs(float(np.sum(points[:, 0] * np.roll(points[:, 1], -1) -
+                                    np.roll(points[:, 0], -1) * points[:, 1]))) / 2
+
+    print("{} vertices, {} triangles".format(len(edges), len(triangles)))
+    print("decomposition {:.1f} ms, triangulation {:.1f} ms".format((decomposed - start) * 1000,
+                                                                   (triangulated - decomposed) * 1000))
+    print("area of the triangles {:.1f}, of the polygon {:.1f}, {} degenerate triangles".format(
+        float(areas.sum()), polygon_area, int((areas == 0).sum())))
@@ -1,11 +1,177 @@
+import numpy as np
+
+from DataStructures import Vertex, Edge, Direction
+
+
 class VerticalDecomposition:
+    """
+    Columnar container for the segments of a vertical decomposition.
+
+    Every segment is stored as a row (x1, y1, x2, y2) of a float64 array together with a flag that is true iff the
+    segment is an edge of the original polygon and the value of its insideOn (a DataStructures.Direction). The storage
+    belongs to the instance and grows in chunks, so repeated decompositions in one process do not share (and
+    accumulate) results.
+    """
+
+    # The number of rows that is allocated at once, capacities are always a multiple of this.
+    CHUNK_SIZE = 4096
+
+    def __init__(self, capacity=CHUNK_SIZE):
+        self._size = 0
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self._size
+
+    def _allocate(self, capacity):
+        capacity = max(self.CHUNK_SIZE, -(-capacity // self.CHUNK_SIZE) * self.CHUNK_SIZE)
+
+        coords = np.empty((capacity, 4), dtype=np.float64)
+        original = np.empty(capacity, dtype=np.bool_)
+        directions = np.empty(capacity, dtype=np.int8)
+
+        if self._size > 0:
+            coords[:self._size] = self._coords[:self._size]
+            original[:self._size] = self._original[:self._size]
+            directions[:self._size] = self._directions[:self._size]
+
+        self._coords = coords
+        self._original = original
+        self._directions = directions
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+
+        if needed > len(self._coords):
+            # Grow geometrically so appending n segments costs O(n) copies in total.
+            self._allocate(max(needed, 2 * len(self._coords)))
+
+    def capacity(self):
+        """Returns the number of segments that fit in the currently allocated buffers."""
+        return len(self._coords)
+
+    @staticmethod
+    def defaultDirections(original):
+        """Returns the insideOn values of segments without a known direction: Undefined for edges, Both for walls."""
+        return np.where(original, Direction.Undefined.value, Direction.Both.value).astype(np.int8)
+
+    def addSegment(self, x1, y1, x2, y2, original, direction=None):
+        """
+        Adds the segment from (x1, y1) to (x2, y2), original is true iff it is an edge of the polygon. direction is its
+        insideOn, see defaultDirections if it is None.
+        """
+        if self._size == len(self._coords):
+            self._reserve(1)
+
+        row = self._coords[self._size]
+        row[0] = x1
+        row[1] = y1
+        row[2] = x2
+        row[3] = y2
+        self._original[self._size] = original
+        self._directions[self._size] = direction.value if direction is not None else \
+            (Direction.Undefined.value if original else Direction.Both.value)
+        self._size += 1
+
+    def addSegments(self, coords, original, directions=None):
+        """
+        Adds a batch of segments.
 
-    # list of tuples (a, b) where a is an edge in the decomposition and b is true iff a is an edge of the original
-    # polygon.
-    edges = []
+        Arguments:
+        coords -- array-like of shape (k, 4) with the rows (x1, y1, x2, y2).
+        original -- a single flag or an array-like of k flags.
+        directions -- a single Direction, a sequence of k Direction members or an array of k Direction values, like
+                      directions returns them (the insideOn of the segments), see defaultDirections if it is None.
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+        k = len(coords)
+
+        if directions is None:
+            directions = self.defaultDirections(np.broadcast_to(original, k))
+        elif isinstance(directions, Direction):
+            directions = directions.value
+        elif not isinstance(directions, np.ndarray) and not np.isscalar(directions):
+            directions = np.fromiter((d.value if isinstance(d, Direction) else int(d) for d in directions),
+                                     dtype=np.int8, count=k)
+
+        self._reserve(k)
+        self._coords[self._size:self._size + k] = coords
+        self._original[self._size:self._size + k] = original
+        self._directions[self._size:self._size + k] = directions
+        self._size += k
 
     def addEdge(self, edge):
-        self.edges.append((edge, True))
+        self.addSegment(edge.p1.x, edge.p1.y, edge.p2.x, edge.p2.y, True, edge.insideOn)
 
     def addVertEdge(self, edge):
-        self.edges.append((edge, False))
+        self.addSegment(edge.p1.x, edge.p1.y, edge.p2.x, edge.p2.y, False, edge.insideOn)
+
+    def clear(self, release=False):
+        """
+        Removes all segments so the container can be reused for another decomposition.
+        The buffers are kept for reuse unless release is true, in which case they shrink back to one chunk.
+        """
+        self._size = 0
+
+        if release:
+            self._allocate(self.CHUNK_SIZE)
+
+    # The accessors below return views on the internal buffers, they are invalidated by the next add or clear.
+
+    def coordinates(self):
+        """Returns a (n, 4) view with the rows (x1, y1, x2, y2)."""
+        return self._coords[:self._size]
+
+    def segments(self):
+        """Returns a (n, 2, 2) view of the segments as pairs of points, e.g. for a matplotlib LineCollection."""
+        return self._coords[:self._size].reshape(self._size, 2, 2)
+
+    def isOriginal(self):
+        """Returns a view on the flags that are true iff the segment is an edge of the original polygon."""
+        return self._original[:self._size]
+
+    def directions(self):
+        """Returns a view on the values of Direction of the insideOn of the segments."""
+        return self._directions[:self._size]
+
+    @property
+    def x1(self):
+        return self._coords[:self._size, 0]
+
+    @property
+    def y1(self):
+        return self._coords[:self._size, 1]
+
+    @property
+    def x2(self):
+        return self._coords[:self._size, 2]
+
+    @property
+    def y2(self):
+        return self._coords[:self._size, 3]
+
+    @property
+    def edges(self):
+        """
+        Returns the list of tuples (a, b) where a is an edge in the decomposition (with its stored insideOn) and b is
+        true iff a is an edge of the original polygon. The edges are materialized on every call, prefer the columnar
+        accessors.
+        """
+        return [(Edge(Vertex(row[0], row[1]), Vertex(row[2], row[3]), Direction(direction)), bool(original))
+                for row, original, direction in zip(self._coords[:self._size].tolist(),
+                                                    self._original[:self._size].tolist(),
+                                                    self._directions[:self._size].tolist())]
+
+    def save(self, filename):
+        """Writes the segments, flags and directions to a .npz file without copying the buffers."""
+        np.savez(filename, coordinates=self.coordinates(), original=self.isOriginal(), directions=self.directions())
+
+    @staticmethod
+    def load(filename):
+        """Reads a decomposition that was written by save, files without directions get the default ones."""
+        with np.load(filename) as data:
+            vd = VerticalDecomposition(len(data["coordinates"]))
+            vd.addSegments(data["coordinates"], data["original"],
+                           data["directions"] if "directions" in data.files else None)
+
+        return vd
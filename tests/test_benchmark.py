@@ -0,0 +1,21 @@
+import os
+
+import Benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLYGON = os.path.join(ROOT, "testsuite", "testSuite1400_0.txt")
+
+def test_speculative_allocations_are_not_applicable(tmp_path):
+    timings, allocations, memory = Benchmark.run([POLYGON], ("ri", "ri-spec"), repeats=1, memory=True)
+
+    assert [t["engine"] for t in timings] == ["ri", "ri-spec"]
+    counted, speculative = allocations
+    assert counted["trapezoids"] > 0 and counted["total"] > 0
+    assert all(group not in speculative for group in Benchmark.ALLOCATION_GROUPS)
+    assert memory[0]["trapezoids"] > 0 and "trapezoids" not in memory[1]
+
+    # The missing columns are written as empty cells.
+    filename = str(tmp_path / "allocations.csv")
+    Benchmark.writeRows(filename, Benchmark.ALLOCATION_FIELDS, allocations)
+    with open(filename) as f:
+        assert f.read().splitlines()[2].endswith("ri-spec,{},1400,,,,,,".format(POLYGON))
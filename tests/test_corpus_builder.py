@@ -0,0 +1,14 @@
+import CorpusBuilder
+
+def test_derived_seeds_differ_per_generator():
+    seeds = {CorpusBuilder.deriveSeed(0, generator, n, repeat)
+             for generator in CorpusBuilder.GENERATORS for n in (100, 200) for repeat in range(3)}
+
+    assert len(seeds) == 2 * len(CorpusBuilder.GENERATORS) * 3
+
+def test_build_and_verify_corpus(tmp_path):
+    built = CorpusBuilder.build(str(tmp_path), "rectangloid", [40, 80], repeats=2, workers=1)
+
+    assert len(built) == 4
+    assert CorpusBuilder.verify(str(tmp_path), regenerate=True, workers=1) == []
+    assert CorpusBuilder.build(str(tmp_path), "rectangloid", [40, 80], repeats=2, workers=1) == []
@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pytest
+
+import Benchmark
+import ExternalPlaneSweep as eps
+import PlaneSweep as ps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize("filename", ["testsuite/testSuite1400_0.txt", "challenge/charizard.txt"])
+@pytest.mark.parametrize("chunk_size", [100, eps.CHUNK_SIZE])
+def test_segments_match_plane_sweep(tmp_path, filename, chunk_size):
+    edges = Benchmark.readEdges(os.path.join(ROOT, filename))
+    coord_file = str(tmp_path / "coords.npy")
+    segment_file = str(tmp_path / "segments.bin")
+
+    eps.writeCoordinateFile(os.path.join(ROOT, filename), coord_file, chunkSize=chunk_size)
+    coords = eps.readCoordinateFile(coord_file)
+    assert coords.tolist() == [[edge.p1.x, edge.p1.y] for edge in edges]
+
+    count = eps.decompose(coord_file, segment_file, insideOn=edges[0].insideOn, chunkSize=chunk_size,
+                          tmpDir=str(tmp_path))
+    segments = eps.readSegments(segment_file)
+    assert len(segments) == count
+
+    vd = ps.decompose(edges)
+    expected = np.column_stack([vd.coordinates(), vd.isOriginal()])
+    assert sorted(map(tuple, segments.tolist())) == sorted(map(tuple, expected.tolist()))
+
+    # The run files are removed with their temporary directory.
+    assert sorted(os.listdir(str(tmp_path))) == ["coords.npy", "segments.bin"]
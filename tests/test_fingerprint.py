@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+import Fingerprint as fp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A square with two walls.
+COORDINATES = np.array([[0, 0, 2, 0], [2, 0, 2, 2], [2, 2, 0, 2], [0, 2, 0, 0], [1, 0, 1, 2], [1.5, 0, 1.5, 2]],
+                       dtype=np.float64)
+ORIGINAL = np.array([True, True, True, True, False, False])
+
+def test_fingerprint_ignores_order_and_direction():
+    order = np.array([5, 2, 0, 4, 1, 3])
+    coordinates = COORDINATES[order]
+    coordinates[::2] = coordinates[::2][:, [2, 3, 0, 1]]
+
+    assert fp.fingerprint(coordinates, ORIGINAL[order]) == fp.fingerprint(COORDINATES, ORIGINAL)
+
+def test_fingerprint_merges_wall_pieces():
+    pieces = np.concatenate((COORDINATES[:4], [[1, 0, 1, 0.5], [1, 0.5, 1, 2], [1.5, 0, 1.5, 2]]))
+    original = np.concatenate((ORIGINAL[:4], [False, False, False]))
+
+    assert fp.fingerprint(pieces, original) == fp.fingerprint(COORDINATES, ORIGINAL)
+
+def test_fingerprint_rounds_coordinates():
+    noisy = COORDINATES + 1e-9
+
+    assert fp.fingerprint(noisy, ORIGINAL) == fp.fingerprint(COORDINATES, ORIGINAL)
+    assert fp.fingerprint(COORDINATES + 1e-3, ORIGINAL) != fp.fingerprint(COORDINATES, ORIGINAL)
+
+def test_walls_on_vertical_edges_are_dropped():
+    with_edge = np.concatenate((COORDINATES, [[2, 0, 2, 2]]))
+    original = np.concatenate((ORIGINAL, [False]))
+
+    assert fp.fingerprint(with_edge, original) == fp.fingerprint(COORDINATES, ORIGINAL)
+
+def test_engines_agree():
+    for source in (("file", os.path.join(ROOT, "challenge/charizard.txt")), ("generator", "sharkteeth", 200, 1),
+                   ("generator", "rectangloid", 200, 1)):
+        result = fp.compareEngines(source, seeds=(0, 1))
+
+        assert result["mismatches"] == []
@@ -0,0 +1,25 @@
+import gc
+import os
+
+import pytest
+
+import Benchmark
+import RandomizedIncremental as ri
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+POLYGONS = ("challenge/charizard.txt", "testsuite/testSuite700_0.txt")
+
+@pytest.mark.parametrize("filename", POLYGONS)
+@pytest.mark.parametrize("builds", (1, 2))
+def test_interior_only_neighbors_are_alive(filename, builds):
+    edges = Benchmark.readEdges(os.path.join(ROOT, filename))
+    trapezoids = ri.decompose_basic(edges, seed=0, builds=builds, interior_only=True)
+    gc.collect()
+
+    assert len(trapezoids) > 0
+
+    for trapezoid in trapezoids:
+        for neighbor in list(trapezoid.neighbors_left) + list(trapezoid.neighbors_right):
+            assert neighbor is not None
+            assert neighbor.inside
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+import Benchmark
+import PlaneSweep as ps
+from DataStructures import Vertex, Edge, Direction
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def polygon(points):
+    vertices = [Vertex(x, y) for x, y in points]
+    return [Edge(vertices[i], vertices[(i + 1) % len(vertices)], Direction.Right) for i in range(len(vertices))]
+
+@pytest.mark.parametrize("points", ([(0, 0), (4, 4), (4, 0), (0, 4)],
+                                    [(0, 0), (10, 0), (10, 10), (5, -5), (0, 10)]))
+def test_crossing_edges_raise_value_error(points):
+    with pytest.raises(ValueError, match="intersect"):
+        ps.decompose(polygon(points))
+
+def test_crossing_edges_of_germany_are_named():
+    edges = Benchmark.readEdges(os.path.join(ROOT, "challenge/Germany_Datachallenge.txt"))
+
+    with pytest.raises(ValueError, match=r"\(\(8104723, 53635139\), \(8108611, 53635971\)\)"):
+        ps.decompose(edges)
+
+def test_empty_input_yields_nothing():
+    assert list(ps.decompose_iter([])) == []
+    assert len(ps.decompose([])) == 0
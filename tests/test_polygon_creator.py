@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import Benchmark
+import CorpusBuilder
+import PolygonCreator as poly
+import PolygonValidator
+
+@pytest.mark.parametrize("generator", CorpusBuilder.GENERATORS)
+@pytest.mark.parametrize("n", (40, 402))
+def test_generated_polygons_are_simple_and_seeded(generator, n):
+    params = CorpusBuilder.generatorParams(generator, n)
+    first = CorpusBuilder.generate(generator, params, 1)
+
+    assert len(first) == n
+    assert PolygonValidator.findIntersection(Benchmark.polygonEdges(first.tolist())) is None
+    assert np.array_equal(first, CorpusBuilder.generate(generator, params, 1))
+    assert not np.array_equal(first, CorpusBuilder.generate(generator, params, 2))
+
+def test_shark_teeth_without_jitter_is_the_base_polygon():
+    base = poly.sharkTeethArray(10, 500000, 1000000)
+
+    assert np.array_equal(base, poly.sharkTeethArray(10, 500000, 1000000, seed=7))
+    assert len(poly.sharkTeethArray(10, 500000, 1000000, red=3, seed=7, jitter=0.1)) == len(base) + 3
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import Benchmark
+import PlaneSweep as ps
+import PolygonValidator
+import RandomizedIncremental as ri
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def pair_points(pair):
+    return [((edge.p1.x, edge.p1.y), (edge.p2.x, edge.p2.y)) for edge in pair]
+
+@pytest.mark.parametrize("filename", ["testsuite/testSuite1400_0.txt", "challenge/charizard.txt"])
+def test_simple_polygons_pass(filename):
+    edges = Benchmark.readEdges(os.path.join(ROOT, filename))
+
+    assert PolygonValidator.findIntersection(edges) is None
+    PolygonValidator.validate(edges)
+
+def test_crossing_edges_are_found():
+    edges = Benchmark.polygonEdges([(0, 0), (4, 4), (4, 0), (0, 4)])
+
+    assert sorted(pair_points(PolygonValidator.findIntersection(edges))) == [((0, 0), (4, 4)), ((4, 0), (0, 4))]
+
+@pytest.mark.parametrize("points", (
+    # A vertex on another edge, collinear overlapping edges and a spike that folds back onto its edge.
+    [(0, 0), (4, 0), (4, 4), (2, 0), (0, 4)],
+    [(0, 0), (4, 0), (2, 0), (2, -2), (6, -2), (6, 4), (0, 4)],
+    [(0, 0), (4, 0), (4, 4), (4, 2), (0, 4)]))
+def test_touching_and_overlapping_edges_are_found(points):
+    assert PolygonValidator.findIntersection(Benchmark.polygonEdges(points)) is not None
+
+def test_degeneracies_are_found():
+    square = Benchmark.polygonEdges([(0, 0), (4, 0), (4, 4), (0, 4)])
+    assert PolygonValidator.findIntersection(square) is None
+
+    # A zero length edge, a vertex that is used twice and a gap in the ring.
+    zero = Benchmark.polygonEdges([(0, 0), (4, 0), (4, 0), (4, 4), (0, 4)])
+    assert pair_points(PolygonValidator.findIntersection(zero)) == [((4, 0), (4, 0))] * 2
+
+    twice = Benchmark.polygonEdges([(0, 0), (2, 0), (1, 1), (2, 2), (0, 2), (1, 1)])
+    assert pair_points(PolygonValidator.findIntersection(twice)) == [((1, 1), (2, 2)), ((1, 1), (0, 0))]
+
+    gap = square[:1] + square[2:]
+    assert PolygonValidator.findIntersection(gap) == (gap[0], gap[1])
+
+    with pytest.raises(ValueError, match="at least 3 edges"):
+        PolygonValidator.findIntersection(square[:2])
+
+def test_engines_validate_on_request():
+    edges = Benchmark.polygonEdges([(0, 0), (4, 4), (4, 0), (0, 4)])
+
+    for decompose in (ps.decompose, ri.decompose_basic):
+        with pytest.raises(ValueError, match="not simple"):
+            decompose(edges, validate=True)
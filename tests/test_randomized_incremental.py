@@ -0,0 +1,106 @@
+import logging
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+import Benchmark
+import Fingerprint
+import IncrementalDataStructure as ids
+import RandomizedIncremental as ri
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def read(filename):
+    return Benchmark.readEdges(os.path.join(ROOT, filename))
+
+def signature(trapezoids):
+    return sorted((t.leftp.x, t.leftp.y, t.rightp.x, t.rightp.y, t.depth) for t in trapezoids)
+
+def test_depth_is_bounded():
+    edges = read("testsuite/testSuite700_0.txt")
+    trapezoids = ri.decompose_basic(edges, seed=1, depth_factor=4.0)
+
+    assert max(t.depth for t in trapezoids) <= ri.depth_bound(len(edges), 4.0)
+
+def test_seed_reproduces_rebuilds(caplog):
+    edges = read("challenge/charizard.txt")
+
+    with caplog.at_level(logging.INFO, logger=ri.logger.name):
+        first = ri.decompose_basic(edges, seed=5, depth_factor=2.0)
+
+    assert "rebuilding" in caplog.text
+    assert signature(first) == signature(ri.decompose_basic(edges, seed=5, depth_factor=2.0))
+
+def test_unbounded_fallback_is_warned(caplog):
+    edges = read("challenge/charizard.txt")
+
+    with caplog.at_level(logging.WARNING, logger=ri.logger.name):
+        trapezoids = ri.decompose_basic(edges, seed=5, depth_factor=1.0)
+
+    assert "kept the unbounded build {}".format(ri.MAX_ATTEMPTS - 1) in caplog.text
+    assert max(t.depth for t in trapezoids) > ri.depth_bound(len(edges), 1.0)
+
+def test_packed_trapezoids_survive_pickling():
+    edges = read("testsuite/testSuite700_0.txt")
+    trapezoids = ri.decompose_basic(edges, seed=3)
+    unpacked = ids.unpack_trapezoids(pickle.loads(pickle.dumps(ids.pack_trapezoids(trapezoids, edges))), edges)
+
+    assert signature(unpacked) == signature(trapezoids)
+    index = {id(t): i for i, t in enumerate(trapezoids)}
+    copy_index = {id(t): i for i, t in enumerate(unpacked)}
+
+    for original, copy in zip(trapezoids, unpacked):
+        # The edges of the polygon are the provided ones, the edges of the bounding box are rebuilt.
+        assert copy.top is original.top or (copy.top == original.top and original.top not in edges)
+        assert copy.bottom is original.bottom or (copy.bottom == original.bottom and original.bottom not in edges)
+        assert [copy_index[id(n)] for n in copy.neighbors_left] == [index[id(n)] for n in original.neighbors_left]
+        assert [copy_index[id(n)] for n in copy.neighbors_right] == [index[id(n)] for n in original.neighbors_right]
+
+@pytest.mark.parametrize("keep", ["first", "shallowest"])
+def test_speculative_builds(keep):
+    edges = read("testsuite/testSuite700_0.txt")
+    trapezoids = ri.decompose_basic(edges, seed=2, builds=2, keep=keep)
+
+    assert len(trapezoids) == len(ri.decompose_basic(edges, seed=2))
+    if keep == "shallowest":
+        assert signature(trapezoids) == signature(ri.decompose_basic(edges, seed=2, builds=2, keep=keep))
+
+    interior = ri.decompose_basic(edges, seed=2, builds=2, keep=keep, interior_only=True)
+    assert len(interior) == len(ri.decompose_basic(edges, seed=2, interior_only=True))
+
+def test_speculative_builds_reject_bad_arguments():
+    edges = read("testsuite/testSuite700_0.txt")
+
+    with pytest.raises(ValueError, match="unknown strategy"):
+        ri.decompose_basic(edges, builds=2, keep="last")
+    with pytest.raises(ValueError, match="statistics"):
+        ri.decompose_basic(edges, builds=2, stats=object())
+
+def test_hilbert_keys_walk_through_neighboring_cells():
+    x, y = np.meshgrid(np.arange(8), np.arange(8))
+    keys = ri.hilbert_keys(x.ravel(), y.ravel(), bits=3)
+    assert sorted(keys.tolist()) == list(range(64))
+
+    # Consecutive keys are cells that share a side.
+    cells = np.column_stack([x.ravel(), y.ravel()])[np.argsort(keys)]
+    assert (np.abs(np.diff(cells, axis=0)).sum(axis=1) == 1).all()
+
+def test_brio_is_a_seeded_permutation():
+    edges = read("testsuite/testSuite700_0.txt")
+    order = ri.brio(edges, seed=4)
+
+    assert sorted(map(id, order)) == sorted(map(id, edges))
+    assert order == ri.brio(edges, seed=4)
+    assert order != ri.brio(edges, seed=5)
+    assert ri.brio([], seed=4) == []
+
+def test_brio_order_builds_the_same_decomposition():
+    edges = read("challenge/charizard.txt")
+    brio = ri.decompose_basic(edges, seed=1, order="brio", interior_only=True)
+    uniform = ri.decompose_basic(edges, seed=1, interior_only=True)
+
+    assert Fingerprint.trapezoidFingerprint(brio, edges) == Fingerprint.trapezoidFingerprint(uniform, edges)
+    with pytest.raises(ValueError, match="unknown insertion order"):
+        ri.decompose_basic(edges, order="sorted")
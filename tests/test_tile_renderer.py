@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import TileRenderer as tr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLYGON = os.path.join(ROOT, "testsuite", "testSuite1400_0.txt")
+
+def test_text_input_does_not_import_pyplot():
+    # A fresh interpreter, other tests may already have imported pyplot.
+    code = ("import sys, TileRenderer as tr; tr.loadSegments({!r}); "
+            "print('matplotlib.pyplot' in sys.modules)").format(POLYGON)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+def test_render_writes_root_tile(tmp_path):
+    segments, original = tr.loadSegments(POLYGON)
+    assert len(segments) == len(original) and original.any() and not original.all()
+
+    written = tr.renderTiles(segments, original, str(tmp_path), 1, 64, 1)
+    assert written > 0
+    with open(os.path.join(str(tmp_path), "0", "0", "0.png"), 'rb') as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
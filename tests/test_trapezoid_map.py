@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+import pytest
+
+import Benchmark
+import RandomizedIncremental as ri
+import TrapezoidMap as tm
+from DataStructures import Vertex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def edges():
+    return Benchmark.readEdges(os.path.join(ROOT, "challenge/charizard.txt"))
+
+@pytest.fixture
+def trapezoid_map(edges):
+    return tm.TrapezoidMap.from_edges(edges, seed=1)
+
+def test_walk_locates_like_the_search_structure(trapezoid_map):
+    xs, ys = tm.coherent_points(trapezoid_map, 2000, 5, seed=2)
+    walked = trapezoid_map.locate_all(xs, ys, walk=True)
+
+    assert trapezoid_map.walks == len(xs) - 1
+    assert trapezoid_map.fallbacks < trapezoid_map.walks / 10
+    for x, y, trapezoid in zip(xs.tolist(), ys.tolist(), walked):
+        assert trapezoid is trapezoid_map.query(Vertex(x, y))
+        assert tm.TrapezoidMap.contains(trapezoid, Vertex(x, y))
+
+def test_vertices_belong_to_the_trapezoid_on_the_left(trapezoid_map, edges):
+    for edge in edges[:100]:
+        trapezoid = trapezoid_map.locate(edge.p1.x, edge.p1.y, walk=True)
+
+        assert trapezoid is trapezoid_map.query(edge.p1)
+        assert trapezoid.rightp == edge.p1
+
+def test_walk_gives_up_beyond_its_budget(trapezoid_map):
+    start = trapezoid_map.query(Vertex(100, 100))
+    far = Vertex(700, 500)
+
+    assert trapezoid_map.walk(start, far, budget=1) is None
+    assert trapezoid_map.walk(start, far, budget=len(trapezoid_map)) is trapezoid_map.query(far)
+
+def test_batch_location_matches_the_query(trapezoid_map, edges):
+    xs, ys = tm.sample_points(edges, 2000, seed=3)
+    located = trapezoid_map.locate_batch(xs, ys)
+
+    for x, y, i in zip(xs.tolist(), ys.tolist(), located.tolist()):
+        assert trapezoid_map.trapezoids[i] is trapezoid_map.query(Vertex(x, y))
+
+@pytest.mark.parametrize("filename", ["testsuite/testSuite1400_0.txt", "challenge/charizard.txt"])
+def test_classification_matches_ray_casting(filename):
+    edges = Benchmark.readEdges(os.path.join(ROOT, filename))
+    xs, ys = tm.sample_points(edges, 5000, seed=4)
+    classes = tm.TrapezoidMap.from_edges(edges, seed=1).classify_points(xs, ys)
+
+    assert np.array_equal(classes, tm.ray_casting(edges, xs, ys))
+    assert set(classes.tolist()) == {tm.OUTSIDE, tm.INSIDE, tm.BOUNDARY}
+
+def test_classification_needs_the_edges(edges):
+    trapezoid_map = tm.TrapezoidMap(*ri.build_search_structure(edges, seed=1))
+
+    with pytest.raises(ValueError, match="without the edges"):
+        trapezoid_map.classify_points([0.5], [0.5])
+
+def brute_force_shoot(edges, x, y):
+    """Returns the indices of the nearest edges above and below the point (-1 for none) and the y-values of the hits."""
+    above, below = (-1, np.inf), (-1, -np.inf)
+
+    for i, edge in enumerate(edges):
+        if min(edge.p1.x, edge.p2.x) < x < max(edge.p1.x, edge.p2.x):
+            hit = edge.p1.y + (x - edge.p1.x) * (edge.p2.y - edge.p1.y) / (edge.p2.x - edge.p1.x)
+
+            if y <= hit < above[1]:
+                above = (i, hit)
+            elif below[1] < hit < y:
+                below = (i, hit)
+
+    return above, below
+
+def test_rays_hit_the_nearest_edges(trapezoid_map, edges):
+    rng = np.random.default_rng(5)
+    xs, ys = rng.uniform(-10, 800, 300), rng.uniform(-10, 810, 300)
+    above, above_ys, below, below_ys = trapezoid_map.shoot_batch(xs, ys)
+
+    for k, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        expected = brute_force_shoot(edges, x, y)
+        hits = trapezoid_map.shoot(x, y)
+
+        for (i, hit_y), indices, hit_ys, hit in zip(expected, (above, below), (above_ys, below_ys), hits):
+            assert indices[k] == i
+            if i < 0:
+                assert hit is None and np.isnan(hit_ys[k])
+            else:
+                assert hit[0] is edges[i] and hit[1].x == x
+                assert hit[1].y == pytest.approx(hit_y) and hit_ys[k] == pytest.approx(hit_y)
+
+def test_ray_up_from_an_edge_hits_it_in_the_point(trapezoid_map, edges):
+    edge = next(e for e in edges if e.p1.x != e.p2.x)
+    x, y = (edge.p1.x + edge.p2.x) / 2, (edge.p1.y + edge.p2.y) / 2
+
+    above, _ = trapezoid_map.shoot(x, y)
+    assert above[0] is edge and above[1] == Vertex(x, y)
+
+def test_window_query_finds_every_intersecting_trapezoid(trapezoid_map):
+    rng = np.random.default_rng(6)
+
+    for _ in range(50):
+        xmin, ymin = rng.uniform(-50, 780, 2)
+        xmax, ymax = xmin + rng.uniform(0, 200), ymin + rng.uniform(0, 200)
+        found = trapezoid_map.window_query(xmin, ymin, xmax, ymax)
+
+        # The flood through the neighbors reports the trapezoids that a scan over all trapezoids reports.
+        expected = [t for t in trapezoid_map.trapezoids if trapezoid_map._intersects(t, xmin, ymin, xmax, ymax)]
+        assert sorted(map(id, found)) == sorted(map(id, expected))
+
+        # Every point of the window lies in a reported trapezoid.
+        xs, ys = rng.uniform(xmin, xmax, 100), rng.uniform(ymin, ymax, 100)
+        covered = (xs >= 0) & (xs <= 779) & (ys >= 0) & (ys <= 799)
+        xs, ys = xs[covered], ys[covered]
+        reported = {id(t) for t in found}
+        assert all(id(trapezoid_map.trapezoids[i]) in reported for i in trapezoid_map.locate_batch(xs, ys).tolist())
+
+def test_window_query_edge_cases(trapezoid_map):
+    assert len(trapezoid_map.window_query(-1e6, -1e6, 1e6, 1e6)) == len(trapezoid_map)
+    assert trapezoid_map.window_query(2000, 2000, 3000, 3000) == []
+
+    with pytest.raises(ValueError, match="is empty"):
+        trapezoid_map.window_query(10, 10, 5, 20)
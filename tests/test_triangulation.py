@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+import Benchmark
+import Triangulation as tr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def polygon_area(points):
+    return abs(float(np.sum(points[:, 0] * np.roll(points[:, 1], -1) - np.roll(points[:, 0], -1) * points[:, 1]))) / 2
+
+def check_triangulation(edges, seed):
+    points = np.array([(edge.p1.x, edge.p1.y) for edge in edges], dtype=np.float64)
+    triangles = tr.triangulate(edges, seed=seed)
+    areas = tr.triangle_areas(points, triangles)
+
+    assert triangles.shape == (len(edges) - 2, 3)
+    assert (areas > 0).all()
+    assert np.isclose(areas.sum(), polygon_area(points))
+
+@pytest.mark.parametrize("filename", ["testsuite/testSuite1400_0.txt", "challenge/charizard.txt"])
+def test_triangles_cover_the_polygon(filename):
+    check_triangulation(Benchmark.readEdges(os.path.join(ROOT, filename)), 1)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_collinear_vertices_give_no_degenerate_triangles(seed):
+    # A square with the midpoints of its sides and a comb with every edge split in three.
+    square = [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 2), (0, 1)]
+    comb = [(0, 0)] + [p for t in range(5) for p in ((2 * t + 1, 0), (2 * t + 1, 3), (2 * t + 2, 3), (2 * t + 2, 0))] \
+        + [(11, 0), (11, -1), (0, -1)]
+    comb = [(3 * x + (x2 - x) * j, 3 * y + (y2 - y) * j)
+            for (x, y), (x2, y2) in zip(comb, comb[1:] + comb[:1]) for j in range(3)]
+
+    for points in (square, comb):
+        check_triangulation(Benchmark.polygonEdges(points), seed)
+
+def test_repeated_vertex_is_rejected():
+    edges = Benchmark.polygonEdges([(0, 0), (2, 0), (1, 1), (2, 2), (0, 2), (1, 1)])
+
+    with pytest.raises(ValueError, match="more than once"):
+        tr.triangulate(edges)
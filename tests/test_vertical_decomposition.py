@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+import Benchmark
+import PlaneSweep as ps
+from DataStructures import Direction
+from VerticalDecomposition import VerticalDecomposition
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_save_and_load_round_trip(tmp_path):
+    vd = ps.decompose(Benchmark.readEdges(os.path.join(ROOT, "testsuite", "testSuite1400_0.txt")))
+    filename = str(tmp_path / "decomposition.npz")
+    vd.save(filename)
+
+    loaded = VerticalDecomposition.load(filename)
+    assert len(loaded) == len(vd)
+    assert np.array_equal(loaded.coordinates(), vd.coordinates())
+    assert np.array_equal(loaded.isOriginal(), vd.isOriginal())
+    assert np.array_equal(loaded.directions(), vd.directions())
+
+def test_load_without_directions_uses_the_defaults(tmp_path):
+    filename = str(tmp_path / "old.npz")
+    np.savez(filename, coordinates=np.arange(8.0).reshape(2, 4), original=np.array([True, False]))
+
+    loaded = VerticalDecomposition.load(filename)
+    assert loaded.directions().tolist() == [Direction.Undefined.value, Direction.Both.value]
+
+def test_add_segments_accepts_direction_members():
+    vd = VerticalDecomposition()
+    coords = np.arange(12.0).reshape(3, 4)
+    vd.addSegments(coords, [True, True, False], [Direction.Right, Direction.Left, Direction.Both])
+    vd.addSegments(coords[:1], True, Direction.Left)
+    vd.addSegments(coords[:2], True, np.array([Direction.Right.value, 1], dtype=np.int8))
+
+    assert vd.directions().tolist() == [2, 1, 3, 1, 2, 1]
+    assert [edge.insideOn for edge, _ in vd.edges[:3]] == [Direction.Right, Direction.Left, Direction.Both]